@@ -3,6 +3,9 @@ ASGI config for careercracker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn careercracker.asgi:application``)
+so the streaming feedback endpoint runs as a native async view.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -0,0 +1,106 @@
+# Shared plumbing for the database-backed caches (jobs/utils/onet_cache.py, interviews/feedback_cache.py):
+# process-local counters, hit bookkeeping, eviction of expired and least recently used rows every
+# `evict_every` writes, and the stats/--purge/--clear management command built on top of them.
+
+import logging
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError
+from django.db.models import F, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseCache:
+    model = None  # The cache entry model; needs hits and a last-used timestamp
+    last_used_field = 'last_used_at'
+    label = 'cache'  # Used in log messages
+    counter_names = ('hits', 'misses', 'stores', 'evictions', 'errors')
+
+    def __init__(self, max_entries, evict_every=100):
+        self.max_entries = max_entries  # LRU bound on the number of entries
+        self.evict_every = evict_every  # Run eviction once every N writes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = dict.fromkeys(self.counter_names, 0)
+
+    # Q object matching entries that are too old to serve
+    def expired(self):
+        raise NotImplementedError
+
+    # Counts a hit on an entry and refreshes its LRU position
+    def touch(self, entry_id):
+        self.model.objects.filter(id=entry_id).update(hits=F('hits') + 1, **{self.last_used_field: timezone.now()})
+
+    # Bookkeeping after a successful write; evicts once every evict_every writes
+    def stored(self):
+        self._count('stores')
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % self.evict_every == 0
+        if should_evict:
+            self.evict()
+
+    # Drops expired entries, then the least recently used ones above max_entries
+    def evict(self):
+        try:
+            removed, _ = self.model.objects.filter(self.expired()).delete()
+            overflow = self.model.objects.count() - self.max_entries
+            if overflow > 0:
+                stale_ids = list(self.model.objects.order_by(self.last_used_field).values_list('id', flat=True)[:overflow])
+                removed += self.model.objects.filter(id__in=stale_ids).delete()[0]
+        except DatabaseError as e:
+            logger.warning(f"{self.label} eviction failed: {e}")
+            self._count('errors')
+            return 0
+
+        self._count('evictions', removed)
+        return removed
+
+    def clear(self):
+        return self.model.objects.all().delete()[0]
+
+    # Process-local counters plus the entry count and hits persisted across all workers
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        counters['entries'] = self.model.objects.count()
+        counters['total_hits'] = self.model.objects.aggregate(total=Sum('hits'))['total'] or 0
+        return counters
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+
+# Management command showing a cache's statistics, with --purge and --clear.
+# Subclasses set `entries` (e.g. 'cached O*NET responses') and implement get_cache() and describe().
+class CacheCommand(BaseCommand):
+    entries = 'cache entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge', action='store_true', help='Evict expired and least recently used entries')
+        parser.add_argument('--clear', action='store_true', help=f'Delete all {self.entries}')
+
+    def handle(self, *args, **options):
+        cache = self.get_cache()
+
+        if options['clear']:
+            removed = cache.clear()
+            self.stdout.write(self.style.SUCCESS(f'Cleared {removed} {self.entries}.'))
+            return
+
+        if options['purge']:
+            removed = cache.evict()
+            self.stdout.write(self.style.SUCCESS(f'Evicted {removed} {self.entries}.'))
+
+        self.stdout.write(self.describe(cache, cache.stats()))
+
+    def get_cache(self):
+        raise NotImplementedError
+
+    # Text printed for the cache's stats
+    def describe(self, cache, stats):
+        raise NotImplementedError
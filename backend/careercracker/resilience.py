@@ -0,0 +1,195 @@
+# Circuit breakers and request deadlines for calls to upstream services (O*NET and OpenAI).
+# A breaker counts consecutive failures of one upstream. After CIRCUIT_BREAKER_FAILURE_THRESHOLD
+# of them it opens, and calls fail at once with CircuitOpenError instead of tying up a worker
+# on a service that is down. After CIRCUIT_BREAKER_RESET_TIMEOUT seconds one trial call is let
+# through: success closes the breaker, failure opens it again. Breakers are per process.
+# deadline_middleware gives each request REQUEST_DEADLINE seconds. Outbound calls shorten their
+# timeouts to what is left (remaining_timeout) and fail with DeadlineExceeded once it has passed.
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitOpenError(Exception):
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0  # Consecutive
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._changed_at = time.time()
+        self._stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    # Raises CircuitOpenError when the upstream should not be called right now.
+    # Returns True when the call is let through as the trial call.
+    def before_call(self):
+        with self._lock:
+            retry_in = self._retry_in(time.monotonic())
+            if retry_in:
+                self._stats['rejected'] += 1
+                raise CircuitOpenError(self.name, retry_in)
+            self._stats['calls'] += 1
+            if self._state == CLOSED:
+                return False
+            # Let this call through as the trial; the others wait for its outcome
+            self._set_state(HALF_OPEN)
+            self._probe_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._stats['failures'] += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._stats['opened'] += 1
+                self._set_state(OPEN)
+
+    # For a trial call that ended without showing whether the upstream is healthy (it was
+    # cancelled, or never sent): lets the next call through as the trial straight away
+    def abandon_trial(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_at = time.monotonic() - self.reset_timeout
+
+    # Seconds until a call would be let through (0 when it would be now)
+    def retry_in(self):
+        with self._lock:
+            return self._retry_in(time.monotonic())
+
+    def _retry_in(self, now):
+        if self._state == OPEN:
+            return max(0, self.reset_timeout - (now - self._opened_at))
+        if self._state == HALF_OPEN:
+            # A trial that never reported back (e.g. it was abandoned) is replaced after reset_timeout
+            return max(0, self.reset_timeout - (now - self._probe_at))
+        return 0
+
+    def _set_state(self, state):
+        previous, self._state = self._state, state
+        self._changed_at = time.time()
+        if state == OPEN and previous == HALF_OPEN:
+            logger.warning(f"Circuit breaker for {self.name} reopened: the trial call failed")
+        elif state == OPEN:
+            logger.warning(f"Circuit breaker for {self.name} opened after {self._failures} consecutive failures; "
+                           f"failing calls for {self.reset_timeout:.0f}s")
+        elif state == CLOSED:
+            logger.info(f"Circuit breaker for {self.name} closed: {self.name} is responding again")
+        else:
+            logger.info(f"Circuit breaker for {self.name} is letting a trial call through")
+
+    # State and counters for this process
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(
+                state=self._state,
+                consecutive_failures=self._failures,
+                state_changed_at=datetime.fromtimestamp(self._changed_at, timezone.utc),
+                retry_in=round(self._retry_in(time.monotonic()), 1),
+            )
+        return stats
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+# Returns the process-wide breaker for an upstream ('onet', 'openai'), configured from settings
+def get_breaker(name):
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(
+                    name,
+                    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                    reset_timeout=settings.CIRCUIT_BREAKER_RESET_TIMEOUT,
+                )
+    return breaker
+
+
+# Monotonic time by which the current request must be done, if any. Context variables follow
+# sync_to_async and asyncio tasks; code that hands work to its own threads copies the context.
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+# Limits the enclosed code to `seconds` (or less, if an outer deadline is sooner)
+@contextmanager
+def deadline(seconds):
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+# Seconds left before the deadline (negative once it has passed), or None without one
+def time_remaining():
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+# Shortens a timeout to the time left before the deadline; raises DeadlineExceeded once it has passed
+def remaining_timeout(timeout):
+    remaining = time_remaining()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("The request deadline passed before the call was made")
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+# Sets the REQUEST_DEADLINE for every request (0 turns it off). Streaming responses are
+# produced after the middleware returns, so they are not bound by it.
+def deadline_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not settings.REQUEST_DEADLINE:
+                return await get_response(request)
+            with deadline(settings.REQUEST_DEADLINE):
+                return await get_response(request)
+    else:
+        def middleware(request):
+            if not settings.REQUEST_DEADLINE:
+                return get_response(request)
+            with deadline(settings.REQUEST_DEADLINE):
+                return get_response(request)
+    return middleware
+
+deadline_middleware.sync_capable = True
+deadline_middleware.async_capable = True
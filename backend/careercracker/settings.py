@@ -39,6 +39,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'careercracker.resilience.deadline_middleware',
 ]
 
 ROOT_URLCONF = 'careercracker.urls'
@@ -55,6 +56,17 @@ DATABASES = {
     }
 }
 
+# Shared cache (LLM throttles). Without REDIS_URL every worker process keeps its own in-memory cache.
+REDIS_URL = os.getenv('REDIS_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -106,6 +118,63 @@ AUTHENTICATION_BACKENDS = [
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Upstream resilience (careercracker/resilience.py): per-request deadline and a circuit breaker per upstream
+REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', 30))  # Seconds every outbound call of a request must fit in (0 = off)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', 5))  # Consecutive failures that open a breaker
+CIRCUIT_BREAKER_RESET_TIMEOUT = float(os.getenv('CIRCUIT_BREAKER_RESET_TIMEOUT', 30))  # Seconds before a trial call is let through
+
+# LLM gateway (interviews/llm_gateway.py): one pooled client per process
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+OPENAI_QUESTION_MODEL = os.getenv('OPENAI_QUESTION_MODEL', OPENAI_MODEL)  # Question generation
+OPENAI_FEEDBACK_MODEL = os.getenv('OPENAI_FEEDBACK_MODEL', OPENAI_MODEL)  # Answer feedback
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 30))  # Seconds per call
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', 16))  # Completions in flight per process
+OPENAI_QUEUE_TIMEOUT = float(os.getenv('OPENAI_QUEUE_TIMEOUT', 10))  # Seconds to wait for a free slot
+
+# O*NET response cache (occupation data only changes a few times a year)
+ONET_CACHE_ENABLED = os.getenv('ONET_CACHE_ENABLED', 'True') == 'True'
+ONET_CACHE_TTL = int(os.getenv('ONET_CACHE_TTL', 60 * 60 * 24 * 30))  # 30 days
+ONET_CACHE_NEGATIVE_TTL = int(os.getenv('ONET_CACHE_NEGATIVE_TTL', 60 * 60 * 24))  # 1 day for "no occupation found"
+ONET_CACHE_MAX_ENTRIES = int(os.getenv('ONET_CACHE_MAX_ENTRIES', 5000))
+
+# O*NET HTTP transport (keep-alive connections per worker thread)
+ONET_CONNECT_TIMEOUT = float(os.getenv('ONET_CONNECT_TIMEOUT', 3.05))
+ONET_READ_TIMEOUT = float(os.getenv('ONET_READ_TIMEOUT', 10))
+ONET_MAX_RETRIES = int(os.getenv('ONET_MAX_RETRIES', 3))  # Retries on 429/5xx and network errors
+ONET_BACKOFF_FACTOR = float(os.getenv('ONET_BACKOFF_FACTOR', 0.5))  # Seconds; doubles on each retry
+
+# Cold-path question generation in StartInterview
+QUESTION_GENERATION_WORKERS = int(os.getenv('QUESTION_GENERATION_WORKERS', 8))  # Threads shared by all requests in a worker
+# LLM calls a batch is split into. 1 asks for every question in one completion (cheapest); N > 1 runs N
+# smaller completions in parallel, which returns sooner but resends the job context N times, multiplying
+# prompt tokens and the requests counted against OpenAI rate limits by N.
+QUESTION_GENERATION_FANOUT = int(os.getenv('QUESTION_GENERATION_FANOUT', 1))
+QUESTION_GENERATION_DEADLINE = float(os.getenv('QUESTION_GENERATION_DEADLINE', 15))  # Seconds before serving what is ready
+QUESTION_DEDUP_THRESHOLD = float(os.getenv('QUESTION_DEDUP_THRESHOLD', 0.7))  # Estimated similarity at which a new question is a duplicate (0 = off)
+QUESTION_SELECTION_STRATEGY = os.getenv('QUESTION_SELECTION_STRATEGY', 'thompson')  # 'thompson' (rating-aware) or 'uniform'
+
+# Answer feedback: async mode saves answers as PENDING and leaves the LLM call to the feedbackworker command
+FEEDBACK_ASYNC = os.getenv('FEEDBACK_ASYNC', 'False') == 'True'
+FEEDBACK_LONG_POLL_MAX = float(os.getenv('FEEDBACK_LONG_POLL_MAX', 25))  # Longest a feedback GET may wait
+FEEDBACK_LONG_POLL_INTERVAL = 0.5  # Seconds between status checks while long-polling
+FEEDBACK_BULK_MAX_ANSWERS = int(os.getenv('FEEDBACK_BULK_MAX_ANSWERS', 10))  # Answers per bulk submit (evaluated in one completion)
+
+# Feedback cache: reuse AI feedback for identical answers to the same question
+FEEDBACK_CACHE_POLICY = os.getenv('FEEDBACK_CACHE_POLICY', 'normalized')  # 'off', 'exact' or 'normalized'
+FEEDBACK_CACHE_MAX_ENTRIES = int(os.getenv('FEEDBACK_CACHE_MAX_ENTRIES', 50000))
+FEEDBACK_CACHE_MAX_ANSWER_CHARS = int(os.getenv('FEEDBACK_CACHE_MAX_ANSWER_CHARS', 500))  # Longer answers are never cached
+FEEDBACK_CACHE_MAX_AGE_DAYS = int(os.getenv('FEEDBACK_CACHE_MAX_AGE_DAYS', 90))
+FEEDBACK_CACHE_MAX_REUSE = int(os.getenv('FEEDBACK_CACHE_MAX_REUSE', 0))  # Regenerate after N reuses (0 = unlimited)
+
+# Token-bucket limits on endpoints that call the LLM (interviews/throttling.py), as "<tokens>/<period>"
+LLM_THROTTLE_ENABLED = os.getenv('LLM_THROTTLE_ENABLED', 'True') == 'True'
+LLM_THROTTLE_RATES = {  # Per user
+    'answer_feedback': os.getenv('LLM_THROTTLE_FEEDBACK_RATE', '30/min'),  # One token per answer evaluated
+    'question_generation': os.getenv('LLM_THROTTLE_GENERATION_RATE', '5/min'),  # One token per generation batch
+}
+LLM_THROTTLE_GLOBAL_RATE = os.getenv('LLM_THROTTLE_GLOBAL_RATE', '600/min')  # Shared by all users
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -141,6 +210,10 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': True,
         },
+        'careercracker': {
+            'handlers': ['console', 'file'],
+            'level': 'INFO',
+        },
     },
 }
 
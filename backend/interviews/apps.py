@@ -12,3 +12,15 @@ class InterviewsConfig(AppConfig):
     
     # This tells Django the name of the app so it can link everything correctly.
     name = 'interviews'
+
+    # Restores the SQLite full-text search triggers after migrations that rebuild the question table
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .search import repair_sqlite_search_index
+
+        post_migrate.connect(
+            lambda sender, using, **kwargs: repair_sqlite_search_index(using),
+            sender=self,
+            weak=False,
+            dispatch_uid='interviews.repair_sqlite_search_index'
+        )
@@ -0,0 +1,112 @@
+# Streaming exports of interview data for analytics (exportinterviews command and the admin export endpoint).
+# Rows are read with iterator(chunk_size), which uses a server-side cursor on PostgreSQL, and
+# rendered one line at a time, so memory stays flat however many rows are exported.
+# --since / ?since= exports rows created (or, for interviews, started or finished) at or after a time;
+# an interview can therefore show up again once it finishes, so consumers should upsert by id.
+
+import csv
+import json
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Interview, InterviewAnswer, InterviewFeedback, QuestionRating
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Per dataset: the model, its exported (column, field lookup) pairs and the timestamps --since filters on.
+# Only ids of related rows are exported, never usernames or emails.
+DATASETS = {
+    'interviews': {
+        'model': Interview,
+        'columns': [
+            ('id', 'id'), ('user_id', 'user_id'), ('interview_number', 'interview_number'),
+            ('job_title', 'job_title'), ('status', 'status'), ('start_time', 'start_time'),
+            ('end_time', 'end_time'), ('question_order', 'question_order'), ('question_cursor', 'question_cursor'),
+        ],
+        'since': ['start_time', 'end_time'],
+    },
+    'answers': {
+        'model': InterviewAnswer,
+        'columns': [
+            ('id', 'id'), ('interview_id', 'interview_id'), ('user_id', 'interview__user_id'),
+            ('question_id', 'question_id'), ('question_category', 'question__category'),
+            ('user_response', 'user_response'), ('ai_feedback', 'ai_feedback'),
+            ('feedback_status', 'feedback_status'), ('created_at', 'created_at'),
+        ],
+        'since': ['created_at'],
+    },
+    'ratings': {
+        'model': QuestionRating,
+        'columns': [
+            ('id', 'id'), ('user_id', 'user_id'), ('interview_id', 'interview_id'),
+            ('question_id', 'question_id'), ('rating', 'rating'), ('created_at', 'created_at'),
+        ],
+        'since': ['created_at'],
+    },
+    'feedback': {
+        'model': InterviewFeedback,
+        'columns': [
+            ('id', 'id'), ('interview_id', 'interview_id'), ('user_id', 'interview__user_id'),
+            ('rating', 'rating'), ('content', 'content'), ('created_at', 'created_at'),
+        ],
+        'since': ['created_at'],
+    },
+}
+
+
+# Parses an ISO date or datetime; dates mean midnight and naive values the current time zone
+def parse_since(value):
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date or datetime '{value}'")
+        since = datetime.combine(day, time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+def export_columns(dataset):
+    return [column for column, _ in DATASETS[dataset]['columns']]
+
+# Row tuples of a dataset in id order, fetched chunk_size at a time
+def export_rows(dataset, since=None, chunk_size=2000):
+    spec = DATASETS[dataset]
+    rows = spec['model'].objects.all()
+    if since is not None:
+        condition = Q()
+        for field in spec['since']:
+            condition |= Q(**{f'{field}__gte': since})
+        rows = rows.filter(condition)
+    lookups = [lookup for _, lookup in spec['columns']]
+    # Ordering by the primary key lets PostgreSQL stream an index scan instead of sorting everything first
+    return rows.order_by('id').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+# csv.writer wants a file; this one hands back each formatted line instead of storing it
+class _Echo:
+    def write(self, value):
+        return value
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+# Lines (header first for CSV) of the rendered export, one per row
+def render_lines(columns, rows, file_format):
+    if file_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
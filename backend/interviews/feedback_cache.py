@@ -0,0 +1,137 @@
+# Content-addressed cache for AI feedback on candidate answers.
+# Seeded questions get the same short answers over and over ("LIFO vs FIFO"), so feedback is
+# keyed by a hash of the question id, the normalized answer text, the model and the prompt
+# version, and reused instead of paying for another completion.
+
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+from careercracker.db_cache import DatabaseCache
+from .models import FeedbackCacheEntry
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('off', 'exact', 'normalized')
+# Part of every key; bumped when the key scheme changes so old entries can't be served for new keys
+# (2: punctuation is no longer dropped)
+KEY_VERSION = 2
+
+
+# Lowercases and collapses whitespace so trivially different answers share a key. Punctuation is
+# kept: "a < b" and "a > b", or "O(n)" and "O(n!)", are different answers.
+def normalize_answer(text):
+    return ' '.join(text.lower().split())
+
+
+class FeedbackCache(DatabaseCache):
+    model = FeedbackCacheEntry
+    label = 'Feedback cache'
+    counter_names = ('hits', 'misses', 'skipped', 'stores', 'evictions', 'errors')
+
+    def __init__(self, policy, max_entries, max_answer_chars, max_age_days, max_reuse, evict_every=100):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown feedback cache policy '{policy}', expected one of {POLICIES}")
+        super().__init__(max_entries, evict_every)
+        self.policy = policy  # 'off', 'exact' (trimmed text) or 'normalized'
+        self.max_answer_chars = max_answer_chars  # Long answers are effectively unique, so skip them
+        self.max_age_days = max_age_days  # Regenerate feedback older than this
+        self.max_reuse = max_reuse  # Regenerate after this many reuses (0 = unlimited)
+
+    def cacheable(self, answer_text):
+        return self.policy != 'off' and len(answer_text) <= self.max_answer_chars
+
+    def make_key(self, question_id, answer_text, model, prompt_version):
+        answer = normalize_answer(answer_text) if self.policy == 'normalized' else answer_text.strip()
+        raw = f"{KEY_VERSION}\x1f{question_id}\x1f{answer}\x1f{model}\x1f{prompt_version}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def expired(self):
+        return Q(created_at__lte=timezone.now() - timedelta(days=self.max_age_days))
+
+    # Returns cached feedback, or None when the answer must go to the LLM
+    def get(self, question_id, answer_text, model, prompt_version):
+        if not self.cacheable(answer_text):
+            self._count('skipped')
+            return None
+
+        entries = FeedbackCacheEntry.objects.filter(
+            key=self.make_key(question_id, answer_text, model, prompt_version),
+            created_at__gt=timezone.now() - timedelta(days=self.max_age_days)
+        )
+        if self.max_reuse:
+            entries = entries.filter(hits__lt=self.max_reuse)
+
+        try:
+            entry = entries.values('id', 'ai_feedback').first()
+            if entry is None:
+                self._count('misses')
+                return None
+            self.touch(entry['id'])
+        except DatabaseError as e:
+            logger.warning(f"Feedback cache read failed: {e}")
+            self._count('errors')
+            return None
+
+        self._count('hits')
+        return entry['ai_feedback']
+
+    def set(self, question_id, answer_text, model, prompt_version, feedback):
+        if not self.cacheable(answer_text) or not feedback:
+            return
+
+        try:
+            FeedbackCacheEntry.objects.update_or_create(
+                key=self.make_key(question_id, answer_text, model, prompt_version),
+                defaults={
+                    'question_id': question_id,
+                    'model': model,
+                    'prompt_version': prompt_version,
+                    'ai_feedback': feedback,
+                    'hits': 0,
+                    'created_at': timezone.now(),
+                    'last_used_at': timezone.now(),
+                }
+            )
+        except DatabaseError as e:
+            logger.warning(f"Feedback cache write failed: {e}")
+            self._count('errors')
+            return
+
+        self.stored()
+
+    # Every stored entry was a paid completion and every hit a saved one, so
+    # total_hits / (total_hits + entries) estimates the share of LLM spend avoided.
+    def stats(self):
+        counters = super().stats()
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_ratio'] = counters['hits'] / lookups if lookups else 0.0
+        served = counters['total_hits'] + counters['entries']
+        counters['total_hit_ratio'] = counters['total_hits'] / served if served else 0.0
+        return counters
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+# Returns the process-wide cache configured from settings
+def get_feedback_cache():
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = FeedbackCache(
+                    policy=settings.FEEDBACK_CACHE_POLICY,
+                    max_entries=settings.FEEDBACK_CACHE_MAX_ENTRIES,
+                    max_answer_chars=settings.FEEDBACK_CACHE_MAX_ANSWER_CHARS,
+                    max_age_days=settings.FEEDBACK_CACHE_MAX_AGE_DAYS,
+                    max_reuse=settings.FEEDBACK_CACHE_MAX_REUSE,
+                )
+    return _default_cache
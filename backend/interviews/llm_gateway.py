@@ -0,0 +1,177 @@
+# Process-wide gateway for every OpenAI call made by the interviews app.
+# It owns one pooled client per process (built once, reusing its HTTP connections),
+# caps the number of completions in flight with a global semaphore, and applies
+# the configured model, per-call timeout and retry policy.
+# Within a request, calls are held to the request deadline, and the OpenAI circuit breaker
+# fails them at once (CircuitOpenError) while OpenAI keeps failing.
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+import openai
+from django.conf import settings
+
+from careercracker.resilience import get_breaker, remaining_timeout, time_remaining
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean OpenAI is unhealthy, as opposed to rejecting a bad request
+UPSTREAM_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class LLMBusyError(Exception):
+    pass
+
+
+class LLMGateway:
+
+    def __init__(self, api_key, model, timeout, max_retries, max_concurrency, queue_timeout, breaker=None):
+        self.model = model
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker
+        self._api_key = api_key
+        self._max_retries = max_retries
+        # The SDK retries connection errors, 408/409/429 and 5xx responses with exponential backoff
+        self._client = openai.OpenAI(api_key=api_key, timeout=timeout, max_retries=max_retries)
+        # Shares the connection pool; used when the request deadline leaves no time for retries
+        self._single_try_client = self._client.with_options(max_retries=0)
+        # httpx async clients are bound to the event loop that created them
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    # Runs a chat completion and returns the reply text
+    def complete(self, messages, model=None, max_tokens=150, temperature=0.7, timeout=None, **kwargs):
+        timeout = remaining_timeout(timeout or self.timeout)
+        trial = self._before_call()
+        try:
+            self._acquire()
+        except BaseException as e:
+            self._record(e, trial)
+            raise
+        started = time.monotonic()
+        try:
+            completion = self._client_within_deadline(timeout).chat.completions.create(
+                model=model or self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=remaining_timeout(timeout),
+                **kwargs
+            )
+        except BaseException as e:
+            self._record(e, trial)
+            raise
+        finally:
+            self._semaphore.release()
+            logger.debug(f"LLM completion took {(time.monotonic() - started) * 1000:.0f}ms")
+
+        self._record(None, trial)
+        return completion.choices[0].message.content.strip()
+
+    # Streams a chat completion, yielding text fragments as they arrive
+    async def stream(self, messages, model=None, max_tokens=150, temperature=0.7, timeout=None, **kwargs):
+        timeout = remaining_timeout(timeout or self.timeout)
+        trial = self._before_call()
+        # Waiting for a slot blocks, so do it off the event loop. The wait is shielded: if this task
+        # is cancelled meanwhile, the slot can still be granted afterwards and is handed back then.
+        acquiring = asyncio.get_running_loop().run_in_executor(None, self._acquire)
+        acquired = responded = False
+        try:
+            await asyncio.shield(acquiring)
+            acquired = True
+            stream = await self._async_client().chat.completions.create(
+                model=model or self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                timeout=timeout,
+                stream=True,
+                **kwargs
+            )
+            responded = True
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except BaseException as e:
+            # Being cancelled or closed by the consumer once OpenAI has answered still shows it is healthy
+            self._record(None if responded and not isinstance(e, Exception) else e, trial)
+            raise
+        else:
+            self._record(None, trial)
+        finally:
+            if acquired:
+                self._semaphore.release()
+            else:
+                acquiring.add_done_callback(self._release_late_slot)
+
+    def _acquire(self):
+        queue_timeout = remaining_timeout(self.queue_timeout)
+        if not self._semaphore.acquire(timeout=queue_timeout):
+            raise LLMBusyError(f"No LLM capacity available within {queue_timeout:.1f}s")
+
+    # Releases a slot acquired for a stream that stopped waiting for it
+    def _release_late_slot(self, acquiring):
+        if not acquiring.cancelled() and acquiring.exception() is None:
+            self._semaphore.release()
+
+    # Returns True when the breaker lets the call through as its trial call
+    def _before_call(self):
+        if self.breaker is not None:
+            return self.breaker.before_call()
+        return False
+
+    # Reports the outcome of a call to the breaker. Errors that are not about OpenAI's health are
+    # left out, except that a trial call ending that way (busy, cancelled, out of time) hands the
+    # trial on, so the breaker can't stay half-open waiting for it
+    def _record(self, error, trial):
+        if self.breaker is None:
+            return
+        if error is None or (isinstance(error, openai.APIStatusError) and not isinstance(error, UPSTREAM_ERRORS)):
+            self.breaker.record_success()
+        elif isinstance(error, UPSTREAM_ERRORS):
+            self.breaker.record_failure()
+        elif trial:
+            self.breaker.abandon_trial()
+
+    # The SDK's retries are only worth making when they can all finish before the deadline
+    def _client_within_deadline(self, timeout):
+        remaining = time_remaining()
+        if remaining is not None and timeout * (self._max_retries + 1) > remaining:
+            return self._single_try_client
+        return self._client
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = openai.AsyncOpenAI(api_key=self._api_key, timeout=self.timeout, max_retries=self._max_retries)
+                self._async_clients[loop] = client
+        return client
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+# Returns the process-wide gateway configured from settings
+def get_llm_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(
+                    api_key=settings.OPENAI_API_KEY,
+                    model=settings.OPENAI_MODEL,
+                    timeout=settings.OPENAI_TIMEOUT,
+                    max_retries=settings.OPENAI_MAX_RETRIES,
+                    max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+                    queue_timeout=settings.OPENAI_QUEUE_TIMEOUT,
+                    breaker=get_breaker('openai'),
+                )
+    return _gateway
@@ -0,0 +1,95 @@
+from itertools import groupby
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from interviews.models import CSQuestion, Interview, InterviewAnswer, QuestionLSHBucket, QuestionRating
+from interviews.similarity import LSHIndex, signature
+
+class Command(BaseCommand):
+    help = ('Find near-duplicate questions within each job title pool and point them at the oldest matching '
+            'question (duplicate_of), so they are no longer served; --delete removes the ones no interview uses')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=None, help='Estimated similarity at which questions are duplicates (default: QUESTION_DEDUP_THRESHOLD)')
+        parser.add_argument('--delete', action='store_true', help='Delete duplicates that no interview, answer or rating refers to')
+        parser.add_argument('--dry-run', action='store_true', help='Report duplicates without changing anything')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows read and written per query')
+
+    def handle(self, *args, **options):
+        threshold = options['threshold'] or settings.QUESTION_DEDUP_THRESHOLD
+        batch_size = options['batch_size']
+
+        if not options['dry_run']:
+            signed = self.backfill_signatures(batch_size)
+            if signed:
+                self.stdout.write(f'Signed {signed} questions without a MinHash signature.')
+
+        duplicates = self.find_duplicates(threshold, batch_size)
+        for question_id, original_id, score in duplicates:
+            self.stdout.write(f'Question {question_id} duplicates {original_id} ({score:.0%} similar)', self.style.WARNING)
+
+        if options['dry_run']:
+            self.stdout.write(f'Found {len(duplicates)} near-duplicate questions (dry run, nothing changed).')
+            return
+
+        with transaction.atomic():
+            for start in range(0, len(duplicates), batch_size):
+                CSQuestion.objects.bulk_update([
+                    CSQuestion(id=question_id, duplicate_of_id=original_id)
+                    for question_id, original_id, _ in duplicates[start:start + batch_size]
+                ], ['duplicate_of'])
+        self.stdout.write(self.style.SUCCESS(f'Marked {len(duplicates)} near-duplicate questions.'))
+
+        if options['delete']:
+            deleted = self.delete_unused_duplicates()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} unused duplicate questions.'))
+
+    # Signs questions written without going through the model (raw SQL, fixtures) and indexes them
+    def backfill_signatures(self, batch_size):
+        signed = 0
+        while True:
+            batch = list(CSQuestion.objects.filter(minhash__isnull=True).only(
+                'id', 'question_text', 'job_title_key', 'duplicate_of'
+            )[:batch_size])
+            if not batch:
+                return signed
+            for question in batch:
+                question.minhash = signature(question.question_text)
+            with transaction.atomic():
+                CSQuestion.objects.bulk_update(batch, ['minhash'])
+                QuestionLSHBucket.rebuild_for(batch)
+            signed += len(batch)
+
+    # Sweeps each pool oldest-first through an in-memory LSH index; a question that matches an
+    # earlier canonical question becomes its duplicate. Returns (id, original id, similarity).
+    def find_duplicates(self, threshold, batch_size):
+        rows = (
+            CSQuestion.objects.filter(duplicate_of__isnull=True, minhash__isnull=False)
+            .order_by('job_title_key', 'id')
+            .values_list('job_title_key', 'id', 'minhash')
+            .iterator(chunk_size=batch_size)
+        )
+
+        duplicates = []
+        for _, pool in groupby(rows, key=lambda row: row[0]):
+            index = LSHIndex()
+            for _, question_id, sig in pool:
+                match = index.match(sig, threshold)
+                if match is None:
+                    index.add(question_id, sig)
+                else:
+                    duplicates.append((question_id, match[0], match[1]))
+        return duplicates
+
+    # Duplicates that appear in past interviews are kept (marked) so transcripts stay intact
+    def delete_unused_duplicates(self):
+        unused = (
+            CSQuestion.objects.filter(duplicate_of__isnull=False)
+            .exclude(id__in=InterviewAnswer.objects.values('question_id'))
+            .exclude(id__in=QuestionRating.objects.values('question_id'))
+            .exclude(id__in=Interview.questions.through.objects.values('csquestion_id'))
+        )
+        _, deleted = unused.delete()
+        return deleted.get(CSQuestion._meta.label, 0)
@@ -0,0 +1,133 @@
+import random
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from interviews.models import CSQuestion, Interview, InterviewAnswer, QuestionLSHBucket, QuestionRating
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = ('Run EXPLAIN on the hot interview queries against a seeded database and fail if any of them '
+            'falls back to a sequential scan (the seed data is rolled back afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Users to seed')
+        parser.add_argument('--interviews', type=int, default=20, help='Interviews to seed per user')
+        parser.add_argument('--no-seed', action='store_true', help='Explain against the existing data instead of seeding')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just the flagged ones')
+
+    def handle(self, *args, **options):
+        self.options = options
+        try:
+            with transaction.atomic():
+                if not options['no_seed']:
+                    self.seed(options['users'], options['interviews'])
+                flagged = self.explain_all()
+                raise Rollback()
+        except Rollback:
+            pass
+
+        if flagged:
+            raise CommandError(f"Sequential scans in: {', '.join(flagged)}")
+        self.stdout.write(self.style.SUCCESS('Every hot query uses an index.'))
+
+    # Bulk-inserts enough rows that the planner has a reason to prefer an index
+    def seed(self, user_count, interviews_per_user):
+        users = User.objects.bulk_create([
+            User(username=f'explain-{i}-{random.getrandbits(32)}') for i in range(user_count)
+        ])
+        questions = CSQuestion.objects.bulk_create([
+            CSQuestion(question_text=f'Seed question {i}?', job_title=f'role {i % 20}', category='NUL')
+            for i in range(200)
+        ])
+
+        interviews = Interview.objects.bulk_create([
+            Interview(user=user, job_title='role 0', interview_number=n + 1,
+                      status='COMPLETED' if n else 'IN_PROGRESS')
+            for user in users for n in range(interviews_per_user)
+        ])
+        answers, ratings = [], []
+        statuses = ['READY'] * 90 + ['PENDING'] * 6 + ['PROCESSING'] * 3 + ['FAILED']
+        for interview in interviews:
+            for question in random.sample(questions, 5):
+                answers.append(InterviewAnswer(interview=interview, question=question, user_response='Seed answer',
+                                               feedback_status=random.choice(statuses)))
+                ratings.append(QuestionRating(user_id=interview.user_id, question=question, interview=interview, rating='LIKE'))
+        InterviewAnswer.objects.bulk_create(answers)
+        QuestionRating.objects.bulk_create(ratings)
+
+        if connection.vendor in ('postgresql', 'sqlite'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(f'Seeded {len(interviews)} interviews and {len(answers)} answers.')
+
+    # The querysets the interview views run on every request, shaped the same way
+    def hot_queries(self):
+        interview = Interview.objects.order_by('id').first()
+        if interview is None:
+            raise CommandError('No interviews to explain against; drop --no-seed')
+        user = interview.user
+        question_id = InterviewAnswer.objects.filter(interview=interview).values_list('question_id', flat=True).first()
+        page = list(Interview.objects.filter(user=user).values_list('id', flat=True)[:12])
+
+        return [
+            ('history page', Interview.objects.filter(
+                user=user, status__in=['IN_PROGRESS', 'COMPLETED']).order_by('-start_time', '-id')[:13]),
+            ('history cursor', Interview.objects.filter(user=user, status__in=['IN_PROGRESS', 'COMPLETED']).filter(
+                Q(start_time__lt=interview.start_time) | Q(start_time=interview.start_time, id__lt=interview.id)
+            ).order_by('-start_time', '-id')[:13]),
+            ('latest in-progress interview', Interview.objects.filter(
+                user=user, status='IN_PROGRESS').order_by('-start_time')[:1]),
+            ('answers for interview', InterviewAnswer.objects.filter(interview=interview)),
+            ('answered question', InterviewAnswer.objects.filter(interview=interview, question_id=question_id)),
+            ('answers for page', InterviewAnswer.objects.filter(interview_id__in=page)),
+            ('ratings for page', QuestionRating.objects.filter(user=user, interview_id__in=page)),
+            ('question rating', QuestionRating.objects.filter(user=user, question_id=question_id, interview=interview)),
+            ('question pool', CSQuestion.objects.filter(
+                job_title_key=CSQuestion.normalize_job_title('role 0'), duplicate_of__isnull=True
+            ).values_list('id', 'stats__likes', 'stats__dislikes')),
+            ('near-duplicate buckets', QuestionLSHBucket.objects.filter(
+                job_title_key=CSQuestion.normalize_job_title('role 0'), bucket__in=['0' * 16, 'f' * 16])),
+            ('pending feedback', InterviewAnswer.objects.filter(
+                Q(feedback_status='PENDING') | Q(feedback_status='PROCESSING', feedback_claimed_at__lt=timezone.now())
+            ).order_by('created_at')[:20]),
+        ]
+
+    def explain_all(self):
+        if connection.vendor == 'postgresql':
+            # Tiny tables are cheaper to scan; this makes the planner use an index whenever one applies
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        flagged = []
+        for name, queryset in self.hot_queries():
+            plan = queryset.explain()
+            scans = self.sequential_scans(plan)
+            if scans:
+                flagged.append(name)
+                self.stdout.write(self.style.ERROR(f'SEQ SCAN  {name}: {"; ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok        {name}'))
+            if scans or self.options['verbose_plans']:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+        return flagged
+
+    # Plan lines that read a whole table rather than an index range
+    @staticmethod
+    def sequential_scans(plan):
+        scans = []
+        for line in plan.splitlines():
+            line = re.sub(r'^[\d\s|`>-]*', '', line)  # Drop SQLite's id columns and tree drawing
+            if connection.vendor == 'postgresql' and 'Seq Scan' in line:
+                scans.append(line)
+            elif connection.vendor == 'sqlite' and line.startswith('SCAN ') and 'INDEX' not in line:
+                scans.append(line)
+            elif connection.vendor == 'mysql' and "'ALL'" in line:
+                scans.append(line)
+        return scans
@@ -0,0 +1,17 @@
+from careercracker.db_cache import CacheCommand
+from interviews.feedback_cache import get_feedback_cache
+
+class Command(CacheCommand):
+    help = 'Show hit statistics for the AI feedback cache, or purge/clear it'
+    entries = 'cached feedback entries'
+
+    def get_cache(self):
+        return get_feedback_cache()
+
+    def describe(self, cache, stats):
+        return (
+            f"Policy: {cache.policy}\n"
+            f"Entries (paid completions): {stats['entries']}\n"
+            f"Reuses (completions avoided): {stats['total_hits']}\n"
+            f"Hit ratio: {stats['total_hit_ratio']:.1%}"
+        )
@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from careercracker.resilience import CircuitOpenError, get_breaker
+from interviews.llm_gateway import LLMBusyError
+from interviews.models import InterviewAnswer
+from interviews.utils import getAnswerFeedback
+
+class Command(BaseCommand):
+    help = 'Fill in AI feedback for answers submitted in async mode (polls the database for PENDING answers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Answers claimed per poll')
+        parser.add_argument('--concurrency', type=int, default=4, help='Feedback requests in flight at once')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when there is nothing to do')
+        parser.add_argument('--stale-after', type=int, default=300, help='Reclaim answers stuck in PROCESSING for this many seconds')
+        parser.add_argument('--max-attempts', type=int, default=3, help='Mark an answer FAILED after this many attempts')
+        parser.add_argument('--once', action='store_true', help='Process the current backlog once and exit')
+
+    def handle(self, *args, **options):
+        self.options = options
+        try:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                while True:
+                    # Leave answers PENDING while OpenAI's circuit breaker is open
+                    paused = get_breaker('openai').retry_in()
+                    if paused:
+                        if options['once']:
+                            self.stderr.write('OpenAI is unavailable (circuit open), leaving the backlog for later.')
+                            break
+                        time.sleep(min(paused, options['poll_interval']))
+                        continue
+                    claimed = self.claim_batch()
+                    if claimed:
+                        list(executor.map(self.process, claimed))
+                        continue
+                    if options['once']:
+                        break
+                    close_old_connections()
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping feedback worker.')
+
+    # Claims answers with a conditional UPDATE per row, so several workers can poll the same table safely.
+    # Returns (answer id, claim time) pairs; the claim time tells this claim apart from a later reclaim.
+    def claim_batch(self):
+        now = timezone.now()
+        claimable = Q(feedback_status="PENDING") | Q(
+            feedback_status="PROCESSING",
+            feedback_claimed_at__lt=now - timedelta(seconds=self.options['stale_after'])
+        )
+
+        candidate_ids = list(
+            InterviewAnswer.objects.filter(claimable)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:self.options['batch_size']]
+        )
+
+        claimed = []
+        for answer_id in candidate_ids:
+            won = InterviewAnswer.objects.filter(claimable, id=answer_id).update(
+                feedback_status="PROCESSING",
+                feedback_claimed_at=now,
+                feedback_attempts=F('feedback_attempts') + 1
+            )
+            if won:
+                claimed.append((answer_id, now))
+        return claimed
+
+    def process(self, claim):
+        answer_id, claimed_at = claim
+        close_old_connections()
+        # Results are only written while the claim is still ours; a worker that took too long
+        # must not overwrite the answer after another one reclaimed it as stale
+        owned = InterviewAnswer.objects.filter(id=answer_id, feedback_status="PROCESSING", feedback_claimed_at=claimed_at)
+        try:
+            answer = InterviewAnswer.objects.select_related('question').get(id=answer_id)
+            try:
+                feedback = getAnswerFeedback(answer.question, answer.user_response)
+            except (CircuitOpenError, LLMBusyError) as e:
+                # Not the answer's fault: hand it back without using up an attempt
+                owned.update(feedback_status="PENDING", feedback_attempts=F('feedback_attempts') - 1)
+                self.stderr.write(f'Feedback for answer {answer_id} postponed: {e}')
+                return
+            except Exception as e:
+                failed = answer.feedback_attempts >= self.options['max_attempts']
+                owned.update(feedback_status="FAILED" if failed else "PENDING")
+                self.stderr.write(f'Feedback for answer {answer_id} failed (attempt {answer.feedback_attempts}): {e}')
+                return
+
+            if owned.update(ai_feedback=feedback, feedback_status="READY"):
+                self.stdout.write(f'Feedback ready for answer {answer_id}')
+            else:
+                self.stderr.write(f'Feedback for answer {answer_id} dropped: the answer was reclaimed or deleted')
+        except InterviewAnswer.DoesNotExist:
+            self.stderr.write(f'Answer {answer_id} was deleted before its feedback was generated, skipping')
+        except DatabaseError as e:
+            # The answer stays PROCESSING and is reclaimed once it goes stale
+            self.stderr.write(f'Database error on answer {answer_id}, leaving it for a later attempt: {e}')
+        finally:
+            close_old_connections()
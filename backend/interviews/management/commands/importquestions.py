@@ -0,0 +1,157 @@
+import csv
+import gzip
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from interviews.models import CSQuestion
+
+CATEGORIES = {code for code, _ in CSQuestion.CATEGORY_CHOICES}
+FORMATS = ('jsonl', 'csv')
+ERRORS_SHOWN = 10
+
+class InvalidRow(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = ('Stream questions from a JSONL or CSV file (optionally gzipped) into the question bank in chunks. '
+            'Rows need question_text and may set category, difficulty and job_title; exact repeats of stored '
+            'questions are skipped through the content_hash constraint. Run dedupequestions afterwards to '
+            'catch paraphrases.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import (.jsonl, .csv, optionally .gz)')
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: taken from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows validated and inserted per transaction')
+        parser.add_argument('--job-title', default=None, help='Job title for rows that have none')
+        parser.add_argument('--defer-signatures', action='store_true',
+                            help='Skip MinHash signing and LSH bucketing (most of the cost of an import); '
+                                 'the next dedupequestions run signs and indexes the new questions')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or self.detect_format(path)
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        inserted = duplicates = invalid = 0
+        errors = []
+        started = time.monotonic()
+        try:
+            with self.open(path) as source:
+                rows = self.read_jsonl(source) if file_format == 'jsonl' else self.read_csv(source)
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    questions = []
+                    for line_number, row in chunk:
+                        try:
+                            questions.append(self.build_question(row, options['job_title']))
+                        except InvalidRow as e:
+                            invalid += 1
+                            if len(errors) < ERRORS_SHOWN:
+                                errors.append(f'Line {line_number}: {e}')
+                    with transaction.atomic():
+                        created = CSQuestion.objects.bulk_create(
+                            questions, ignore_conflicts=True, sign=not options['defer_signatures']
+                        )
+                    chunk_inserted = sum(1 for question in created if question.pk)
+                    inserted += chunk_inserted
+                    duplicates += len(questions) - chunk_inserted
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'{inserted + duplicates + invalid} rows read...')
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        for error in errors:
+            self.stderr.write(error)
+        if invalid > len(errors):
+            self.stderr.write(f'... and {invalid - len(errors)} more invalid rows')
+
+        if options['defer_signatures'] and inserted:
+            self.stdout.write('Signatures deferred: run dedupequestions to index the new questions for near-duplicate checks.')
+
+        elapsed = time.monotonic() - started
+        total = inserted + duplicates + invalid
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {inserted} questions, skipped {duplicates} duplicates and {invalid} invalid rows '
+            f'({total} rows in {elapsed:.1f}s, {total / max(elapsed, 1e-9):.0f} rows/s).'
+        ))
+
+    def detect_format(self, path):
+        name = path[:-3] if path.endswith('.gz') else path
+        if name.endswith(('.jsonl', '.ndjson', '.json')):
+            return 'jsonl'
+        if name.endswith('.csv'):
+            return 'csv'
+        raise CommandError(f'Cannot tell the format of {path}; pass --format ({" or ".join(FORMATS)})')
+
+    def open(self, path):
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rt', encoding='utf-8', newline='')
+        return open(path, encoding='utf-8', newline='')
+
+    # Both readers yield (line number, row dict) one row at a time, so memory doesn't grow with the file
+    def read_jsonl(self, source):
+        for line_number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = InvalidRow(f'invalid JSON ({e})')
+            yield line_number, row
+
+    def read_csv(self, source):
+        reader = csv.DictReader(source)
+        if reader.fieldnames is None or 'question_text' not in reader.fieldnames:
+            raise CommandError('The CSV header must include a question_text column')
+        for row in reader:
+            yield reader.line_num, row
+
+    # Validates a row and returns the unsaved question; raises InvalidRow with the reason otherwise
+    def build_question(self, row, default_job_title):
+        if isinstance(row, InvalidRow):
+            raise row
+        if not isinstance(row, dict):
+            raise InvalidRow('expected an object')
+
+        question_text = row.get('question_text')
+        if not isinstance(question_text, str) or not question_text.strip():
+            raise InvalidRow('question_text is required')
+
+        category = row.get('category') or 'NUL'
+        if not isinstance(category, str) or category.strip().upper() not in CATEGORIES:
+            raise InvalidRow(f'category must be one of {", ".join(sorted(CATEGORIES))}')
+
+        difficulty = row.get('difficulty')
+        if difficulty in (None, ''):
+            difficulty = 1
+        try:
+            if isinstance(difficulty, bool) or (isinstance(difficulty, float) and not difficulty.is_integer()):
+                raise ValueError
+            difficulty = int(difficulty)
+        except (TypeError, ValueError):
+            raise InvalidRow('difficulty must be a whole number')
+        if not 1 <= difficulty <= 5:
+            raise InvalidRow('difficulty must be between 1 and 5')
+
+        job_title = row.get('job_title') or default_job_title
+        if job_title is not None:
+            if not isinstance(job_title, str):
+                raise InvalidRow('job_title must be text')
+            job_title = job_title.strip() or None
+            if job_title and len(job_title) > 255:
+                raise InvalidRow('job_title is longer than 255 characters')
+
+        return CSQuestion(
+            question_text=question_text.strip(),
+            category=category.strip().upper(),
+            difficulty=difficulty,
+            job_title=job_title,
+        )
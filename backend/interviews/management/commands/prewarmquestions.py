@@ -0,0 +1,108 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import Count
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from interviews.models import CSQuestion, Interview
+from interviews.utils import createCSQuestionBatch
+
+class Command(BaseCommand):
+    help = 'Keep a minimum pool of generated CS questions for every active job title'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--low', type=int, default=20, help='Refill a job title once its pool drops below this many questions')
+        parser.add_argument('--high', type=int, default=40, help='Refill a job title up to this many questions')
+        parser.add_argument('--batch-size', type=int, default=10, help='Questions requested per LLM call')
+        parser.add_argument('--concurrency', type=int, default=4, help='Maximum number of generation calls in flight')
+        parser.add_argument('--interval', type=float, default=300, help='Seconds between passes')
+        parser.add_argument('--jitter', type=float, default=0.2, help='Randomize the interval by +/- this fraction')
+        parser.add_argument('--recent-days', type=int, default=30, help='Interviews started within this many days mark a job title as active')
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit')
+
+    def handle(self, *args, **options):
+        if options['low'] > options['high']:
+            raise CommandError('--low must not be greater than --high')
+
+        try:
+            while True:
+                self.run_pass(options)
+                if options['once']:
+                    break
+
+                jitter = options['jitter']
+                delay = options['interval'] * random.uniform(1 - jitter, 1 + jitter)
+                self.stdout.write(f'Next pass in {delay:.0f}s')
+                close_old_connections()
+                time.sleep(delay)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping question prewarmer.')
+
+    # Job titles users are targeting or have recently interviewed for, normalized like generated questions
+    def active_job_titles(self, recent_days):
+        since = timezone.now() - timedelta(days=recent_days)
+        profile_titles = UserProfile.objects.exclude(target_job_title__isnull=True).values_list('target_job_title', flat=True)
+        interview_titles = Interview.objects.filter(
+            start_time__gte=since,
+            job_title__isnull=False
+        ).values_list('job_title', flat=True)
+
+        titles = {CSQuestion.normalize_job_title(title) for title in profile_titles.distinct()}
+        titles |= {CSQuestion.normalize_job_title(title) for title in interview_titles.distinct()}
+        titles.discard('')
+        return titles
+
+    # Works out how many questions each active title is missing, then refills them concurrently
+    def run_pass(self, options):
+        titles = self.active_job_titles(options['recent_days'])
+        pool_sizes = dict(
+            CSQuestion.objects.filter(job_title_key__in=list(titles), duplicate_of__isnull=True)
+            .values('job_title_key')
+            .annotate(total=Count('id'))
+            .values_list('job_title_key', 'total')
+        )
+
+        batches = []
+        for title in sorted(titles):
+            size = pool_sizes.get(title, 0)
+            if size >= options['low']:
+                continue
+            missing = options['high'] - size
+            while missing > 0:
+                batch = min(missing, options['batch_size'])
+                batches.append((title, batch))
+                missing -= batch
+
+        if not batches:
+            self.stdout.write(f'All {len(titles)} active job titles have at least {options["low"]} questions.')
+            return
+
+        created = 0
+        shortfall = 0
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            futures = {executor.submit(self.generate, title, count): title for title, count in batches}
+            for future in as_completed(futures):
+                try:
+                    questions, short = future.result()
+                    created += len(questions)
+                    shortfall += short
+                except Exception as e:
+                    self.stderr.write(f'Failed to generate questions for "{futures[future]}": {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {created} questions across {len({title for title, _ in batches})} job titles '
+            f'({shortfall} short of target).'
+        ))
+
+    # Each pool thread gets its own DB connection, closed once the batch is saved
+    def generate(self, title, count):
+        close_old_connections()
+        try:
+            return createCSQuestionBatch(job_title=title, count=count)
+        finally:
+            close_old_connections()
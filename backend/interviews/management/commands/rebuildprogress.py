@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from interviews.progress import rebuild_progress
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user progress rollups (UserProgress) from the interview history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Only rebuild this user id (repeatable)')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_progress(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt progress for {rebuilt} users.'))
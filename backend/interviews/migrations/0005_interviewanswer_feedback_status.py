@@ -0,0 +1,33 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0004_interviewfeedback_questionrating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewanswer',
+            name='feedback_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interviewanswer',
+            name='feedback_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='interviewanswer',
+            name='feedback_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], db_index=True, default='READY', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='interviewanswer',
+            name='ai_feedback',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
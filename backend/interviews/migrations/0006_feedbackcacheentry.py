@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0005_interviewanswer_feedback_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model', models.CharField(max_length=100)),
+                ('prompt_version', models.PositiveSmallIntegerField()),
+                ('ai_feedback', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='interviews.csquestion')),
+            ],
+        ),
+    ]
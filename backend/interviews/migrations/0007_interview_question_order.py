@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0006_feedbackcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interview',
+            name='question_cursor',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interview',
+            name='question_order',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
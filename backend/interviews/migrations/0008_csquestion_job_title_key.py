@@ -0,0 +1,33 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+# Same normalization as CSQuestion.normalize_job_title (historical models don't carry model methods)
+def backfill_job_title_key(apps, schema_editor):
+    CSQuestion = apps.get_model('interviews', 'CSQuestion')
+    batch = []
+    for question in CSQuestion.objects.exclude(job_title__isnull=True).only('id', 'job_title').iterator(chunk_size=2000):
+        question.job_title_key = ' '.join(question.job_title.split()).lower()
+        batch.append(question)
+        if len(batch) >= 2000:
+            CSQuestion.objects.bulk_update(batch, ['job_title_key'])
+            batch = []
+    if batch:
+        CSQuestion.objects.bulk_update(batch, ['job_title_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0007_interview_question_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csquestion',
+            name='job_title_key',
+            field=models.CharField(db_index=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(backfill_job_title_key, migrations.RunPython.noop),
+    ]
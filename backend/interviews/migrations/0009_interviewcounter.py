@@ -0,0 +1,35 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Seeds one counter per user with the highest interview number they already have
+def backfill_counters(apps, schema_editor):
+    Interview = apps.get_model('interviews', 'Interview')
+    InterviewCounter = apps.get_model('interviews', 'InterviewCounter')
+    last_numbers = Interview.objects.values('user_id').annotate(last=models.Max('interview_number'))
+    InterviewCounter.objects.bulk_create([
+        InterviewCounter(user_id=row['user_id'], last_number=row['last'] or 0)
+        for row in last_numbers
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('interviews', '0008_csquestion_job_title_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
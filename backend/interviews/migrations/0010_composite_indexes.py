@@ -0,0 +1,38 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0009_interviewcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='interviewanswer',
+            name='feedback_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='READY', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['user', 'status', '-start_time'], name='interview_user_status_start'),
+        ),
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['user', '-start_time', '-id'], name='interview_user_start_id'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewanswer',
+            index=models.Index(fields=['interview', 'question'], name='answer_interview_question'),
+        ),
+        migrations.AddIndex(
+            model_name='interviewanswer',
+            index=models.Index(fields=['feedback_status', 'created_at'], name='answer_status_created'),
+        ),
+        migrations.AddIndex(
+            model_name='questionrating',
+            index=models.Index(fields=['user', 'interview'], name='rating_user_interview'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:39
+
+import hashlib
+import random
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Frozen copy of the MinHash scheme in interviews/similarity.py as of this migration, so the
+# backfill gives the same result however that module changes later
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    text = ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def signature(text):
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big') for shingle in shingles(text)]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+def band_buckets(sig):
+    return [
+        (band, hashlib.blake2b(repr(sig[band * ROWS:(band + 1) * ROWS]).encode(), digest_size=8).hexdigest())
+        for band in range(BANDS)
+    ]
+
+
+# Signs every existing question and fills its LSH buckets; marking duplicates is left to dedupequestions
+def backfill_signatures(apps, schema_editor):
+    CSQuestion = apps.get_model('interviews', 'CSQuestion')
+    QuestionLSHBucket = apps.get_model('interviews', 'QuestionLSHBucket')
+    questions, buckets = [], []
+    for question in CSQuestion.objects.only('id', 'question_text', 'job_title_key').iterator(chunk_size=2000):
+        question.minhash = signature(question.question_text)
+        questions.append(question)
+        buckets.extend(
+            QuestionLSHBucket(question_id=question.id, job_title_key=question.job_title_key, band=band, bucket=bucket)
+            for band, bucket in band_buckets(question.minhash)
+        )
+        if len(questions) >= 2000:
+            CSQuestion.objects.bulk_update(questions, ['minhash'])
+            QuestionLSHBucket.objects.bulk_create(buckets, batch_size=2000)
+            questions, buckets = [], []
+    if questions:
+        CSQuestion.objects.bulk_update(questions, ['minhash'])
+        QuestionLSHBucket.objects.bulk_create(buckets, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0010_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csquestion',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='interviews.csquestion'),
+        ),
+        migrations.AddField(
+            model_name='csquestion',
+            name='minhash',
+            field=models.JSONField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='QuestionLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_title_key', models.CharField(max_length=255, null=True)),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.CharField(max_length=16)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='interviews.csquestion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job_title_key', 'bucket', 'band'], name='lsh_pool_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+
+# Full-text search structures for CSQuestion.question_text, created per database vendor: a generated
+# tsvector column with a GIN index on PostgreSQL, an external-content FTS5 table kept in sync by
+# triggers on SQLite (when built with FTS5), nothing elsewhere. Frozen here rather than imported from
+# interviews/search.py, so the migration does the same thing however that module changes later.
+
+POSTGRESQL_CREATE = [
+    """
+    ALTER TABLE interviews_csquestion ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(question_text, ''))) STORED
+    """,
+    "CREATE INDEX interviews_csquestion_search_gin ON interviews_csquestion USING GIN (search_vector)",
+]
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS interviews_csquestion_search_gin",
+    "ALTER TABLE interviews_csquestion DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS interviews_csquestion_fts USING fts5(
+        question_text, content='interviews_csquestion', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS interviews_csquestion_fts_insert AFTER INSERT ON interviews_csquestion BEGIN
+        INSERT INTO interviews_csquestion_fts(rowid, question_text) VALUES (new.id, new.question_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS interviews_csquestion_fts_delete AFTER DELETE ON interviews_csquestion BEGIN
+        INSERT INTO interviews_csquestion_fts(interviews_csquestion_fts, rowid, question_text) VALUES ('delete', old.id, old.question_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS interviews_csquestion_fts_update AFTER UPDATE OF question_text ON interviews_csquestion BEGIN
+        INSERT INTO interviews_csquestion_fts(interviews_csquestion_fts, rowid, question_text) VALUES ('delete', old.id, old.question_text);
+        INSERT INTO interviews_csquestion_fts(rowid, question_text) VALUES (new.id, new.question_text);
+    END
+    """,
+    "INSERT INTO interviews_csquestion_fts(interviews_csquestion_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS interviews_csquestion_fts_insert",
+    "DROP TRIGGER IF EXISTS interviews_csquestion_fts_delete",
+    "DROP TRIGGER IF EXISTS interviews_csquestion_fts_update",
+    "DROP TABLE IF EXISTS interviews_csquestion_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRESQL_CREATE
+    elif vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        statements = SQLITE_CREATE
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRESQL_DROP, 'sqlite': SQLITE_DROP}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0011_question_similarity'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+# Builds the counters from the existing ratings and interview question links
+def backfill_question_stats(apps, schema_editor):
+    QuestionRating = apps.get_model('interviews', 'QuestionRating')
+    Interview = apps.get_model('interviews', 'Interview')
+    QuestionStats = apps.get_model('interviews', 'QuestionStats')
+
+    stats = {}
+    ratings = QuestionRating.objects.values('question_id').annotate(
+        likes=Count('id', filter=Q(rating='LIKE')),
+        dislikes=Count('id', filter=Q(rating='DISLIKE'))
+    )
+    for row in ratings:
+        stats[row['question_id']] = QuestionStats(question_id=row['question_id'], likes=row['likes'], dislikes=row['dislikes'])
+    served = Interview.questions.through.objects.values('csquestion_id').annotate(total=Count('id'))
+    for row in served:
+        stats.setdefault(row['csquestion_id'], QuestionStats(question_id=row['csquestion_id'])).served = row['total']
+
+    QuestionStats.objects.bulk_create(stats.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0012_question_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='interviews.csquestion')),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('dislikes', models.PositiveIntegerField(default=0)),
+                ('served', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_question_stats, migrations.RunPython.noop),
+    ]
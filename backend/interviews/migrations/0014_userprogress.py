@@ -0,0 +1,80 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:46
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+# Builds every user's progress row from the interview history. A frozen copy of
+# interviews.progress.rebuild_progress as of this migration, using historical models only.
+def backfill_progress(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    Interview = apps.get_model('interviews', 'Interview')
+    InterviewAnswer = apps.get_model('interviews', 'InterviewAnswer')
+    InterviewFeedback = apps.get_model('interviews', 'InterviewFeedback')
+    UserProgress = apps.get_model('interviews', 'UserProgress')
+
+    rows = {user_id: UserProgress(user_id=user_id, category_counts={}) for user_id in User.objects.values_list('id', flat=True)}
+    answers = InterviewAnswer.objects.all()
+    completed = Interview.objects.filter(status='COMPLETED')
+
+    for row in completed.values('user_id').annotate(total=Count('id')):
+        rows[row['user_id']].interviews_completed = row['total']
+    for row in answers.values('interview__user_id', 'question__category').annotate(total=Count('id')):
+        progress = rows[row['interview__user_id']]
+        progress.answers_given += row['total']
+        progress.category_counts[row['question__category']] = row['total']
+    rated = InterviewFeedback.objects.filter(rating__gt=0)
+    for row in rated.values('interview__user_id').annotate(total=Count('id'), rating_sum=Sum('rating')):
+        progress = rows[row['interview__user_id']]
+        progress.feedback_count = row['total']
+        progress.feedback_rating_total = row['rating_sum']
+
+    active_days = {}
+    answer_days = answers.annotate(day=TruncDate('created_at')).values_list('interview__user_id', 'day').distinct()
+    completion_days = completed.filter(end_time__isnull=False).annotate(
+        day=TruncDate('end_time')
+    ).values_list('user_id', 'day').distinct()
+    for user_id, day in list(answer_days) + list(completion_days):
+        active_days.setdefault(user_id, set()).add(day)
+    for user_id, days in active_days.items():
+        progress = rows[user_id]
+        previous = None
+        for day in sorted(days):
+            progress.current_streak = progress.current_streak + 1 if previous is not None and day == previous + timedelta(days=1) else 1
+            progress.longest_streak = max(progress.longest_streak, progress.current_streak)
+            previous = day
+        progress.last_active_date = previous
+
+    UserProgress.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('interviews', '0013_questionstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProgress',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='interview_progress', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('interviews_completed', models.PositiveIntegerField(default=0)),
+                ('answers_given', models.PositiveIntegerField(default=0)),
+                ('category_counts', models.JSONField(blank=True, default=dict)),
+                ('feedback_count', models.PositiveIntegerField(default=0)),
+                ('feedback_rating_total', models.PositiveIntegerField(default=0)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('longest_streak', models.PositiveIntegerField(default=0)),
+                ('last_active_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:51
+
+import hashlib
+import re
+import struct
+import zlib
+
+from django.db import migrations, models
+
+
+# Frozen copies of CSQuestion.hash_content and the MinHash scheme in interviews/similarity.py as
+# of this migration, so the backfill gives the same result however those change later
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_SLOT_BITS = NUM_PERM.bit_length() - 1
+_VALUE_BITS = 26
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_EMPTY = (1 << 32) - 1
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+_BAND_FORMAT = f'>{ROWS}I'
+
+
+def hash_content(job_title, question_text):
+    key = ' '.join(job_title.split()).lower() if job_title is not None else ''
+    text = ' '.join(question_text.split()).lower()
+    return hashlib.sha256(f'{key}\n{text}'.encode()).hexdigest()
+
+def shingles(text, size=SHINGLE_SIZE):
+    data = ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split()).encode()
+    if len(data) <= size:
+        return {data} if data else set()
+    return {data[i:i + size] for i in range(len(data) - size + 1)}
+
+def signature(text):
+    slots = [None] * NUM_PERM
+    for shingle in shingles(text):
+        h = (zlib.crc32(shingle) * _MIX) & _MASK64
+        slot = h >> (64 - _SLOT_BITS)
+        value = (h >> 32) & _VALUE_MASK
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+
+    if all(value is None for value in slots):
+        return [_EMPTY] * NUM_PERM
+
+    sig = list(slots)
+    for slot, value in enumerate(slots):
+        if value is None:
+            distance = 1
+            while slots[(slot + distance) % NUM_PERM] is None:
+                distance += 1
+            sig[slot] = slots[(slot + distance) % NUM_PERM] + (distance << _VALUE_BITS)
+    return sig
+
+def band_buckets(sig):
+    return [
+        (band, hashlib.blake2b(struct.pack(_BAND_FORMAT, *sig[band * ROWS:(band + 1) * ROWS]), digest_size=8).hexdigest())
+        for band in range(BANDS)
+    ]
+
+
+# Hashes every question and re-signs it, since the MinHash scheme changed with this migration,
+# rebuilding the LSH buckets of canonical questions to match. Only the oldest copy of an exact
+# duplicate keeps its hash, so the column can become unique; the later copies are marked as
+# duplicates of it (like dedupequestions does), which takes them out of the pool and lets
+# dedupequestions --delete remove the ones no interview uses.
+def backfill_hashes(apps, schema_editor):
+    CSQuestion = apps.get_model('interviews', 'CSQuestion')
+    QuestionLSHBucket = apps.get_model('interviews', 'QuestionLSHBucket')
+    QuestionLSHBucket.objects.all().delete()
+
+    originals = {}  # content hash -> id of the question its copies are marked as duplicates of
+    questions, buckets = [], []
+    fields = ('id', 'question_text', 'job_title', 'job_title_key', 'duplicate_of_id')
+    for question in CSQuestion.objects.only(*fields).order_by('id').iterator(chunk_size=2000):
+        content_hash = hash_content(question.job_title, question.question_text)
+        if content_hash in originals:
+            question.content_hash = None
+            question.duplicate_of_id = question.duplicate_of_id or originals[content_hash]
+        else:
+            question.content_hash = content_hash
+            originals[content_hash] = question.duplicate_of_id or question.id
+        question.minhash = signature(question.question_text)
+        questions.append(question)
+        if question.duplicate_of_id is None:
+            buckets.extend(
+                QuestionLSHBucket(question_id=question.id, job_title_key=question.job_title_key, band=band, bucket=bucket)
+                for band, bucket in band_buckets(question.minhash)
+            )
+        if len(questions) >= 2000:
+            CSQuestion.objects.bulk_update(questions, ['content_hash', 'minhash', 'duplicate_of'])
+            QuestionLSHBucket.objects.bulk_create(buckets, batch_size=2000)
+            questions, buckets = [], []
+    if questions:
+        CSQuestion.objects.bulk_update(questions, ['content_hash', 'minhash', 'duplicate_of'])
+        QuestionLSHBucket.objects.bulk_create(buckets, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0014_userprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csquestion',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='csquestion',
+            constraint=models.UniqueConstraint(fields=('content_hash',), name='csquestion_content_hash_unique'),
+        ),
+    ]
@@ -1,5 +1,134 @@
-from django.db import models
+import hashlib
+
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import F, Max
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from . import similarity
+
+# Keeps CSQuestion.job_title_key, content_hash, the MinHash signature and the LSH buckets in sync on bulk writes, which skip save()
+class CSQuestionQuerySet(models.QuerySet):
+    # sign=False leaves minhash empty and skips the LSH buckets, for bulk imports that let the
+    # next dedupequestions run sign and index the new rows
+    def bulk_create(self, objs, *args, sign=True, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.job_title_key = CSQuestion.normalize_job_title(obj.job_title)
+            obj.content_hash = CSQuestion.hash_content(obj.job_title, obj.question_text)
+            obj.minhash = None
+        if not kwargs.get('ignore_conflicts'):
+            self._sign(objs, sign)
+            created = super().bulk_create(objs, *args, **kwargs)
+            if sign:
+                QuestionLSHBucket.rebuild_for([obj for obj in created if obj.pk])
+            return created
+
+        # Known duplicates (stored already or repeated in the batch) aren't sent at all; the
+        # constraint still settles races with concurrent writers. Rows skipped as conflicts come
+        # back without a pk, and most backends don't return pks at all with ignore_conflicts,
+        # so the new rows are found through their content hashes.
+        hashes = {obj.content_hash for obj in objs}
+        seen = set(self.filter(content_hash__in=hashes).values_list('content_hash', flat=True))
+        new_hashes = hashes - seen
+        fresh = []
+        for obj in objs:
+            if obj.content_hash not in seen:
+                seen.add(obj.content_hash)
+                fresh.append(obj)
+        if fresh:
+            self._sign(fresh, sign)
+            super().bulk_create(fresh, *args, **kwargs)
+        new_ids = dict(self.filter(content_hash__in=new_hashes).values_list('content_hash', 'id')) if new_hashes else {}
+        inserted = []
+        for obj in fresh:
+            if obj.pk is None and obj.content_hash in new_ids:
+                obj.pk = new_ids[obj.content_hash]
+                obj._state.adding = False
+            if obj.pk is not None:
+                inserted.append(obj)
+        if sign:
+            QuestionLSHBucket.rebuild_for(inserted)
+        return objs
+
+    def _sign(self, objs, sign):
+        if sign:
+            for obj in objs:
+                obj.minhash = similarity.signature(obj.question_text)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if 'job_title' in fields:
+            for obj in objs:
+                obj.job_title_key = CSQuestion.normalize_job_title(obj.job_title)
+            fields.append('job_title_key')
+        if {'job_title', 'question_text'} & set(fields):
+            CSQuestion.assign_content_hashes(objs)
+            fields.append('content_hash')
+        if 'question_text' in fields:
+            for obj in objs:
+                obj.minhash = similarity.signature(obj.question_text)
+            fields.append('minhash')
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        if {'job_title', 'question_text', 'duplicate_of'} & set(fields):
+            QuestionLSHBucket.rebuild_for(objs)
+        return updated
+
+    def update(self, **kwargs):
+        # bulk_update writes through update() with a Case expression per field, after
+        # bulk_update above has synced the derived fields and before it rebuilds the buckets
+        if any(hasattr(kwargs.get(field), 'resolve_expression') for field in ('job_title', 'question_text')):
+            return super().update(**kwargs)
+        if 'job_title' in kwargs:
+            kwargs['job_title_key'] = CSQuestion.normalize_job_title(kwargs['job_title'])
+        if 'question_text' in kwargs:
+            kwargs['minhash'] = similarity.signature(kwargs['question_text'])
+        if 'job_title' in kwargs and 'question_text' in kwargs:
+            kwargs['content_hash'] = CSQuestion.hash_content(kwargs['job_title'], kwargs['question_text'])
+        elif 'job_title' in kwargs or 'question_text' in kwargs:
+            # The hash mixes both fields, so every row needs its own: hand the rows to bulk_update
+            fields = [field for field in kwargs if field not in ('job_title_key', 'minhash')]
+            with transaction.atomic(using=self.db):
+                questions = list(self.select_for_update())
+                for question in questions:
+                    for field in fields:
+                        setattr(question, field, kwargs[field])
+                CSQuestion.objects.bulk_update(questions, fields)
+            return len(questions)
+        if not {'job_title', 'question_text', 'duplicate_of', 'duplicate_of_id'} & set(kwargs):
+            return super().update(**kwargs)
+
+        ids = list(self.values_list('id', flat=True))
+        updated = super().update(**kwargs)
+        QuestionLSHBucket.rebuild_for(CSQuestion.objects.filter(id__in=ids))
+        return updated
+
+    # For each signature, (id, similarity) of the closest canonical question in the job title's
+    # pool at or above threshold, or None. Costs one bucket query and one signature query per batch.
+    def near_duplicates(self, job_title_key, signatures, threshold):
+        wanted = [set(similarity.band_buckets(sig)) for sig in signatures]
+        all_buckets = set().union(*wanted) if wanted else set()
+        if not all_buckets:
+            return []
+
+        rows = QuestionLSHBucket.objects.filter(
+            job_title_key=job_title_key,
+            bucket__in={bucket for _, bucket in all_buckets}
+        ).values_list('band', 'bucket', 'question_id')
+        candidates = {}
+        for band, bucket, question_id in rows:
+            candidates.setdefault((band, bucket), set()).add(question_id)
+
+        candidate_ids = set().union(*candidates.values()) if candidates else set()
+        stored = dict(
+            self.filter(id__in=candidate_ids, duplicate_of__isnull=True).values_list('id', 'minhash')
+        ) if candidate_ids else {}
+
+        matches = []
+        for sig, buckets in zip(signatures, wanted):
+            ids = {question_id for bucket in buckets for question_id in candidates.get(bucket, ())}
+            matches.append(similarity.best_match(sig, ((i, stored[i]) for i in ids if i in stored), threshold))
+        return matches
 
 # Represents a CS-related interview question stored in the database.
 class CSQuestion(models.Model):
@@ -14,13 +143,126 @@ class CSQuestion(models.Model):
     
     question_text = models.TextField()  # Actual text of the question
     job_title = models.CharField(max_length=255, null=True)  # Optional: related job title
+    job_title_key = models.CharField(max_length=255, null=True, db_index=True, editable=False)  # Normalized job_title for indexed pool lookups
     category = models.CharField(max_length=3, choices=CATEGORY_CHOICES)  # Category tag
     difficulty = models.PositiveSmallIntegerField(default=1)  # 1 to 5 scale
     created_at = models.DateTimeField(auto_now_add=True)  # Auto timestamp when created
+    content_hash = models.CharField(max_length=64, null=True, editable=False)  # Exact-duplicate guard (see hash_content)
+    minhash = models.JSONField(null=True, editable=False)  # MinHash signature of question_text (see similarity.py)
+    duplicate_of = models.ForeignKey(
+        'self', null=True, blank=True, on_delete=models.SET_NULL, related_name='duplicates'
+    )  # Set when this question is a near-duplicate of an older one; duplicates are left out of the pool
+
+    objects = CSQuestionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # A constraint rather than unique=True, which on PostgreSQL adds a pattern-ops index
+            # nothing uses and that slows every insert
+            models.UniqueConstraint(fields=['content_hash'], name='csquestion_content_hash_unique'),
+        ]
+
+    # Canonical form of a job title: trimmed, single-spaced and lowercased
+    @staticmethod
+    def normalize_job_title(job_title):
+        if job_title is None:
+            return None
+        return ' '.join(job_title.split()).lower()
+
+    # sha256 of the job title's pool and the question text, ignoring case and whitespace.
+    # Two questions with the same hash are the same question, so the column is unique.
+    @staticmethod
+    def hash_content(job_title, question_text):
+        key = CSQuestion.normalize_job_title(job_title) or ''
+        text = ' '.join(question_text.split()).lower()
+        return hashlib.sha256(f'{key}\n{text}'.encode()).hexdigest()
+
+    # Sets content_hash on each question. An exact copy kept as a duplicate of another question
+    # (migration 0015 marks them so) leaves the hash to the question that holds it, so saving
+    # the copy doesn't trip the unique constraint
+    @classmethod
+    def assign_content_hashes(cls, questions):
+        for question in questions:
+            question.content_hash = cls.hash_content(question.job_title, question.question_text)
+        copies = [question for question in questions if question.duplicate_of_id is not None]
+        if not copies:
+            return
+        holders = dict(
+            cls.objects.filter(content_hash__in={question.content_hash for question in copies})
+            .values_list('content_hash', 'id')
+        )
+        for question in copies:
+            if holders.get(question.content_hash, question.pk) != question.pk:
+                question.content_hash = None
+
+    def save(self, *args, **kwargs):
+        self.job_title_key = self.normalize_job_title(self.job_title)
+        self.assign_content_hashes([self])
+        self.minhash = similarity.signature(self.question_text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = list(update_fields)
+            if 'job_title' in update_fields:
+                update_fields.append('job_title_key')
+            if 'question_text' in update_fields:
+                update_fields.append('minhash')
+            if {'job_title', 'question_text'} & set(update_fields):
+                update_fields.append('content_hash')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        if update_fields is None or {'job_title', 'question_text', 'duplicate_of'} & set(update_fields):
+            QuestionLSHBucket.rebuild_for([self])
 
     def __str__(self):
         return self.question_text[:100]  # Short preview for admin panel or logs
 
+# LSH bucket of a canonical question's MinHash signature, one row per band.
+# Near-duplicate checks probe the buckets of a new question instead of scanning the pool.
+class QuestionLSHBucket(models.Model):
+    question = models.ForeignKey(CSQuestion, related_name='lsh_buckets', on_delete=models.CASCADE)
+    job_title_key = models.CharField(max_length=255, null=True)  # Copied from the question; duplicates are only looked for within a pool
+    band = models.PositiveSmallIntegerField()
+    bucket = models.CharField(max_length=16)  # Hash of the band's slice of the signature
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job_title_key', 'bucket', 'band'], name='lsh_pool_bucket'),
+        ]
+
+    # Replaces the bucket rows of the given questions; duplicates get none, so they never match
+    @classmethod
+    def rebuild_for(cls, questions):
+        questions = list(questions)
+        if not questions:
+            return
+        cls.objects.filter(question_id__in=[question.id for question in questions]).delete()
+        rows = [
+            (question.id, question.job_title_key, band, bucket)
+            for question in questions
+            if question.duplicate_of_id is None and question.minhash
+            for band, bucket in similarity.band_buckets(question.minhash)
+        ]
+        if not rows:
+            return
+
+        # Plain multi-row INSERTs: every question has BANDS rows, and building a model instance
+        # for each of them made bucket upkeep most of the cost of a bulk import
+        connection = connections[router.db_for_write(cls)]
+        fields = [cls._meta.get_field(name) for name in ('question', 'job_title_key', 'band', 'bucket')]
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        batch_size = min(max(connection.ops.bulk_batch_size(fields, rows), 1), 2000)
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                values = ', '.join(['(%s, %s, %s, %s)'] * len(batch))
+                cursor.execute(
+                    f'INSERT INTO {connection.ops.quote_name(cls._meta.db_table)} ({columns}) VALUES {values}',
+                    [value for row in batch for value in row]
+                )
+
+    def __str__(self):
+        return f"Question {self.question_id} - band {self.band} - {self.bucket}"
+
 # Represents a single interview session taken by a user
 class Interview(models.Model):
     STATUS_CHOICES = [
@@ -35,28 +277,105 @@ class Interview(models.Model):
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(null=True, blank=True)  # Set when interview is done
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="IN_PROGRESS")
+    question_order = models.JSONField(default=list, blank=True)  # Question ids in the order they are asked
+    question_cursor = models.PositiveSmallIntegerField(default=0)  # Index into question_order of the next question
 
     class Meta:
         unique_together = ['user', 'interview_number']  # Prevents duplicate interview #s per user
+        indexes = [
+            # Latest in-progress interview (NextQuestionView) and status-filtered history pages
+            models.Index(fields=['user', 'status', '-start_time'], name='interview_user_status_start'),
+            # History pages and keyset cursors ordered by (-start_time, -id)
+            models.Index(fields=['user', '-start_time', '-id'], name='interview_user_start_id'),
+        ]
 
     def save(self, *args, **kwargs):
-        # Auto-increments interview_number for each user
+        # Auto-increments interview_number for each user. The number is taken from the user's
+        # counter row in the same transaction as the insert, so concurrent starts can't collide.
         if not self.interview_number and self.user:
-            last_interview = Interview.objects.filter(user=self.user).order_by('-interview_number').first()
-            self.interview_number = (last_interview.interview_number + 1) if last_interview else 1
+            with transaction.atomic():
+                self.interview_number = InterviewCounter.next_number(self.user)
+                super().save(*args, **kwargs)
+            return
         super().save(*args, **kwargs)
 
+    # Id of the question to ask next, or None once every question has been asked
+    def next_question_id(self):
+        if self.question_cursor < len(self.question_order):
+            return self.question_order[self.question_cursor]
+        return None
+
+    # Moves the cursor past the answered questions at its position, stopping at the first question that
+    # still has no answer, so answering out of order (Q3 before Q2, or a bulk submit) never skips Q2.
+    # The interview row is locked while the answers are read, so concurrent submissions each see the
+    # other's answer, and the cursor only ever moves forward.
+    def advance_past(self, *question_ids):
+        if not any(question_id in self.question_order for question_id in map(int, question_ids)):
+            return
+        with transaction.atomic():
+            cursor = Interview.objects.select_for_update().values_list('question_cursor', flat=True).get(pk=self.pk)
+            answered = set(InterviewAnswer.objects.filter(interview_id=self.pk).values_list('question_id', flat=True))
+            answered.update(map(int, question_ids))
+            position = cursor
+            while position < len(self.question_order) and self.question_order[position] in answered:
+                position += 1
+            if position > cursor:
+                Interview.objects.filter(pk=self.pk).update(question_cursor=position)
+        self.question_cursor = position
+
     def __str__(self):
         return f"Interview #{self.interview_number} - {self.user.username}"
 
+# Per-user interview counter used to hand out interview numbers atomically
+class InterviewCounter(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    last_number = models.PositiveIntegerField(default=0)  # Highest interview_number handed out
+
+    # Increments the user's counter and returns the new value. The UPDATE holds the row lock
+    # until the surrounding transaction commits, so concurrent callers are serialized.
+    @classmethod
+    def next_number(cls, user):
+        with transaction.atomic():
+            if not cls.objects.filter(user=user).update(last_number=F('last_number') + 1):
+                # First interview for this user: seed the counter from any existing interviews
+                last = Interview.objects.filter(user=user).aggregate(last=Max('interview_number'))['last'] or 0
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(user=user, last_number=last + 1)
+                except IntegrityError:
+                    # Another request created the counter first
+                    cls.objects.filter(user=user).update(last_number=F('last_number') + 1)
+            return cls.objects.values_list('last_number', flat=True).get(user=user)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.last_number} interviews"
+
 # Stores each answer given by the user during an interview, along with AI feedback
 class InterviewAnswer(models.Model):
+    FEEDBACK_STATUS_CHOICES = [
+        ("PENDING", "Pending"),        # Saved, waiting for the feedback worker
+        ("PROCESSING", "Processing"),  # Claimed by a feedback worker
+        ("READY", "Ready"),            # ai_feedback is filled in
+        ("FAILED", "Failed"),          # Gave up after repeated errors
+    ]
+
     interview = models.ForeignKey(Interview, related_name='answers', on_delete=models.CASCADE)
     question = models.ForeignKey(CSQuestion, on_delete=models.CASCADE)
     user_response = models.TextField()  # What the user said or typed
-    ai_feedback = models.TextField()  # Response/feedback from the AI
+    ai_feedback = models.TextField(blank=True, default='')  # Response/feedback from the AI
+    feedback_status = models.CharField(max_length=20, choices=FEEDBACK_STATUS_CHOICES, default="READY")
+    feedback_claimed_at = models.DateTimeField(null=True, blank=True)  # When a worker picked it up
+    feedback_attempts = models.PositiveSmallIntegerField(default=0)  # Worker attempts so far
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Answers per interview, answered-question lookups and transcript prefetches
+            models.Index(fields=['interview', 'question'], name='answer_interview_question'),
+            # Feedback worker polling for the oldest PENDING/PROCESSING answers
+            models.Index(fields=['feedback_status', 'created_at'], name='answer_status_created'),
+        ]
+
     def __str__(self):
         return f"Answer for Interview {self.interview.id} - Question {self.question.id}"
 
@@ -74,11 +393,48 @@ class QuestionRating(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ['user', 'question', 'interview']  # Prevents duplicate ratings
+        unique_together = ['user', 'question', 'interview']  # Prevents duplicate ratings (and indexes single lookups)
+        indexes = [
+            # All of a user's ratings for a page of interviews
+            models.Index(fields=['user', 'interview'], name='rating_user_interview'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.rating} - {self.question_id}"
 
+# Running like/dislike/served counts per question, kept up to date as ratings are saved and
+# interviews start, so question selection never has to aggregate the ratings table
+class QuestionStats(models.Model):
+    question = models.OneToOneField(CSQuestion, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    likes = models.PositiveIntegerField(default=0)
+    dislikes = models.PositiveIntegerField(default=0)
+    served = models.PositiveIntegerField(default=0)  # Times the question was picked for an interview
+
+    # Counts one more interview for each question. Ids are sorted so concurrent starts
+    # lock the shared rows in the same order.
+    @classmethod
+    def record_served(cls, question_ids):
+        question_ids = sorted(set(question_ids))
+        cls.objects.bulk_create([cls(question_id=question_id) for question_id in question_ids], ignore_conflicts=True)
+        cls.objects.filter(question_id__in=question_ids).update(served=F('served') + 1)
+
+    # Applies a rating change: previous is the rating being replaced (None for a new rating)
+    @classmethod
+    def record_rating(cls, question_id, previous, rating):
+        if previous == rating:
+            return
+        fields = {'LIKE': 'likes', 'DISLIKE': 'dislikes'}
+        changes = {}
+        if previous in fields:
+            changes[fields[previous]] = Greatest(F(fields[previous]) - 1, 0)
+        if rating in fields:
+            changes[fields[rating]] = F(fields[rating]) + 1
+        cls.objects.bulk_create([cls(question_id=question_id)], ignore_conflicts=True)
+        cls.objects.filter(question_id=question_id).update(**changes)
+
+    def __str__(self):
+        return f"Question {self.question_id}: {self.likes} likes, {self.dislikes} dislikes, served {self.served}"
+
 # Stores final feedback given by the user for the whole interview session
 class InterviewFeedback(models.Model):
     interview = models.OneToOneField(Interview, on_delete=models.CASCADE, related_name='feedback')
@@ -88,3 +444,34 @@ class InterviewFeedback(models.Model):
 
     def __str__(self):
         return f"Feedback for Interview #{self.interview.interview_number}"
+
+# Per-user dashboard numbers, kept current by the answer, completion and feedback write paths
+# (see progress.py) so the stats endpoint reads one row instead of aggregating the user's history
+class UserProgress(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='interview_progress')
+    interviews_completed = models.PositiveIntegerField(default=0)
+    answers_given = models.PositiveIntegerField(default=0)
+    category_counts = models.JSONField(default=dict, blank=True)  # Answers per CSQuestion category code
+    feedback_count = models.PositiveIntegerField(default=0)  # Interviews the user rated (rating > 0)
+    feedback_rating_total = models.PositiveIntegerField(default=0)  # Sum of those ratings, for the average
+    current_streak = models.PositiveIntegerField(default=0)  # Consecutive active days ending on last_active_date
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_active_date = models.DateField(null=True, blank=True)  # Last day with an answer or a completed interview
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.interviews_completed} interviews, {self.answers_given} answers"
+
+# Cached AI feedback for an answer, reused when another candidate sends the same (normalized) answer
+class FeedbackCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)  # sha256 of question id, normalized answer, model and prompt version
+    question = models.ForeignKey(CSQuestion, on_delete=models.CASCADE)
+    model = models.CharField(max_length=100)  # LLM that produced the feedback
+    prompt_version = models.PositiveSmallIntegerField()
+    ai_feedback = models.TextField()
+    hits = models.PositiveIntegerField(default=0)  # Times this feedback was reused instead of calling the LLM
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)  # Used for LRU eviction
+
+    def __str__(self):
+        return f"Cached feedback for Question {self.question_id} ({self.hits} hits)"
@@ -0,0 +1,136 @@
+# Incrementally maintained per-user progress rollups (UserProgress).
+# Each write path applies its change to the user's row while holding a row lock, inside the
+# same transaction as the write itself, so the dashboard never has to aggregate the history.
+# rebuild_progress() recomputes rows from scratch (rebuildprogress command; migration 0014 keeps its own copy).
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Interview, InterviewAnswer, InterviewFeedback, UserProgress
+
+
+# Runs `change(progress)` on the user's locked progress row and marks the day active if asked
+def _update(user_id, change, active_on=None):
+    with transaction.atomic():
+        UserProgress.objects.bulk_create([UserProgress(user_id=user_id)], ignore_conflicts=True)
+        progress = UserProgress.objects.select_for_update().get(user_id=user_id)
+        change(progress)
+        if active_on is not None:
+            mark_active(progress, active_on)
+        progress.save()
+    return progress
+
+# Extends or restarts the streak for a day of activity; days older than the last active one are ignored
+def mark_active(progress, day):
+    last = progress.last_active_date
+    if last is not None and day <= last:
+        return
+    progress.current_streak = progress.current_streak + 1 if last == day - timedelta(days=1) else 1
+    progress.longest_streak = max(progress.longest_streak, progress.current_streak)
+    progress.last_active_date = day
+
+# Counts newly saved answers, given as the categories of the questions they answer
+def record_answers(user_id, categories, when=None):
+    def change(progress):
+        progress.answers_given += len(categories)
+        counts = dict(progress.category_counts)
+        for category in categories:
+            counts[category] = counts.get(category, 0) + 1
+        progress.category_counts = counts
+    if categories:
+        _update(user_id, change, timezone.localdate(when))
+
+def record_completion(user_id, when=None):
+    def change(progress):
+        progress.interviews_completed += 1
+    _update(user_id, change, timezone.localdate(when))
+
+# Applies an interview self-rating change; previous is the rating being replaced (None when new).
+# A rating of 0 means the user left the interview unrated.
+def record_feedback(user_id, previous, rating):
+    def change(progress):
+        if previous:
+            progress.feedback_count -= 1
+            progress.feedback_rating_total -= previous
+        if rating:
+            progress.feedback_count += 1
+            progress.feedback_rating_total += rating
+    if (previous or 0) != (rating or 0):
+        _update(user_id, change)
+
+# Dashboard view of a progress row (or of no activity at all when progress is None)
+def progress_summary(progress, today=None):
+    today = today or timezone.localdate()
+    if progress is None:
+        progress = UserProgress()
+    # The streak is broken once a full day passes without activity
+    streak_alive = progress.last_active_date is not None and progress.last_active_date >= today - timedelta(days=1)
+    return {
+        'interviews_completed': progress.interviews_completed,
+        'answers_given': progress.answers_given,
+        'category_counts': progress.category_counts,
+        'categories_covered': sum(1 for count in progress.category_counts.values() if count),
+        'average_self_rating': (
+            round(progress.feedback_rating_total / progress.feedback_count, 2) if progress.feedback_count else None
+        ),
+        'current_streak': progress.current_streak if streak_alive else 0,
+        'longest_streak': progress.longest_streak,
+        'last_active_date': progress.last_active_date,
+    }
+
+# (current streak, longest streak) for a sorted list of distinct active days
+def _streaks(days):
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous is not None and day == previous + timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+# Recomputes progress rows from the interview history, for every user or just `user_ids`
+def rebuild_progress(user_ids=None):
+    users, interviews, answers = User.objects.all(), Interview.objects.all(), InterviewAnswer.objects.all()
+    feedback = InterviewFeedback.objects.filter(rating__gt=0)
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+        interviews = interviews.filter(user_id__in=user_ids)
+        answers = answers.filter(interview__user_id__in=user_ids)
+        feedback = feedback.filter(interview__user_id__in=user_ids)
+    rows = {user_id: UserProgress(user_id=user_id, category_counts={}) for user_id in users.values_list('id', flat=True)}
+
+    completed = interviews.filter(status='COMPLETED')
+    for row in completed.values('user_id').annotate(total=Count('id')):
+        rows[row['user_id']].interviews_completed = row['total']
+    for row in answers.values('interview__user_id', 'question__category').annotate(total=Count('id')):
+        progress = rows[row['interview__user_id']]
+        progress.answers_given += row['total']
+        progress.category_counts[row['question__category']] = row['total']
+    for row in feedback.values('interview__user_id').annotate(total=Count('id'), rating_sum=Sum('rating')):
+        progress = rows[row['interview__user_id']]
+        progress.feedback_count = row['total']
+        progress.feedback_rating_total = row['rating_sum']
+
+    active_days = {}
+    answer_days = answers.annotate(day=TruncDate('created_at')).values_list('interview__user_id', 'day').distinct()
+    completion_days = completed.filter(end_time__isnull=False).annotate(
+        day=TruncDate('end_time')
+    ).values_list('user_id', 'day').distinct()
+    for user_id, day in list(answer_days) + list(completion_days):
+        active_days.setdefault(user_id, set()).add(day)
+    for user_id, days in active_days.items():
+        days = sorted(days)
+        progress = rows[user_id]
+        progress.current_streak, progress.longest_streak = _streaks(days)
+        progress.last_active_date = days[-1]
+
+    with transaction.atomic():
+        stale = UserProgress.objects.all() if user_ids is None else UserProgress.objects.filter(user_id__in=user_ids)
+        stale.delete()
+        UserProgress.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
@@ -0,0 +1,136 @@
+# Full-text search over the question bank.
+# PostgreSQL matches against a generated tsvector column with a GIN index, and SQLite
+# against an FTS5 table kept in sync by triggers; both are created by migration 0012.
+# Other backends fall back to unindexed icontains matching.
+# Every match is ranked, so page 1 always holds the best matches and paging reaches all of them;
+# the index finds the matches and only the rank sort grows with their number.
+
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import CSQuestion
+
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SQLITE_FTS_TABLE = 'interviews_csquestion_fts'
+
+# Names and statements the runtime queries and repair_sqlite_search_index rely on. The structures
+# themselves are created by migration 0012, which keeps its own copy of this DDL.
+SQLITE_TRIGGERS = {
+    f'{SQLITE_FTS_TABLE}_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_insert AFTER INSERT ON interviews_csquestion BEGIN
+            INSERT INTO {SQLITE_FTS_TABLE}(rowid, question_text) VALUES (new.id, new.question_text);
+        END
+    """,
+    f'{SQLITE_FTS_TABLE}_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_delete AFTER DELETE ON interviews_csquestion BEGIN
+            INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, question_text) VALUES ('delete', old.id, old.question_text);
+        END
+    """,
+    f'{SQLITE_FTS_TABLE}_update': f"""
+        CREATE TRIGGER IF NOT EXISTS {SQLITE_FTS_TABLE}_update AFTER UPDATE OF question_text ON interviews_csquestion BEGIN
+            INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, question_text) VALUES ('delete', old.id, old.question_text);
+            INSERT INTO {SQLITE_FTS_TABLE}(rowid, question_text) VALUES (new.id, new.question_text);
+        END
+    """,
+}
+SQLITE_REBUILD = f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')"
+
+_sqlite_fts_available = None
+
+
+# SQLite rebuilds a table to alter it, which silently drops its triggers; this puts them
+# back (and reindexes whatever was written meanwhile). Runs after every migrate.
+def repair_sqlite_search_index(using):
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE name LIKE %s", [f'{SQLITE_FTS_TABLE}%'])
+        existing = {name for _, name in cursor.fetchall()}
+        if SQLITE_FTS_TABLE not in existing or not set(SQLITE_TRIGGERS) - existing:
+            return
+        for statement in SQLITE_TRIGGERS.values():
+            cursor.execute(statement)
+        cursor.execute(SQLITE_REBUILD)
+
+# SQLite builds without FTS5 skip the virtual table in the migration
+def sqlite_fts_available():
+    global _sqlite_fts_available
+    if _sqlite_fts_available is None:
+        _sqlite_fts_available = SQLITE_FTS_TABLE in connection.introspection.table_names()
+    return _sqlite_fts_available
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+# Filters shared by every backend; returns (SQL fragment, params) for the raw queries
+def _filter_sql(alias, category, difficulty):
+    clauses = [f'{alias}.duplicate_of_id IS NULL']
+    params = []
+    if category:
+        clauses.append(f'{alias}.category = %s')
+        params.append(category)
+    if difficulty:
+        clauses.append(f'{alias}.difficulty = %s')
+        params.append(difficulty)
+    return ' AND '.join(clauses), params
+
+# Returns up to `limit` questions matching `query` after skipping `offset`, best match first,
+# each with a `rank` attribute (higher is better)
+def search_questions(query, category=None, difficulty=None, limit=20, offset=0):
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(query, category, difficulty, limit, offset)
+    if connection.vendor == 'sqlite' and sqlite_fts_available():
+        return _search_sqlite(query, category, difficulty, limit, offset)
+    return _search_fallback(query, category, difficulty, limit, offset)
+
+def _search_postgresql(query, category, difficulty, limit, offset):
+    table = CSQuestion._meta.db_table
+    filters, params = _filter_sql('q', category, difficulty)
+    sql = f'''
+        SELECT q.id, q.question_text, q.job_title, q.category, q.difficulty,
+               ts_rank_cd(q.{SEARCH_VECTOR_COLUMN}, query) AS rank
+        FROM {table} q, websearch_to_tsquery('english', %s) query
+        WHERE q.{SEARCH_VECTOR_COLUMN} @@ query AND {filters}
+        ORDER BY rank DESC, q.id
+        LIMIT %s OFFSET %s
+    '''
+    return list(CSQuestion.objects.raw(sql, [query] + params + [limit, offset]))
+
+def _search_sqlite(query, category, difficulty, limit, offset):
+    terms = _terms(query)
+    if not terms:
+        return []
+    # Quote every term so user input can't use FTS5 query syntax; terms are ANDed
+    match = ' '.join('"{}"'.format(term) for term in terms)
+    table = CSQuestion._meta.db_table
+    filters, params = _filter_sql('q', category, difficulty)
+    # bm25() is lower for better matches
+    sql = f'''
+        SELECT q.id, q.question_text, q.job_title, q.category, q.difficulty, -bm25({SQLITE_FTS_TABLE}) AS rank
+        FROM {SQLITE_FTS_TABLE}
+        JOIN {table} q ON q.id = {SQLITE_FTS_TABLE}.rowid
+        WHERE {SQLITE_FTS_TABLE} MATCH %s AND {filters}
+        ORDER BY bm25({SQLITE_FTS_TABLE}), q.id
+        LIMIT %s OFFSET %s
+    '''
+    return list(CSQuestion.objects.raw(sql, [match] + params + [limit, offset]))
+
+def _search_fallback(query, category, difficulty, limit, offset):
+    terms = _terms(query)
+    if not terms:
+        return []
+    condition = Q(duplicate_of__isnull=True)
+    for term in terms:
+        condition &= Q(question_text__icontains=term)
+    if category:
+        condition &= Q(category=category)
+    if difficulty:
+        condition &= Q(difficulty=difficulty)
+
+    questions = list(CSQuestion.objects.filter(condition).order_by('-id')[offset:offset + limit])
+    for question in questions:
+        question.rank = None
+    return questions
@@ -0,0 +1,38 @@
+# Rating-aware question selection for StartInterview.
+# The pool is read as (id, likes, dislikes) tuples through one LEFT JOIN on QuestionStats,
+# so picking questions costs O(pool size) in memory and never touches the ratings table.
+
+import heapq
+import random
+
+from django.conf import settings
+
+from .models import CSQuestion
+
+STRATEGIES = ('thompson', 'uniform')
+
+
+# Every canonical question in a job title's pool with its like/dislike counts (0 when never rated)
+def load_pool(job_title):
+    rows = CSQuestion.objects.filter(
+        job_title_key=CSQuestion.normalize_job_title(job_title),
+        duplicate_of__isnull=True
+    ).values_list('id', 'stats__likes', 'stats__dislikes')
+    return [(question_id, likes or 0, dislikes or 0) for question_id, likes, dislikes in rows]
+
+# Picks up to `count` question ids from the pool, in the order they should be asked.
+# Thompson sampling draws a plausible like-rate for each question from Beta(1 + likes, 1 + dislikes)
+# and keeps the highest draws: well-liked questions win most draws, disliked ones rarely, and
+# barely rated ones get a wide spread, so new questions keep being explored.
+def choose_questions(pool, count, strategy=None, rng=random):
+    strategy = strategy or settings.QUESTION_SELECTION_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown question selection strategy '{strategy}', expected one of {STRATEGIES}")
+
+    if strategy == 'uniform':
+        return [question_id for question_id, _, _ in rng.sample(pool, min(count, len(pool)))]
+
+    draws = [(rng.betavariate(1 + likes, 1 + dislikes), question_id) for question_id, likes, dislikes in pool]
+    chosen = [question_id for _, question_id in heapq.nlargest(count, draws)]
+    rng.shuffle(chosen)  # The best draw shouldn't always be asked first
+    return chosen
@@ -1,12 +1,31 @@
 from rest_framework import serializers
 from .models import Interview, CSQuestion, InterviewAnswer, QuestionRating, InterviewFeedback
 
+# Lets callers pass fields=[...] to a serializer to only render a subset of its fields
+class FieldSelectionMixin:
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 # Serializer for CSQuestion model – exposes selected fields to the API
 class CSQuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = CSQuestion
         fields = ['id', 'question_text', 'job_title', 'category', 'difficulty']
 
+# Search hit: the question plus its relevance (higher is better; null when the database has no full-text index)
+class CSQuestionSearchSerializer(CSQuestionSerializer):
+    rank = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta(CSQuestionSerializer.Meta):
+        fields = CSQuestionSerializer.Meta.fields + ['rank']
+
 # Serializer for rating a question (like/dislike)
 class QuestionRatingSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,18 +39,25 @@ class InterviewAnswerSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = InterviewAnswer
-        fields = ['id', 'question_text', 'user_response', 'ai_feedback', 'created_at', 'rating']
+        fields = ['id', 'question_text', 'user_response', 'ai_feedback', 'feedback_status', 'created_at', 'rating']
 
-    # Tries to get the current user's rating for this specific question+interview combo
+    # Tries to get the current user's rating for this specific question+interview combo.
+    # List views pass every rating for the page in context['ratings'] (keyed by (interview_id, question_id))
+    # so this doesn't run one query per answer.
     def get_rating(self, obj):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return None
 
+        ratings = self.context.get('ratings')
+        if ratings is not None:
+            rating = ratings.get((obj.interview_id, obj.question_id))
+            return QuestionRatingSerializer(rating).data if rating else None
+
         rating = QuestionRating.objects.filter(
             user=request.user,
-            question=obj.question,
-            interview=obj.interview
+            question_id=obj.question_id,
+            interview_id=obj.interview_id
         ).first()
 
         if not rating:
@@ -46,7 +72,7 @@ class InterviewFeedbackSerializer(serializers.ModelSerializer):
         fields = ['id', 'content', 'rating', 'created_at']
 
 # Main serializer for the Interview model – includes questions, answers, and feedback
-class InterviewSerializer(serializers.ModelSerializer):
+class InterviewSerializer(FieldSelectionMixin, serializers.ModelSerializer):
     answers = InterviewAnswerSerializer(many=True, read_only=True)  # Nested list of all answers
     questions = CSQuestionSerializer(many=True, read_only=True)    # Nested list of all questions
     feedback = InterviewFeedbackSerializer(read_only=True)         # One-to-one feedback, if available
@@ -54,3 +80,13 @@ class InterviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Interview
         fields = ['id', 'start_time', 'end_time', 'status', 'questions', 'answers', 'feedback']
+
+# Lightweight interview row for history lists – no transcript, just what the list UI shows.
+# answered_count and feedback_rating come from queryset annotations.
+class InterviewSummarySerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    answered_count = serializers.IntegerField(read_only=True)
+    feedback_rating = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Interview
+        fields = ['id', 'job_title', 'start_time', 'end_time', 'status', 'answered_count', 'feedback_rating']
@@ -0,0 +1,104 @@
+# MinHash signatures and locality-sensitive hashing for spotting near-duplicate questions.
+# A question is reduced to the set of its character shingles and summarised by a NUM_PERM-value
+# signature whose matching positions estimate the Jaccard similarity of two questions.
+# Signatures use one-permutation hashing: each shingle is hashed once and only competes for
+# the minimum of the slot its hash falls into, and empty slots borrow from the next filled one
+# (rotation densification). That is as accurate as NUM_PERM independent hash functions at a
+# fraction of the cost, which matters when importing large question banks.
+# The signature is cut into BANDS bands of ROWS values, and two questions become
+# candidates only when some band hashes to the same bucket, so a lookup costs a few
+# indexed bucket probes instead of a comparison against every question in the pool.
+
+import hashlib
+import re
+import struct
+import zlib
+
+NUM_PERM = 64  # Signature slots; must stay a power of two
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # Candidates from ~0.5 similarity; 0.7 is found with >98% probability
+SHINGLE_SIZE = 5
+
+_SLOT_BITS = NUM_PERM.bit_length() - 1
+_VALUE_BITS = 26  # Slot minimums stay below 2**26, borrowed ones below 2**32
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_EMPTY = (1 << 32) - 1
+_MIX = 0x9E3779B97F4A7C15  # Fibonacci hashing spreads CRC32's linear output over 64 bits
+_MASK64 = (1 << 64) - 1
+_BAND_FORMAT = f'>{ROWS}I'
+
+
+# Lowercased text with punctuation dropped and whitespace collapsed
+def normalize(text):
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+# Overlapping character n-grams (of the UTF-8 bytes). Unlike word shingles they survive
+# inflection ("unit tests" vs "unit testing"), which is how most paraphrases differ.
+def shingles(text, size=SHINGLE_SIZE):
+    data = normalize(text).encode()
+    if len(data) <= size:
+        return {data} if data else set()
+    return {data[i:i + size] for i in range(len(data) - size + 1)}
+
+# MinHash signature of a question: the smallest hash value that landed in each slot
+def signature(text):
+    slots = [None] * NUM_PERM
+    for shingle in shingles(text):
+        h = (zlib.crc32(shingle) * _MIX) & _MASK64
+        slot = h >> (64 - _SLOT_BITS)
+        value = (h >> 32) & _VALUE_MASK
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+
+    if all(value is None for value in slots):
+        return [_EMPTY] * NUM_PERM
+
+    sig = list(slots)
+    for slot, value in enumerate(slots):
+        if value is None:
+            # Borrow from the next filled slot, offset by the distance so borrowed values
+            # only match values borrowed the same way
+            distance = 1
+            while slots[(slot + distance) % NUM_PERM] is None:
+                distance += 1
+            sig[slot] = slots[(slot + distance) % NUM_PERM] + (distance << _VALUE_BITS)
+    return sig
+
+# (band, bucket) pairs a signature falls into
+def band_buckets(sig):
+    return [
+        (band, hashlib.blake2b(struct.pack(_BAND_FORMAT, *sig[band * ROWS:(band + 1) * ROWS]), digest_size=8).hexdigest())
+        for band in range(BANDS)
+    ]
+
+# Estimated Jaccard similarity of the shingle sets behind two signatures
+def similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+# In-memory LSH index, used to dedupe a batch against itself and to sweep a whole pool
+class LSHIndex:
+
+    def __init__(self):
+        self._buckets = {}
+        self._signatures = {}
+
+    def add(self, key, sig):
+        self._signatures[key] = sig
+        for bucket in band_buckets(sig):
+            self._buckets.setdefault(bucket, []).append(key)
+
+    # Returns (key, similarity) of the most similar indexed item at or above threshold, or None
+    def match(self, sig, threshold):
+        candidates = {key for bucket in band_buckets(sig) for key in self._buckets.get(bucket, ())}
+        return best_match(sig, ((key, self._signatures[key]) for key in candidates), threshold)
+
+
+# Picks the closest (key, signature) candidate at or above threshold, preferring the lowest key on ties
+def best_match(sig, candidates, threshold):
+    best = None
+    for key, other in candidates:
+        score = similarity(sig, other)
+        if score >= threshold and (best is None or (score, -key) > (best[1], -best[0])):
+            best = (key, score)
+    return best
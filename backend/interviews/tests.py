@@ -1,3 +1,1180 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock, skipUnless
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from careercracker import resilience
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+from jobs.utils.onet_transport import PooledTransport, TransportError
+from .utils import generateCSQuestionsConcurrently, save_generated_questions, storeAnswerFeedback
+from .feedback_cache import FeedbackCache
+from .llm_gateway import LLMBusyError, LLMGateway
+from .throttling import take_tokens
+from .management.commands.feedbackworker import Command as FeedbackWorker
+from . import similarity
+from .selection import choose_questions, load_pool
+from .progress import mark_active
+from .models import CSQuestion, Interview, InterviewAnswer, QuestionRating, InterviewFeedback, InterviewCounter, QuestionStats, UserProgress, FeedbackCacheEntry
 
-# Create your tests here.
+# Creates `count` interviews for a user, each with 5 questions, 5 answers, ratings and feedback
+def create_interview_history(user, count):
+    questions = [
+        CSQuestion.objects.get_or_create(question_text=f"Question {i}?", category="DS", difficulty=2)[0]
+        for i in range(5)
+    ]
+    for _ in range(count):
+        interview = Interview.objects.create(user=user, job_title="developer", status="COMPLETED")
+        interview.questions.set(questions)
+        for question in questions:
+            InterviewAnswer.objects.create(
+                interview=interview,
+                question=question,
+                user_response="An answer",
+                ai_feedback="Some feedback"
+            )
+            QuestionRating.objects.create(user=user, question=question, interview=interview, rating="LIKE")
+        InterviewFeedback.objects.create(interview=interview, content="Good", rating=4)
+
+# The history endpoint must load a page in a constant number of queries, however many answers it holds
+class PastInterviewListQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="history", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_history_page_query_budget(self):
+        create_interview_history(self.user, 12)
+
+        # count + interviews (with feedback) + answers (with questions) + questions + ratings
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/interviews/history/', {'limit': 12})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 12)
+        answer = response.data['results'][0]['answers'][0]
+        self.assertEqual(answer['question_text'], "Question 0?")
+        self.assertEqual(answer['rating']['rating'], "LIKE")
+
+    def test_query_budget_does_not_grow_with_page_size(self):
+        create_interview_history(self.user, 2)
+        with self.assertNumQueries(5):
+            self.client.get('/api/interviews/history/', {'limit': 12})
+
+        create_interview_history(self.user, 10)
+        with self.assertNumQueries(5):
+            self.client.get('/api/interviews/history/', {'limit': 12})
+
+    def test_cursor_pagination_walks_every_interview_without_counting(self):
+        create_interview_history(self.user, 5)
+
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            # interviews + answers + questions + ratings; no COUNT(*)
+            with self.assertNumQueries(4):
+                response = self.client.get('/api/interviews/history/', {'cursor': cursor, 'limit': 2})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(interview['id'] for interview in response.data['results'])
+            cursor = response.data['next']
+
+        expected = list(Interview.objects.order_by('-start_time', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pagination_counts_on_request_and_rejects_bad_cursors(self):
+        create_interview_history(self.user, 3)
+
+        response = self.client.get('/api/interviews/history/', {'cursor': '', 'with_count': 'true'})
+        self.assertEqual(response.data['count'], 3)
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/api/interviews/history/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_size_is_validated_and_clamped(self):
+        for params in ({'limit': 0}, {'limit': -1}, {'limit': 'ten'}, {'limit': ''}):
+            for extra in ({}, {'cursor': ''}):
+                response = self.client.get('/api/interviews/history/', {**params, **extra})
+                self.assertEqual(response.status_code, 400, (params, extra))
+                self.assertEqual(response.data['error'], "Invalid pagination parameters")
+
+        Interview.objects.bulk_create(Interview(user=self.user, status="COMPLETED") for _ in range(60))
+        response = self.client.get('/api/interviews/history/', {'view': 'summary', 'limit': 10 ** 6})
+        self.assertEqual((len(response.data['results']), response.data['total_pages']), (50, 2))
+        response = self.client.get('/api/interviews/history/', {'view': 'summary', 'cursor': '', 'limit': 10 ** 6})
+        self.assertEqual(len(response.data['results']), 50)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_summary_view_skips_the_transcript(self):
+        create_interview_history(self.user, 3)
+
+        # count + one annotated page query
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/interviews/history/', {'view': 'summary'})
+
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'id', 'job_title', 'start_time', 'end_time', 'status', 'answered_count', 'feedback_rating'})
+        self.assertEqual(row['answered_count'], 5)
+        self.assertEqual(row['feedback_rating'], 4)
+
+    def test_field_selection_and_detail_endpoint(self):
+        create_interview_history(self.user, 1)
+        interview = Interview.objects.get()
+
+        response = self.client.get('/api/interviews/history/', {'fields': 'id,status'})
+        self.assertEqual(response.data['results'], [{'id': interview.id, 'status': 'COMPLETED'}])
+
+        response = self.client.get('/api/interviews/history/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(f'/api/interviews/{interview.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['answers']), 5)
+        self.assertEqual(response.data['answers'][0]['rating']['rating'], 'LIKE')
+
+# Questions are asked in the order fixed at start; fetching the next one is a single lookup and idempotent
+class NextQuestionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="candidate", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            CSQuestion.objects.create(question_text=f"Pool question {i}?", job_title="developer", category="NUL")
+
+    def test_next_question_follows_the_stored_order(self):
+        response = self.client.post('/api/interviews/start/', {'job_title': 'developer'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        interview = Interview.objects.get(id=response.data['id'])
+        self.assertEqual(sorted(interview.question_order), sorted(interview.questions.values_list('id', flat=True)))
+
+        # latest in-progress interview + question by primary key
+        with self.assertNumQueries(2):
+            first = self.client.get('/api/interviews/questions/next/')
+        self.assertEqual(first.data['id'], interview.question_order[0])
+        self.assertEqual(self.client.get('/api/interviews/questions/next/').data, first.data)
+
+        with mock.patch('interviews.views.generateAnswerFeedback', return_value="Nice answer"):
+            self.client.post(f'/api/interviews/{interview.id}/submit/', {'questionId': first.data['id'], 'text': 'My answer'}, format='json')
+
+        second = self.client.get('/api/interviews/questions/next/')
+        self.assertEqual(second.data['id'], interview.question_order[1])
+
+    def test_out_of_order_answers_do_not_skip_questions(self):
+        interview = Interview.objects.get(id=self.client.post('/api/interviews/start/', {'job_title': 'developer'}, format='json').data['id'])
+        order = interview.question_order
+
+        def answer(position):
+            with mock.patch('interviews.views.generateAnswerFeedback', return_value="Nice answer"):
+                self.client.post(f'/api/interviews/{interview.id}/submit/', {'questionId': order[position], 'text': 'My answer'}, format='json')
+            return self.client.get('/api/interviews/questions/next/').data['id']
+
+        self.assertEqual(answer(2), order[0])  # Answering ahead leaves the first question next
+        self.assertEqual(answer(0), order[1])
+        self.assertEqual(answer(1), order[3])  # Moves over the already answered third question
+        interview.refresh_from_db()
+        self.assertEqual(interview.question_cursor, 3)
+
+# Interview numbers come from a per-user counter row, so parallel starts never collide
+class InterviewNumberingTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="racer", password="password123")
+        for i in range(5):
+            CSQuestion.objects.create(question_text=f"Pool question {i}?", job_title="developer", category="NUL")
+
+    def start_interview(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.post('/api/interviews/start/', {'job_title': 'developer'}, format='json')
+
+    def test_numbers_increment_per_user(self):
+        Interview.objects.create(user=self.user, interview_number=7)  # Numbered before the counter existed
+        InterviewCounter.objects.all().delete()
+
+        self.assertEqual(self.start_interview().status_code, 201)
+        self.assertEqual(self.start_interview().status_code, 201)
+        numbers = sorted(Interview.objects.filter(user=self.user).values_list('interview_number', flat=True))
+        self.assertEqual(numbers, [7, 8, 9])
+
+    # SQLite serializes writers by failing them with "database is locked", so this needs a real server
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_parallel_starts_get_distinct_numbers(self):
+        statuses = []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            try:
+                barrier.wait()
+                statuses.append(self.start_interview().status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [201] * 8)
+        numbers = sorted(Interview.objects.filter(user=self.user).values_list('interview_number', flat=True))
+        self.assertEqual(numbers, list(range(1, 9)))
+        self.assertEqual(Interview.questions.through.objects.count(), 8 * 5)
+
+# CSQuestion.job_title_key (and the hash, signature and buckets derived with it) follows job_title on every write path
+class JobTitleKeyTests(TestCase):
+    def assert_synced(self, question, key):
+        question.refresh_from_db()
+        self.assertEqual(question.job_title_key, key)
+        self.assertEqual(question.content_hash, CSQuestion.hash_content(question.job_title, question.question_text))
+        self.assertEqual(question.minhash, similarity.signature(question.question_text))
+        self.assertEqual(set(question.lsh_buckets.values_list('job_title_key', flat=True)), {key})
+
+    def test_save(self):
+        question = CSQuestion.objects.create(question_text="What is a mutex?", job_title="  Backend   Developer ", category="OS")
+        self.assert_synced(question, "backend developer")
+        question.job_title = "SRE"
+        question.save(update_fields=['job_title'])
+        self.assert_synced(question, "sre")
+
+    def test_bulk_create(self):
+        created = CSQuestion.objects.bulk_create([
+            CSQuestion(question_text="What is a mutex?", job_title="Data\tEngineer", category="OS"),
+            CSQuestion(question_text="What is a semaphore?", job_title=None, category="OS"),
+        ])
+        self.assert_synced(created[0], "data engineer")
+        created[1].refresh_from_db()
+        self.assertIsNone(created[1].job_title_key)
+
+    def test_bulk_update(self):
+        questions = [
+            CSQuestion.objects.create(question_text=f"Question {i}?", job_title="developer", category="NUL")
+            for i in range(3)
+        ]
+        for question in questions:
+            question.job_title = " QA  Tester"
+            question.question_text = question.question_text.replace("Question", "Query")
+        CSQuestion.objects.bulk_update(questions, ['job_title', 'question_text'])
+        for question in questions:
+            self.assert_synced(question, "qa tester")
+
+    def test_update(self):
+        question = CSQuestion.objects.create(question_text="What is a mutex?", job_title="developer", category="OS")
+        CSQuestion.objects.filter(id=question.id).update(job_title="Site Reliability  Engineer")
+        self.assert_synced(question, "site reliability engineer")
+        CSQuestion.objects.filter(id=question.id).update(job_title="Developer", question_text="What is a spinlock?")
+        self.assert_synced(question, "developer")
+
+    def test_pool_lookup_ignores_case_and_whitespace(self):
+        question = CSQuestion.objects.create(question_text="What is a mutex?", job_title="Backend Developer", category="OS")
+        for job_title in ("backend developer", "  BACKEND\tdeveloper ", "Backend  Developer"):
+            self.assertEqual([row[0] for row in load_pool(job_title)], [question.id])
+        self.assertEqual(load_pool("backend-developer"), [])
+
+# Every hot query must be served by an index; explainhotqueries fails on a sequential scan
+class HotQueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        call_command('explainhotqueries', users=10, interviews=10, stdout=StringIO())
+        self.assertFalse(Interview.objects.exists())  # Seed data is rolled back
+
+# Paraphrased questions are caught through their LSH buckets at insert time, and swept in bulk by dedupequestions
+class NearDuplicateQuestionTests(TestCase):
+    def test_generated_paraphrases_are_dropped(self):
+        save_generated_questions("QA Tester", ["What is the difference between unit tests and integration tests?"])
+
+        saved = save_generated_questions("qa tester", [
+            "What is the difference between unit testing and integration testing?",  # Paraphrase of the pool
+            "What is the difference between a stack and a queue?",
+            "What is the difference between a stack and a queue!",  # Duplicate within the batch
+        ])
+
+        self.assertEqual([question.question_text for question in saved], ["What is the difference between a stack and a queue?"])
+        self.assertEqual(CSQuestion.objects.filter(job_title_key="qa tester").count(), 2)
+        # Other pools are unaffected
+        self.assertEqual(len(save_generated_questions("developer", ["What is the difference between unit testing and integration testing?"])), 1)
+
+    def test_dedupe_command_marks_and_deletes_unused_duplicates(self):
+        original = CSQuestion.objects.create(question_text="Explain how a hash table works.", job_title="developer", category="NUL")
+        used = CSQuestion.objects.create(question_text="Can you explain how a hash table works?", job_title="developer", category="NUL")
+        unused = CSQuestion.objects.create(question_text="Explain how a hash table works?", job_title="developer", category="NUL")
+        CSQuestion.objects.create(question_text="Explain how a hash table works.", job_title="tester", category="NUL")
+        user = User.objects.create_user(username="dedupe", password="password123")
+        InterviewAnswer.objects.create(interview=Interview.objects.create(user=user), question=used, user_response="An answer")
+
+        call_command('dedupequestions', delete=True, stdout=StringIO())
+
+        used.refresh_from_db()
+        self.assertEqual(used.duplicate_of, original)
+        self.assertFalse(CSQuestion.objects.filter(id=unused.id).exists())
+        self.assertEqual(CSQuestion.objects.filter(duplicate_of__isnull=True).count(), 2)
+        self.assertFalse(used.lsh_buckets.exists())  # Duplicates are never matched again
+
+# importquestions streams JSONL/CSV files in chunks and skips exact duplicates through content_hash
+class QuestionImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        CSQuestion.objects.create(question_text="What is a race condition?", job_title="Developer", category="OS")
+
+    def import_file(self, name, content, **options):
+        path = os.path.join(self.directory.name, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            f.write(content)
+        out, err = StringIO(), StringIO()
+        call_command('importquestions', path, chunk_size=2, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_jsonl_import_counts_inserted_duplicate_and_invalid_rows(self):
+        rows = [
+            {"question_text": "What is a B-tree?", "category": "ds", "difficulty": 3, "job_title": "developer"},
+            {"question_text": "what is a  RACE condition?", "job_title": " developer "},  # Stored already
+            {"question_text": "What is a B-tree?", "job_title": "Developer"},  # Repeated in the file
+            {"question_text": "What is a B-tree?", "job_title": "tester"},  # Another pool
+            {"question_text": "Explain paging.", "difficulty": 9},
+            {"question_text": "Explain paging.", "category": "XYZ"},
+            {"category": "OS"},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\n\n{not json\n'
+        out, err = self.import_file('questions.jsonl.gz', content)
+
+        self.assertIn('Imported 2 questions, skipped 2 duplicates and 4 invalid rows', out)
+        self.assertIn('Line 5: difficulty must be between 1 and 5', err)
+        self.assertIn('Line 9: invalid JSON', err)
+        btree = CSQuestion.objects.get(question_text="What is a B-tree?", job_title_key="developer")
+        self.assertEqual((btree.category, btree.difficulty), ("DS", 3))
+        self.assertEqual(btree.lsh_buckets.count(), 16)  # Indexed for near-duplicate checks like any new question
+
+        out, _ = self.import_file('questions.jsonl.gz', content)
+        self.assertIn('Imported 0 questions, skipped 4 duplicates', out)
+        self.assertEqual(CSQuestion.objects.count(), 3)
+
+    def test_csv_import_with_deferred_signatures(self):
+        content = 'question_text,category,difficulty\n"What is a heap, and where is it used?",DS,2\nExplain paging.,,\n'
+        out, _ = self.import_file('questions.csv', content, job_title='Developer', defer_signatures=True)
+
+        self.assertIn('Imported 2 questions', out)
+        heap = CSQuestion.objects.get(question_text="What is a heap, and where is it used?")
+        self.assertEqual((heap.job_title_key, heap.minhash), ("developer", None))
+        self.assertEqual(CSQuestion.objects.get(question_text="Explain paging.").category, "NUL")
+
+        call_command('dedupequestions', stdout=StringIO())
+        heap.refresh_from_db()
+        self.assertIsNotNone(heap.minhash)
+        self.assertEqual(heap.lsh_buckets.count(), 16)
+
+    def test_hash_backfill_marks_exact_duplicates_and_they_stay_saveable(self):
+        original = CSQuestion.objects.get()
+        # Rows from before the unique content hash: the same question stored twice
+        CSQuestion.objects.update(content_hash=None)
+        copy = CSQuestion.objects.create(question_text="what is a  RACE condition?", job_title=" developer ", category="OS")
+        CSQuestion.objects.update(content_hash=None)
+
+        migration = ('interviews', '0015_question_content_hash')
+        state = MigrationExecutor(connection).loader.project_state(migration)
+        import_module('interviews.migrations.0015_question_content_hash').backfill_hashes(state.apps, None)
+
+        original.refresh_from_db()
+        copy.refresh_from_db()
+        self.assertEqual(original.content_hash, CSQuestion.hash_content("Developer", "What is a race condition?"))
+        self.assertEqual((copy.content_hash, copy.duplicate_of_id), (None, original.id))
+        self.assertEqual((original.lsh_buckets.count(), copy.lsh_buckets.count()), (16, 0))
+
+        copy.difficulty = 4
+        copy.save()
+        copy.refresh_from_db()
+        self.assertEqual((copy.difficulty, copy.content_hash), (4, None))
+
+# Full-text search over the bank: tsvector/GIN on PostgreSQL, FTS5 on SQLite
+class QuestionSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="searcher", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.deadlock = CSQuestion.objects.create(question_text="What is a deadlock and how can it be prevented?", category="OS", difficulty=4)
+        self.database_deadlock = CSQuestion.objects.create(question_text="How do databases detect a deadlock between transactions?", category="DB", difficulty=3)
+        CSQuestion.objects.create(question_text="Explain how a hash table works.", category="DS", difficulty=2)
+
+    def search(self, **params):
+        return self.client.get('/api/interviews/questions/search/', params)
+
+    def test_matches_stems_and_filters(self):
+        response = self.search(q="deadlocks")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row['id'] for row in response.data['results']}, {self.deadlock.id, self.database_deadlock.id})
+        self.assertFalse(response.data['has_next'])
+
+        response = self.search(q="deadlock", category="DB", difficulty=3)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.database_deadlock.id])
+
+        response = self.search(q="deadlock", limit=1, page=2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertFalse(response.data['has_next'])
+
+    def test_ranks_and_pages_through_every_match(self):
+        CSQuestion.objects.bulk_create(
+            CSQuestion(question_text=f"Question {i} touches on a mutex in passing.", category="OS") for i in range(40)
+        )
+        best = CSQuestion.objects.create(question_text="Mutex or mutex-free: when does a mutex beat a lock-free design?", category="OS")
+
+        response = self.search(q="mutex", limit=10)
+        self.assertEqual(response.data['results'][0]['id'], best.id)  # Stored last, still ranked first
+
+        seen, page = [], 1
+        while True:
+            response = self.search(q="mutex", limit=10, page=page)
+            seen.extend(row['id'] for row in response.data['results'])
+            if not response.data['has_next']:
+                break
+            page += 1
+        self.assertEqual((page, len(seen), len(set(seen))), (5, 41, 41))
+
+    def test_index_follows_edits_and_skips_duplicates(self):
+        self.deadlock.question_text = "What is a livelock?"
+        self.deadlock.save()
+        self.assertEqual([row['id'] for row in self.search(q="deadlock").data['results']], [self.database_deadlock.id])
+        self.assertEqual([row['id'] for row in self.search(q="livelock").data['results']], [self.deadlock.id])
+
+        CSQuestion.objects.filter(id=self.database_deadlock.id).update(duplicate_of=self.deadlock)
+        self.assertEqual(self.search(q="deadlock").data['results'], [])
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.search().status_code, 400)
+        self.assertEqual(self.search(q="deadlock", category="XYZ").status_code, 400)
+        self.assertEqual(self.search(q="deadlock", page=0).status_code, 400)
+        self.assertEqual(self.search(q='"deadlock" OR NEAR(').status_code, 200)  # Query syntax is treated as text
+
+# Ratings and starts keep per-question counters current, and selection favours liked questions
+class QuestionStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="rater", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            CSQuestion.objects.create(question_text=f"Pool question {i}?", job_title="developer", category="NUL")
+
+    def rate(self, interview_id, question_id, rating):
+        return self.client.post('/api/interviews/question/rate/', {
+            'question_id': question_id, 'interview_id': interview_id, 'rating': rating
+        }, format='json')
+
+    def test_counters_follow_starts_and_rating_changes(self):
+        interview_id = self.client.post('/api/interviews/start/', {'job_title': 'developer'}, format='json').data['id']
+        question_id = Interview.objects.get(id=interview_id).question_order[0]
+        self.assertEqual(sorted(QuestionStats.objects.values_list('served', flat=True)), [1] * 5)
+
+        self.assertEqual(self.rate(interview_id, question_id, 'LIKE').status_code, 201)
+        self.assertEqual(self.rate(interview_id, question_id, 'DISLIKE').status_code, 200)
+        self.rate(interview_id, question_id, 'DISLIKE')  # Unchanged rating
+
+        stats = QuestionStats.objects.get(question_id=question_id)
+        self.assertEqual((stats.likes, stats.dislikes, stats.served), (0, 1, 1))
+        self.assertEqual(QuestionRating.objects.get().rating, 'DISLIKE')
+
+    def test_thompson_sampling_prefers_liked_questions(self):
+        liked = [(question_id, 40, 2) for question_id in range(1, 6)]
+        disliked = [(question_id, 2, 40) for question_id in range(6, 11)]
+        chosen = choose_questions(liked + disliked, 5, strategy='thompson', rng=random.Random(7))
+        self.assertEqual(sorted(chosen), [1, 2, 3, 4, 5])
+
+        unrated = [(question_id, 0, 0) for question_id in range(11, 14)]
+        self.assertEqual(sorted(choose_questions(unrated, 5, strategy='thompson')), [11, 12, 13])
+
+# The dashboard reads one precomputed row that the write paths keep in step with a full rebuild
+class UserProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="progress", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i, category in enumerate(["DS", "DS", "ALG", "OS", "DB"]):
+            CSQuestion.objects.create(question_text=f"Pool question {i}?", job_title="developer", category=category)
+
+    def stats(self):
+        return self.client.get('/api/interviews/stats/').data
+
+    def test_write_paths_update_the_rollup(self):
+        self.assertEqual(self.stats()['answers_given'], 0)
+
+        interview = Interview.objects.get(id=self.client.post('/api/interviews/start/', {'job_title': 'developer'}, format='json').data['id'])
+        with mock.patch('interviews.views.generateAnswerFeedback', return_value="Nice answer"):
+            for question_id in interview.question_order[:3]:
+                self.client.post(f'/api/interviews/{interview.id}/submit/', {'questionId': question_id, 'text': f'Answer {question_id}'}, format='json')
+        self.client.post(f'/api/interviews/{interview.id}/complete/')
+        self.client.post(f'/api/interviews/{interview.id}/complete/')  # Completing again doesn't count twice
+        self.client.post(f'/api/interviews/{interview.id}/feedback/', {'content': 'Good', 'rating': 2}, format='json')
+        self.client.post(f'/api/interviews/{interview.id}/feedback/', {'content': 'Better', 'rating': 4}, format='json')
+
+        # A single primary-key lookup
+        with self.assertNumQueries(1):
+            stats = self.stats()
+        self.assertEqual(stats['interviews_completed'], 1)
+        self.assertEqual(stats['answers_given'], 3)
+        self.assertEqual(sum(stats['category_counts'].values()), 3)
+        self.assertEqual(stats['average_self_rating'], 4)
+        self.assertEqual(stats['current_streak'], 1)
+
+        incremental = UserProgress.objects.values().get(user=self.user)
+        call_command('rebuildprogress', user_ids=[self.user.id], stdout=StringIO())
+        rebuilt = UserProgress.objects.values().get(user=self.user)
+        incremental.pop('updated_at'), rebuilt.pop('updated_at')
+        self.assertEqual(incremental, rebuilt)
+
+        # Migration 0014's frozen backfill agrees with the current rebuild
+        UserProgress.objects.all().delete()
+        state = MigrationExecutor(connection).loader.project_state(('interviews', '0014_userprogress'))
+        import_module('interviews.migrations.0014_userprogress').backfill_progress(state.apps, None)
+        backfilled = UserProgress.objects.values().get(user=self.user)
+        backfilled.pop('updated_at')
+        self.assertEqual(backfilled, rebuilt)
+
+    def test_streaks(self):
+        progress = UserProgress(user=self.user)
+        for day in [date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 2), date(2026, 3, 3), date(2026, 3, 5)]:
+            mark_active(progress, day)
+        self.assertEqual((progress.current_streak, progress.longest_streak), (1, 3))
+        self.assertEqual(progress.last_active_date, date(2026, 3, 5))
+
+# Analytics exports stream rows through a server-side cursor; the endpoint is staff only
+class InterviewExportTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="analyst", password="password123", is_staff=True)
+        self.user = User.objects.create_user(username="exported", password="password123")
+        create_interview_history(self.user, 2)
+
+    def export(self, dataset, **options):
+        out, err = StringIO(), StringIO()
+        call_command('exportinterviews', dataset, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_command_exports_jsonl_and_csv_incrementally(self):
+        out, err = self.export('answers', chunk_size=3)
+        rows = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[0]['user_id'], self.user.id)
+        self.assertEqual(rows[0]['question_category'], "DS")
+        self.assertIn('Exported 10 answers rows', err)
+        since = err.split('--since ')[1].strip()
+
+        out, _ = self.export('interviews', format='csv')
+        header, *rows = list(csv.reader(StringIO(out)))
+        self.assertEqual(header[:3], ['id', 'user_id', 'interview_number'])
+        self.assertEqual(len(rows), 2)
+
+        later = InterviewAnswer.objects.create(interview=Interview.objects.first(), question=CSQuestion.objects.first(), user_response="Later")
+        out, _ = self.export('answers', since=since)
+        self.assertEqual([json.loads(line)['id'] for line in out.splitlines()], [later.id])
+
+        with self.assertRaises(CommandError):
+            self.export('answers', since='yesterday')
+
+    async def test_endpoint_streams_for_staff_only(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get('/api/interviews/export/feedback/')
+        self.assertEqual(response.status_code, 403)
+
+        await sync_to_async(self.async_client.force_login)(self.staff)
+        response = await self.async_client.get('/api/interviews/export/feedback/', {'output': 'csv', 'since': '2000-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        header, *rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(header, ['id', 'interview_id', 'user_id', 'rating', 'content', 'created_at'])
+        self.assertEqual([row[3] for row in rows], ['4', '4'])
+
+        response = await self.async_client.get('/api/interviews/export/secrets/')
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get('/api/interviews/export/answers/', {'since': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+# Bulk submit evaluates every uncached answer in one completion and reports errors per item
+class BulkSubmitAnswersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bulk", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.questions = [
+            CSQuestion.objects.create(question_text=f"Pool question {i}?", job_title="developer", category="DS")
+            for i in range(5)
+        ]
+        self.interview = Interview.objects.create(user=self.user, question_order=[question.id for question in self.questions])
+        storeAnswerFeedback(self.questions[0].id, "A cached answer", "Cached feedback")
+
+    def submit(self, answers, **params):
+        return self.client.post(f'/api/interviews/{self.interview.id}/submit/bulk/', {'answers': answers, **params}, format='json')
+
+    def test_one_completion_for_the_batch_and_per_item_errors(self):
+        gateway = mock.Mock()
+        # The reply only covers the first of the two uncached answers
+        gateway.complete.return_value = json.dumps({"feedback": [{"item": 1, "feedback": "Good use of hashing"}]})
+        with mock.patch('interviews.utils.get_llm_gateway', return_value=gateway):
+            response = self.submit([
+                {'questionId': self.questions[0].id, 'text': 'A cached answer'},
+                {'questionId': self.questions[2].id, 'text': 'Hash the keys'},
+                {'questionId': self.questions[1].id, 'text': 'No idea'},
+                {'questionId': 999999, 'text': 'Orphan'},
+                {'questionId': self.questions[3].id, 'text': ''},
+            ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(gateway.complete.call_count, 1)
+        self.assertEqual((response.data['saved'], response.data['failed']), (2, 3))
+        results = response.data['results']
+        self.assertEqual(results[0]['ai_feedback'], "Cached feedback")
+        self.assertEqual(results[1]['ai_feedback'], "Good use of hashing")
+        self.assertEqual([results[1]['question_number'], results[0]['question_number']], [2, 1])
+        self.assertEqual([result.get('error') for result in results[2:]], ["Failed to generate feedback", "Question not found", "Missing question ID or response text"])
+
+        self.assertEqual(InterviewAnswer.objects.filter(interview=self.interview).count(), 2)
+        self.interview.refresh_from_db()
+        self.assertEqual(self.interview.question_cursor, 1)  # Question 1 is still unanswered
+        self.assertEqual(UserProgress.objects.get(user=self.user).answers_given, 2)
+
+        response = self.client.post(f'/api/interviews/{self.interview.id}/submit/bulk/', {'answers': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_question_ids_must_be_integers(self):
+        response = self.submit([
+            {'questionId': 0, 'text': 'Zero is an id like any other'},
+            {'questionId': 'abc', 'text': 'Not a number'},
+            {'questionId': 1.5, 'text': 'Not an integer'},
+            {'questionId': True, 'text': 'Not an integer either'},
+            {'questionId': [self.questions[1].id], 'text': 'Not a scalar'},
+            {'text': 'No id at all'},
+            {'questionId': str(self.questions[0].id), 'text': 'A cached answer'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        errors = [result.get('error') for result in response.data['results']]
+        self.assertEqual(errors[0], "Question not found")
+        self.assertEqual(errors[1:5], ["Invalid question ID: expected an integer"] * 4)
+        self.assertEqual(errors[5:], ["Missing question ID or response text", None])
+        self.assertEqual((response.data['saved'], response.data['failed']), (1, 6))
+
+    def test_async_mode_saves_uncached_answers_as_pending(self):
+        with mock.patch('interviews.utils.get_llm_gateway') as gateway:
+            response = self.submit([
+                {'questionId': self.questions[0].id, 'text': 'A cached answer'},
+                {'questionId': self.questions[1].id, 'text': 'Later please'},
+            ], **{'async': True})
+
+        self.assertEqual(response.status_code, 202)
+        gateway.assert_not_called()
+        self.assertEqual([result['feedback_status'] for result in response.data['results']], ["READY", "PENDING"])
+
+@override_settings(
+    LLM_THROTTLE_RATES={'answer_feedback': '3/min', 'question_generation': '1/min'},
+    LLM_THROTTLE_GLOBAL_RATE='4/min',
+)
+class LLMThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="throttled", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.question = CSQuestion.objects.create(question_text="Throttled question?", job_title="developer", category="DS")
+        self.interview = Interview.objects.create(user=self.user, question_order=[self.question.id])
+
+    def submit(self, text):
+        return self.client.post(f'/api/interviews/{self.interview.id}/submit/',
+                                {'questionId': self.question.id, 'text': text}, format='json')
+
+    def test_per_user_and_global_buckets(self):
+        with mock.patch('interviews.views.generateAnswerFeedback', return_value="Nice answer"):
+            self.assertEqual([self.submit(f"Answer {i}").status_code for i in range(3)], [200, 200, 200])
+            response = self.submit("One too many")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '20')  # 3/min refills a token every 20 seconds
+        self.assertEqual(InterviewAnswer.objects.filter(interview=self.interview).count(), 3)
+
+        # A second user has their own bucket but shares the global one, which has a single token left
+        other = User.objects.create_user(username="other", password="password123")
+        self.client.force_authenticate(other)
+        self.interview = Interview.objects.create(user=other, question_order=[self.question.id])
+        with mock.patch('interviews.views.generateAnswerFeedback', return_value="Nice answer"):
+            self.assertEqual([self.submit(f"Answer {i}").status_code for i in range(2)], [200, 429])
+
+    def test_bulk_submit_costs_a_token_per_answer(self):
+        response = self.client.post(f'/api/interviews/{self.interview.id}/submit/bulk/', {'answers': [
+            {'questionId': self.question.id, 'text': f'Answer {i}'} for i in range(4)
+        ], 'async': True}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.submit("Over the limit").status_code, 429)
+
+    def test_start_interview_serves_the_pool_when_generation_is_throttled(self):
+        with mock.patch('interviews.views.generateCSQuestionsConcurrently', return_value=([], 5)) as generate:
+            self.assertEqual(self.client.post('/api/interviews/start/', {'job_title': 'developer'}, format='json').status_code, 201)
+            self.assertEqual(self.client.post('/api/interviews/start/', {'job_title': 'developer'}, format='json').status_code, 201)
+            response = self.client.post('/api/interviews/start/', {'job_title': 'tester'}, format='json')
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    # The Lua script path, against an in-memory Redis when fakeredis is installed
+    @skipUnless(fakeredis, "fakeredis is not installed")
+    def test_redis_buckets(self):
+        redis_cache = {'default': {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/0'}}
+        server = fakeredis.FakeServer()
+        connections = [fakeredis.FakeRedis(server=server) for _ in range(2)]  # e.g. a new connection after a reconnect
+        with override_settings(CACHES=redis_cache), \
+                mock.patch('interviews.throttling.get_redis_connection', side_effect=connections * 3):
+            buckets = [('llm-throttle:test:user:1', 2, 0.1), ('llm-throttle:global', 3, 0.1)]
+            self.assertEqual([take_tokens(buckets) for _ in range(2)], [None, None])
+            self.assertAlmostEqual(take_tokens(buckets), 10, delta=0.5)  # The user's bucket refills at 0.1 tokens/s
+            self.assertIsNone(take_tokens([('llm-throttle:test:user:2', 2, 0.1), ('llm-throttle:global', 3, 0.1)]))
+            self.assertIsNotNone(take_tokens([('llm-throttle:test:user:3', 2, 0.1), ('llm-throttle:global', 3, 0.1)]))
+            tokens = connections[0].hget(cache.make_and_validate_key('llm-throttle:global'), 'tokens')
+            self.assertAlmostEqual(float(tokens), 0, delta=0.01)
+
+class UpstreamResilienceTests(TestCase):
+    def setUp(self):
+        # Breakers are process-wide; give each test fresh ones
+        patcher = mock.patch.dict(resilience._breakers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()  # LLM throttle buckets
+        self.user = User.objects.create_user(username="resilient", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def open_breaker(self, name):
+        breaker = resilience.get_breaker(name)
+        for _ in range(breaker.failure_threshold):
+            breaker.before_call()
+            breaker.record_failure()
+        return breaker
+
+    def test_breaker_opens_fails_fast_and_recovers_after_a_trial_call(self):
+        breaker = resilience.CircuitBreaker('test', failure_threshold=2, reset_timeout=0.05)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+        with self.assertRaises(resilience.CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        breaker.before_call()  # The trial call
+        with self.assertRaises(resilience.CircuitOpenError):
+            breaker.before_call()  # Others wait for its outcome
+        breaker.record_success()
+        breaker.before_call()
+        self.assertEqual(breaker.stats()['state'], 'closed')
+        self.assertEqual((breaker.stats()['opened'], breaker.stats()['rejected']), (1, 2))
+
+    def test_onet_transport_honours_breaker_and_deadline(self):
+        breaker = resilience.CircuitBreaker('onet', failure_threshold=1, reset_timeout=60)
+        transport = PooledTransport(connect_timeout=0.5, max_retries=0, breaker=breaker)
+        with resilience.deadline(-1), self.assertRaisesRegex(TransportError, 'deadline'):
+            transport.get('http://127.0.0.1:9/ws/', {})
+        self.assertEqual(breaker.stats()['state'], 'open')
+        with mock.patch.object(transport, '_request') as request, self.assertRaisesRegex(TransportError, 'circuit open'):
+            transport.get('http://127.0.0.1:9/ws/', {})
+        request.assert_not_called()
+
+    def test_degraded_responses_while_openai_is_down(self):
+        self.open_breaker('openai')
+        question = CSQuestion.objects.create(question_text="Resilient question?", job_title="developer", category="DS")
+        interview = Interview.objects.create(user=self.user, question_order=[question.id])
+
+        with mock.patch('interviews.views.generateAnswerFeedback', side_effect=resilience.CircuitOpenError('openai', 30)):
+            response = self.client.post(f'/api/interviews/{interview.id}/submit/', {'questionId': question.id, 'text': 'Queue me'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['feedback_status'], "PENDING")
+
+        # No pool for this job title and no way to generate one
+        response = self.client.post('/api/interviews/start/', {'job_title': 'astronaut'}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        # An existing pool is still served
+        response = self.client.post('/api/interviews/start/', {'job_title': 'developer'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.client.get('/api/interviews/upstreams/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        breakers = self.client.get('/api/interviews/upstreams/').data['breakers']
+        self.assertEqual((breakers['openai']['state'], breakers['onet']['state']), ('open', 'closed'))
+
+    def test_busy_llm_queues_feedback_like_an_outage(self):
+        question = CSQuestion.objects.create(question_text="Busy question?", job_title="developer", category="DS")
+        interview = Interview.objects.create(user=self.user, question_order=[question.id])
+        busy = LLMBusyError("No LLM capacity available within 5.0s")
+
+        with mock.patch('interviews.views.generateAnswerFeedback', side_effect=busy):
+            response = self.client.post(f'/api/interviews/{interview.id}/submit/', {'questionId': question.id, 'text': 'Queue me'}, format='json')
+        self.assertEqual((response.status_code, response.data['feedback_status']), (202, "PENDING"))
+
+        with mock.patch('interviews.views.generateAnswerFeedbackBatch', side_effect=busy):
+            response = self.client.post(f'/api/interviews/{interview.id}/submit/bulk/', {'answers': [
+                {'questionId': question.id, 'text': f'Queued {i}'} for i in range(2)
+            ]}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual([result['feedback_status'] for result in response.data['results']], ["PENDING"] * 2)
+        self.assertEqual(InterviewAnswer.objects.filter(interview=interview, feedback_status="PENDING").count(), 3)
+
+# The LLM gateway's concurrency slots and the OpenAI breaker's trial call survive busy, cancelled and abandoned calls
+class LLMGatewayTests(TestCase):
+    def setUp(self):
+        self.breaker = resilience.CircuitBreaker('openai', failure_threshold=1, reset_timeout=60)
+        self.gateway = LLMGateway(api_key='test', model='gpt-test', timeout=5, max_retries=0,
+                                  max_concurrency=1, queue_timeout=0.05, breaker=self.breaker)
+
+    # Opens the breaker and lets its reset timeout pass, so the next call is the trial
+    def await_trial(self):
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.breaker._opened_at -= self.breaker.reset_timeout
+
+    def fake_stream(self, create):
+        client = mock.Mock()
+        client.chat.completions.create = create
+        self.gateway._async_client = mock.Mock(return_value=client)
+
+    def slot_free(self):
+        if not self.gateway._semaphore.acquire(timeout=1):
+            return False
+        self.gateway._semaphore.release()
+        return True
+
+    def test_busy_trial_call_hands_the_trial_on(self):
+        self.await_trial()
+        self.gateway._semaphore.acquire()
+        with self.assertRaises(LLMBusyError):
+            self.gateway.complete([{"role": "user", "content": "Hi"}])
+        self.gateway._semaphore.release()
+        self.assertEqual((self.breaker.stats()['state'], self.breaker.retry_in()), ('half_open', 0))
+
+    async def test_stream_cancelled_while_waiting_for_a_slot(self):
+        self.await_trial()
+        self.gateway.queue_timeout = 5
+        self.gateway._semaphore.acquire()  # Every slot is taken
+        self.fake_stream(mock.AsyncMock())
+        task = asyncio.ensure_future(self.gateway.stream([{"role": "user", "content": "Hi"}]).__anext__())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        # The slot granted after the cancellation goes back to the pool, and the next call may be the trial
+        self.gateway._semaphore.release()
+        self.assertTrue(await sync_to_async(self.slot_free)())
+        self.assertEqual(self.breaker.retry_in(), 0)
+
+    async def test_stream_cancelled_before_openai_answers(self):
+        self.await_trial()
+
+        async def create(**kwargs):
+            await asyncio.sleep(10)
+        self.fake_stream(create)
+        task = asyncio.ensure_future(self.gateway.stream([{"role": "user", "content": "Hi"}]).__anext__())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        self.assertTrue(await sync_to_async(self.slot_free)())
+        self.assertEqual((self.breaker.stats()['state'], self.breaker.retry_in()), ('half_open', 0))
+
+    async def test_stream_closed_after_openai_answered(self):
+        self.await_trial()
+
+        async def chunks():
+            for text in ("Good ", "answer."):
+                yield mock.Mock(choices=[mock.Mock(delta=mock.Mock(content=text))])
+        self.fake_stream(mock.AsyncMock(return_value=chunks()))
+        stream = self.gateway.stream([{"role": "user", "content": "Hi"}])
+        self.assertEqual(await stream.__anext__(), "Good ")
+        await stream.aclose()  # The client went away mid-stream
+
+        self.assertTrue(await sync_to_async(self.slot_free)())
+        self.assertEqual(self.breaker.stats()['state'], 'closed')
+
+# The SSE endpoint: bearer or CSRF-checked session auth, event framing and the feedback cache
+class StreamAnswerFeedbackTests(TestCase):
+    def setUp(self):
+        cache.clear()  # LLM throttle buckets
+        self.user = User.objects.create_user(username="streamer", password="password123")
+        self.question = CSQuestion.objects.create(question_text="Streamed question?", job_title="developer", category="DS")
+        self.interview = Interview.objects.create(user=self.user, question_order=[self.question.id])
+        self.url = f'/api/interviews/{self.interview.id}/submit/stream/'
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def post(self, text, client=None, headers=None):
+        client = client or self.async_client
+        return await client.post(self.url, {'questionId': self.question.id, 'text': text},
+                                 content_type='application/json', headers=headers)
+
+    # Splits the body into (event, data) pairs, checking every message is "event:"/"data:" plus a blank line
+    async def read_events(self, response):
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertTrue(body.endswith('\n\n'))
+        events = []
+        for message in body[:-2].split('\n\n'):
+            event, data = message.split('\n')
+            self.assertTrue(event.startswith('event: ') and data.startswith('data: '))
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    async def test_rejects_missing_or_invalid_credentials_and_cross_site_posts(self):
+        with mock.patch('interviews.views.streamAnswerFeedback') as stream:
+            self.assertEqual((await self.post("No auth")).status_code, 401)
+            self.assertEqual((await self.post("Bad token", headers={'Authorization': 'Bearer nonsense'})).status_code, 401)
+
+            # A logged-in browser without the CSRF token, as a third-party page would send it
+            browser = AsyncClient(enforce_csrf_checks=True)
+            await sync_to_async(browser.force_login)(self.user)
+            self.assertEqual((await self.post("Forged", client=browser)).status_code, 401)
+        stream.assert_not_called()
+        self.assertFalse(await InterviewAnswer.objects.filter(interview=self.interview).aexists())
+
+    async def test_streams_tokens_then_done_and_saves_the_answer(self):
+        async def tokens(question_text, response_text):
+            for token in ["Good ", "use of ", "hashing."]:
+                yield token
+
+        with mock.patch('interviews.views.streamAnswerFeedback', side_effect=tokens):
+            response = await self.post("Hash the keys", headers=self.auth)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            events = await self.read_events(response)
+
+        self.assertEqual(events[:3], [("token", {"text": "Good "}), ("token", {"text": "use of "}), ("token", {"text": "hashing."})])
+        event, done = events[3]
+        self.assertEqual((event, done['ai_feedback'], done['feedback_status'], done['question_number']), ("done", "Good use of hashing.", "READY", 1))
+        answer = await InterviewAnswer.objects.aget(id=done['id'])
+        self.assertEqual(answer.ai_feedback, "Good use of hashing.")
+
+    async def test_cache_hit_sends_the_whole_feedback_without_calling_the_model(self):
+        await sync_to_async(storeAnswerFeedback)(self.question.id, "A cached answer", "Cached feedback")
+        with mock.patch('interviews.views.streamAnswerFeedback') as stream:
+            events = await self.read_events(await self.post("A  cached answer", headers=self.auth))
+        stream.assert_not_called()
+        self.assertEqual([event for event, _ in events], ["token", "done"])
+        self.assertEqual(events[0][1], {"text": "Cached feedback"})
+        self.assertEqual(events[1][1]['ai_feedback'], "Cached feedback")
+
+# Async feedback: the feedbackworker claim/retry/pause logic and the PENDING -> READY/FAILED API contract.
+# The worker runs its own threads and connections, so rows have to be committed.
+class FeedbackWorkerTests(TransactionTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(resilience._breakers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username="waiting", password="password123")
+        self.question = CSQuestion.objects.create(question_text="Queued question?", job_title="developer", category="DS")
+        self.interview = Interview.objects.create(user=self.user, question_order=[self.question.id])
+        self.answer = InterviewAnswer.objects.create(
+            interview=self.interview, question=self.question, user_response="Later please", feedback_status="PENDING"
+        )
+
+    def run_worker(self, feedback, **options):
+        out, err = StringIO(), StringIO()
+        with mock.patch('interviews.management.commands.feedbackworker.getAnswerFeedback', side_effect=feedback) as generate:
+            call_command('feedbackworker', once=True, concurrency=1, stdout=out, stderr=err, **options)
+        self.answer.refresh_from_db()
+        return generate, err.getvalue()
+
+    async def fetch(self, **params):
+        return await self.async_client.get(f'/api/interviews/answers/{self.answer.id}/feedback/', params)
+
+    async def test_api_reports_pending_then_ready(self):
+        self.assertEqual((await self.fetch()).status_code, 401)
+        await sync_to_async(self.async_client.force_login)(self.user)
+
+        with self.settings(FEEDBACK_LONG_POLL_INTERVAL=0.05):
+            started = time.monotonic()
+            response = await self.fetch(wait=0.2)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {"id": self.answer.id, "feedback_status": "PENDING", "ai_feedback": None})
+
+        await sync_to_async(self.run_worker)(lambda question, text: "Worker feedback")
+        response = await self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ai_feedback'], "Worker feedback")
+
+        other = await sync_to_async(User.objects.create_user)(username="nosy", password="password123")
+        await sync_to_async(self.async_client.force_login)(other)
+        self.assertEqual((await self.fetch()).status_code, 404)
+
+    def test_retries_until_max_attempts_then_fails(self):
+        generate, err = self.run_worker(RuntimeError("model exploded"), max_attempts=2)
+        self.assertEqual(generate.call_count, 2)
+        self.assertEqual((self.answer.feedback_status, self.answer.feedback_attempts), ("FAILED", 2))
+        self.assertIn('failed (attempt 2)', err)
+
+        self.client.force_login(self.user)
+        response = self.client.get(f'/api/interviews/answers/{self.answer.id}/feedback/')
+        self.assertEqual((response.status_code, response.json()['feedback_status']), (200, "FAILED"))
+
+    def test_claims_pending_and_stale_answers_only(self):
+        now = timezone.now()
+        stale = InterviewAnswer.objects.create(interview=self.interview, question=self.question, user_response="Stuck",
+                                               feedback_status="PROCESSING", feedback_claimed_at=now - timedelta(minutes=10))
+        busy = InterviewAnswer.objects.create(interview=self.interview, question=self.question, user_response="Busy",
+                                              feedback_status="PROCESSING", feedback_claimed_at=now)
+
+        generate, _ = self.run_worker(lambda question, text: f"Feedback on {text}", stale_after=300)
+        self.assertEqual(generate.call_count, 2)
+        stale.refresh_from_db()
+        busy.refresh_from_db()
+        self.assertEqual((self.answer.feedback_status, self.answer.ai_feedback), ("READY", "Feedback on Later please"))
+        self.assertEqual((stale.feedback_status, stale.feedback_attempts), ("READY", 1))
+        self.assertEqual(busy.feedback_status, "PROCESSING")
+
+    def test_pauses_while_the_openai_breaker_is_open(self):
+        breaker = resilience.get_breaker('openai')
+
+        # The breaker opens during a call: the answer goes back without using up an attempt
+        def trip(question, text):
+            for _ in range(breaker.failure_threshold):
+                breaker.record_failure()
+            raise resilience.CircuitOpenError('openai', 30)
+
+        generate, err = self.run_worker(trip)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual((self.answer.feedback_status, self.answer.feedback_attempts), ("PENDING", 0))
+        self.assertIn('postponed', err)
+
+        # While it stays open nothing is claimed
+        generate, err = self.run_worker(lambda question, text: "Too early")
+        generate.assert_not_called()
+        self.assertIn('leaving the backlog for later', err)
+        self.assertEqual(self.answer.feedback_status, "PENDING")
+
+    def test_answers_deleted_or_reclaimed_meanwhile_do_not_stop_the_worker(self):
+        other = InterviewAnswer.objects.create(interview=self.interview, question=self.question,
+                                               user_response="Still here", feedback_status="PENDING")
+        claim_batch = FeedbackWorker.claim_batch
+
+        # The first answer is deleted right after being claimed
+        def claim_then_delete(command):
+            claimed = claim_batch(command)
+            InterviewAnswer.objects.filter(id=self.answer.id).delete()
+            return claimed
+
+        with mock.patch.object(FeedbackWorker, 'claim_batch', claim_then_delete):
+            out, err = StringIO(), StringIO()
+            with mock.patch('interviews.management.commands.feedbackworker.getAnswerFeedback', return_value="Feedback"):
+                call_command('feedbackworker', once=True, concurrency=1, stdout=out, stderr=err)
+        self.assertIn(f'Answer {self.answer.id} was deleted', err.getvalue())
+        other.refresh_from_db()
+        self.assertEqual((other.feedback_status, other.ai_feedback), ("READY", "Feedback"))
+
+        # A slow worker's answer went stale and was reclaimed by another worker while it was generating
+        answer = InterviewAnswer.objects.create(interview=self.interview, question=self.question,
+                                                user_response="Slow", feedback_status="PENDING")
+        self.answer = answer
+
+        def reclaimed(question, text):
+            InterviewAnswer.objects.filter(id=answer.id).update(feedback_claimed_at=timezone.now() + timedelta(seconds=1))
+            return "Late feedback"
+
+        _, err = self.run_worker(reclaimed)
+        self.assertEqual((answer.feedback_status, answer.ai_feedback), ("PROCESSING", ""))
+        self.assertIn('dropped', err)
+
+# Feedback cache: hits and misses, expiry, reuse limits, eviction and which answers share a key
+class FeedbackCacheTests(TestCase):
+    def setUp(self):
+        self.question = CSQuestion.objects.create(question_text="Compare a and b?", category="DS")
+        self.cache = FeedbackCache(policy='normalized', max_entries=3, max_answer_chars=100, max_age_days=30, max_reuse=0)
+
+    def get(self, answer, question_id=None, model='gpt', prompt_version=1):
+        return self.cache.get(question_id or self.question.id, answer, model, prompt_version)
+
+    def test_hit_miss_and_expiry(self):
+        self.assertIsNone(self.get("A is smaller"))
+        self.cache.set(self.question.id, "A is smaller", 'gpt', 1, "Correct")
+        self.assertEqual(self.get("  a IS\nsmaller "), "Correct")
+        self.assertIsNone(self.get("A is smaller", model='other'))
+        self.assertIsNone(self.get("A is smaller", prompt_version=2))
+        self.assertIsNone(self.get("x" * 101))  # Too long to cache
+        self.assertEqual(FeedbackCacheEntry.objects.get().hits, 1)
+
+        FeedbackCacheEntry.objects.update(created_at=timezone.now() - timedelta(days=31))
+        self.assertIsNone(self.get("A is smaller"))
+        self.assertEqual(self.cache.evict(), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['skipped'], stats['evictions']), (1, 4, 1, 1))
+
+    def test_answers_differing_in_symbols_do_not_share_feedback(self):
+        pairs = [("a < b", "a > b"), ("O(n)", "O(n!)"), ("x != y", "x == y")]
+        for first, second in pairs:
+            self.cache.set(self.question.id, first, 'gpt', 1, f"Feedback on {first}")
+        for first, second in pairs:
+            self.assertEqual(self.get(first), f"Feedback on {first}")
+            self.assertIsNone(self.get(second))
+
+        exact = FeedbackCache(policy='exact', max_entries=10, max_answer_chars=100, max_age_days=30, max_reuse=0)
+        self.assertNotEqual(exact.make_key(1, "A < B", 'gpt', 1), exact.make_key(1, "a < b", 'gpt', 1))
+        self.assertEqual(exact.make_key(1, " a < b ", 'gpt', 1), exact.make_key(1, "a < b", 'gpt', 1))
+
+    def test_reuse_limit_and_lru_eviction(self):
+        limited = FeedbackCache(policy='normalized', max_entries=2, max_answer_chars=100, max_age_days=30, max_reuse=1)
+        limited.set(self.question.id, "first", 'gpt', 1, "One")
+        self.assertEqual(limited.get(self.question.id, "first", 'gpt', 1), "One")
+        self.assertIsNone(limited.get(self.question.id, "first", 'gpt', 1))  # Used up; regenerate
+
+        for answer in ("second", "third"):
+            limited.set(self.question.id, answer, 'gpt', 1, answer)
+        FeedbackCacheEntry.objects.filter(ai_feedback="One").update(last_used_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(limited.evict(), 1)
+        self.assertEqual(sorted(FeedbackCacheEntry.objects.values_list('ai_feedback', flat=True)), ["second", "third"])
+
+        out = StringIO()
+        with mock.patch('interviews.management.commands.feedbackcache.get_feedback_cache', return_value=limited):
+            call_command('feedbackcache', stdout=out)
+            self.assertIn('Entries (paid completions): 2', out.getvalue())
+            call_command('feedbackcache', clear=True, stdout=out)
+        self.assertIn('Cleared 2 cached feedback entries.', out.getvalue())
+        self.assertFalse(FeedbackCacheEntry.objects.exists())
+
+# Question generation batches every question into one completion unless fanout is raised
+class QuestionGenerationTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(resilience._breakers, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def generate(self):
+        gateway = mock.Mock()
+        gateway.complete.side_effect = lambda **kwargs: json.dumps({"questions": [
+            f"Question {random.random()}?" for _ in range(kwargs['max_tokens'] // 150)
+        ]})
+        with mock.patch('interviews.utils.fetch_job_context', return_value=("Builds software", ["Write code", "Review code"])), \
+                mock.patch('interviews.utils.get_llm_gateway', return_value=gateway), \
+                mock.patch('interviews.utils.drop_near_duplicates', side_effect=lambda job_title, texts: texts):
+            created, shortfall = generateCSQuestionsConcurrently("developer", 5, deadline=10)
+        return gateway, created, shortfall
+
+    def test_one_batched_completion_by_default(self):
+        gateway, created, shortfall = self.generate()
+        self.assertEqual(gateway.complete.call_count, 1)
+        self.assertEqual(gateway.complete.call_args.kwargs['max_tokens'], 750)
+        self.assertEqual((len(created), shortfall), (5, 0))
+
+    @override_settings(QUESTION_GENERATION_FANOUT=2)
+    def test_fanout_splits_the_batch(self):
+        gateway, created, shortfall = self.generate()
+        self.assertEqual(sorted(call.kwargs['max_tokens'] for call in gateway.complete.call_args_list), [300, 450])
+        self.assertEqual((len(created), shortfall), (5, 0))
@@ -0,0 +1,136 @@
+# Token-bucket throttles for the endpoints that call the LLM.
+# Every request draws from two buckets, one per user and scope (LLM_THROTTLE_RATES) and one
+# shared by everybody (LLM_THROTTLE_GLOBAL_RATE), and only goes through if both have tokens.
+# Buckets live in the default cache so they hold across workers. With Redis (django-redis) both
+# are checked and drawn from in one Lua script, which is atomic and a single round trip; any other
+# cache backend gets a read-modify-write under a process lock (exact for the per-process LocMemCache).
+
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django_redis import get_redis_connection
+from django_redis.cache import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+_RATE_PATTERN = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(s|sec|second|m|min|minute|h|hour|d|day)\s*$')
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# KEYS: bucket keys; ARGV: cost, then capacity and refill rate (tokens/s) per key.
+# Returns 0 when every bucket had `cost` tokens (and takes them), else the seconds until they will.
+_REDIS_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local wait = 0
+local states = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'at')
+    local tokens = tonumber(state[1]) or capacity
+    local at = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+    states[i] = tokens
+end
+if wait == 0 then
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 2])
+        local rate = tonumber(ARGV[i * 2 + 1])
+        redis.call('HMSET', key, 'tokens', states[i] - cost, 'at', now)
+        redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+    end
+end
+return tostring(wait)
+"""
+
+_local_lock = threading.Lock()
+_redis_script = None  # Registered once; runs on whichever client it is given (EVALSHA, loading it if needed)
+
+
+# Parses "<tokens>/<period>" (e.g. "30/min", "100/5m") into (capacity, tokens per second)
+def parse_rate(rate):
+    match = _RATE_PATTERN.match(rate or '')
+    if not match:
+        raise ValueError(f"Invalid throttle rate '{rate}', expected e.g. '30/min'")
+    tokens, multiple, unit = int(match.group(1)), int(match.group(2) or 1), match.group(3)[0]
+    period = multiple * _PERIODS[unit]
+    if not tokens:
+        raise ValueError(f"Invalid throttle rate '{rate}': needs at least one token")
+    return tokens, tokens / period
+
+# The default cache's Redis connection, or None when it is not a django-redis cache
+def _redis_client():
+    if not isinstance(caches['default'], RedisCache):
+        return None
+    return get_redis_connection('default')
+
+# Takes `cost` tokens from every bucket, or from none. buckets are (key, capacity, rate) triples.
+# Returns None when allowed, else the seconds to wait before retrying.
+def take_tokens(buckets, cost=1):
+    global _redis_script
+    client = _redis_client()
+    if client is not None:
+        if _redis_script is None:
+            _redis_script = client.register_script(_REDIS_SCRIPT)
+        args = [cost]
+        for _, capacity, rate in buckets:
+            args.extend([capacity, rate])
+        keys = [cache.make_and_validate_key(key) for key, _, _ in buckets]
+        return float(_redis_script(keys=keys, args=args, client=client)) or None
+
+    with _local_lock:
+        now = time.time()
+        stored = cache.get_many([key for key, _, _ in buckets])
+        levels = []
+        wait = 0
+        for key, capacity, rate in buckets:
+            tokens, at = stored.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0, now - at) * rate)
+            if tokens < cost:
+                wait = max(wait, (cost - tokens) / rate)
+            levels.append(tokens)
+        if wait:
+            return wait
+        for (key, capacity, rate), tokens in zip(buckets, levels):
+            # A bucket left alone until it refills is the same as no bucket
+            cache.set(key, (tokens - cost, now), math.ceil(capacity / rate) + 1)
+    return None
+
+# Checks the user's bucket for a scope and the global bucket; None when allowed, else seconds to wait
+def throttle_wait(request, scope, cost=1):
+    if not settings.LLM_THROTTLE_ENABLED:
+        return None
+    user = getattr(request, 'user', None)
+    ident = f'user:{user.pk}' if user is not None and user.is_authenticated else f'ip:{request.META.get("REMOTE_ADDR")}'
+    capacity, rate = parse_rate(settings.LLM_THROTTLE_RATES[scope])
+    global_capacity, global_rate = parse_rate(settings.LLM_THROTTLE_GLOBAL_RATE)
+    # A request can never cost more than a bucket holds, or it would wait forever
+    cost = max(1, min(cost, capacity, global_capacity))
+    return take_tokens([
+        (f'llm-throttle:{scope}:{ident}', capacity, rate),
+        ('llm-throttle:global', global_capacity, global_rate),
+    ], cost)
+
+def retry_after(wait):
+    return str(max(1, math.ceil(wait)))
+
+
+# DRF throttle for views that call the LLM on every request. Views set `llm_throttle_scope`, and
+# may define `llm_throttle_cost(request)` when one request makes several LLM calls' worth of work.
+# DRF turns a refusal into 429 with Retry-After.
+class LLMRateThrottle(BaseThrottle):
+
+    def allow_request(self, request, view):
+        cost_of = getattr(view, 'llm_throttle_cost', None)
+        self._wait = throttle_wait(request, view.llm_throttle_scope, cost_of(request) if cost_of else 1)
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
@@ -9,21 +9,45 @@ urlpatterns = [
     # Gets the next question in the current interview
     path('questions/next/', views.NextQuestionView.as_view(), name='next_question'),
 
+    # Full-text search over the question bank (?q=, ?category=, ?difficulty=, ?page=, ?limit=)
+    path('questions/search/', views.QuestionSearchView.as_view(), name='question_search'),
+
     # Submits the user's answer to a question
     path('<int:interview_id>/submit/', views.SubmitAnswer.as_view(), name='submit_answer'),
 
+    # Submits several answers at once, with their feedback evaluated in one batched LLM request
+    path('<int:interview_id>/submit/bulk/', views.BulkSubmitAnswers.as_view(), name='bulk_submit_answers'),
+
+    # Same as submit, but streams the AI feedback back as Server-Sent Events
+    path('<int:interview_id>/submit/stream/', views.stream_answer_feedback, name='stream_answer_feedback'),
+
+    # Returns (optionally long-polls for) the AI feedback of an answer submitted in async mode
+    path('answers/<int:answer_id>/feedback/', views.answer_feedback, name='answer_feedback'),
+
     # Marks the interview as complete (sets end time and status)
     path('<int:interview_id>/complete/', views.CompleteInterview.as_view(), name='complete_interview'),
 
     # Returns a list of all past interviews for the user
     path('history/', views.PastInterviewListView.as_view(), name='interview_history'),
 
+    # Returns the user's progress dashboard (completed interviews, answers, coverage, streaks)
+    path('stats/', views.UserStatsView.as_view(), name='user_stats'),
+
+    # Returns the full transcript of a single interview
+    path('<int:interview_id>/', views.InterviewDetailView.as_view(), name='interview_detail'),
+
     # Allows user to rate a question (like/dislike)
     path('question/rate/', views.RateQuestion.as_view(), name='rate_question'),
 
     # Lets the user submit overall feedback after finishing the interview
     path('<int:interview_id>/feedback/', views.SubmitInterviewFeedback.as_view(), name='submit_feedback'),
 
+    # Staff only: streams interviews, answers, ratings or feedback as JSONL/CSV (?output=, ?since=)
+    path('export/<str:dataset>/', views.export_interview_data, name='export_interview_data'),
+
+    # Staff only: circuit breaker state for O*NET and OpenAI
+    path('upstreams/', views.UpstreamStatusView.as_view(), name='upstream_status'),
+
     # Gets the current rating for a specific question+interview combo
     path('question/rating/', views.GetQuestionRating.as_view(), name='get_question_rating'),
 ]
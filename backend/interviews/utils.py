@@ -1,84 +1,383 @@
 from rest_framework.response import Response
 from rest_framework import status
-from jobs.utils.OnetWebService import OnetWebService
 from jobs.utils import api_client
+from .models import CSQuestion
 from .serializers import CSQuestionSerializer
+from .llm_gateway import get_llm_gateway
+from .feedback_cache import get_feedback_cache
+from .similarity import LSHIndex, signature
 from django.conf import settings
+from django.db import transaction, close_old_connections
+from careercracker.resilience import get_breaker
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from functools import partial
+import contextvars
 import os
-import openai
+import re
+import json
+import time
+import threading
 import logging
 
 # Set up logger for tracking errors
 logger = logging.getLogger(__name__)
 
-# This function generates a CS interview question based on a job title
-def createCSQuestion(job_title):
-    job_title = job_title.lower()  # Normalize input
+# Looks up the O*NET job description and task list for a job title
+def fetch_job_context(job_title):
+    # Connect to O*NET web service using credentials from environment (cached responses)
+    onet_ws = api_client.get_onet_service()
+
+    # Get the SOC code for the job title (used to identify roles in O*NET)
+    soc_code = api_client.get_soc_code(job_title, onet_ws)
 
+    # Description and tasks come from the same career document, so fetch it once
+    career = api_client.get_all_job_info(soc_code, onet_ws)
+    description = career['what_they_do']
+    tasks = list(career['on_the_job']['task'])
+    return description, tasks
+
+# Pulls question strings out of the model's reply.
+# Expects {"questions": [...]}, but falls back to a numbered/bulleted list so a
+# partially malformed reply still yields the questions that did come through.
+def parse_question_list(content):
     try:
-        # Connect to O*NET web service using credentials from environment
-        onet_ws = OnetWebService(os.environ.get("ONET_USERNAME"), os.environ.get("ONET_PASSWORD"))
-
-        # Get the SOC code for the job title (used to identify roles in O*NET)
-        soc_code = api_client.get_soc_code(job_title, onet_ws)
-
-        # Pull job description and task info based on the SOC code
-        description = api_client.get_job_info(soc_code, onet_ws)
-        tasks = api_client.get_tasks(soc_code, onet_ws)
-
-        # Set up OpenAI client with secret API key
-        client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-
-        # Create a prompt combining the job info to guide the AI in generating a question
-        prompt = f"""
-            Imagine you are conducting an interview and must ask the candidate a question that relates to one or more items from the following job description
-            and list of tasks.
-
-            Job Description: {description}
-
-            Job Tasks: {tasks}
-
-            Question: 
-        """
-
-        # Ask OpenAI to generate a mock interview question
-        completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": (
-                        "You are an expert technical interviewer. Engage with the candidate as if in a live mock interview, asking a direct, friendly, and constructive question about computer science and technical concepts."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0.7
+        parsed = json.loads(content)
+        items = parsed.get('questions', []) if isinstance(parsed, dict) else parsed
+    except (ValueError, AttributeError):
+        items = [re.sub(r'^\s*(?:\d+[.)]|[-*])\s*', '', line) for line in content.splitlines()]
+        items = [item for item in items if item.rstrip().endswith('?')]
+
+    if not isinstance(items, list):
+        return []
+
+    questions = []
+    seen = set()
+    for item in items:
+        if not isinstance(item, str):
+            continue
+        text = item.strip().strip('"').strip()
+        if not text or text.lower() in seen:
+            continue
+        seen.add(text.lower())
+        questions.append(text)
+    return questions
+
+# Asks the model once for `count` distinct interview questions
+def generate_question_texts(description, tasks, count):
+    # Create a prompt combining the job info to guide the AI in generating the questions
+    prompt = f"""
+        Imagine you are conducting an interview and must ask the candidate {count} distinct questions. Each question should relate to one or more items
+        from the following job description and list of tasks, and no two questions should cover the same topic.
+
+        Job Description: {description}
+
+        Job Tasks: {tasks}
+
+        Respond with a JSON object of the form {{"questions": ["first question", "second question", ...]}} containing exactly {count} questions.
+    """
+
+    # Ask the model to generate the whole batch of mock interview questions in one completion
+    content = get_llm_gateway().complete(
+        model=settings.OPENAI_QUESTION_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You are an expert technical interviewer. Engage with the candidate as if in a live mock interview, asking direct, friendly, and constructive questions about computer science and technical concepts."
+                )
+            },
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=150 * count,
+        temperature=0.7
+    )
+
+    return parse_question_list(content)
+
+# Validates generated question texts and saves them with a single bulk insert.
+# Exact repeats of a stored question are skipped by the content_hash constraint.
+def save_generated_questions(job_title, question_texts):
+    question_texts = drop_near_duplicates(job_title, question_texts)
+    if not question_texts:
+        return []
+
+    data = [{
+        "question_text": question_text,
+        "job_title": job_title,
+        "category": "NUL",  # Defaulted to 'None' since it's generated
+        "difficulty": 1     # Default difficulty level
+    } for question_text in question_texts]
+
+    serializer = CSQuestionSerializer(data=data, many=True)
+    if not serializer.is_valid():
+        # Log if serializer fails validation
+        logger.error(f"Error: {serializer.errors}")
+        raise Exception(f"Question Serializer Error: {serializer.errors}")
+
+    with transaction.atomic():
+        questions = CSQuestion.objects.bulk_create(
+            [CSQuestion(**row) for row in serializer.validated_data], ignore_conflicts=True
         )
-        
-        # Extract the AI-generated question text
-        question_text = completion.choices[0].message.content.strip()
-
-        # Build a dictionary to create a new CSQuestion object
-        data = {
-            "question_text": question_text,
-            "job_title": job_title,
-            "category": "NUL",  # Defaulted to 'None' since it's generated
-            "difficulty": 1     # Default difficulty level
-        }
-
-        # Serialize and save the question
-        question = CSQuestionSerializer(data=data)
-        if question.is_valid():
-            question.save()
-            return True
-        else:
-            # Log if serializer fails validation
-            logger.error(f"Error: {question.errors}")
-            raise Exception(f"Question Serializer Error: {question.errors}")
+    return [question for question in questions if question.pk]
+
+# Drops questions that paraphrase each other or a question already in the job title's pool.
+# Each question is checked through its LSH buckets, so the cost does not grow with the pool.
+def drop_near_duplicates(job_title, question_texts, threshold=None):
+    threshold = settings.QUESTION_DEDUP_THRESHOLD if threshold is None else threshold
+    if not threshold:
+        return list(question_texts)
+
+    signatures = [signature(text) for text in question_texts]
+    matches = CSQuestion.objects.near_duplicates(CSQuestion.normalize_job_title(job_title), signatures, threshold)
+
+    batch = LSHIndex()
+    kept = []
+    for position, (text, sig, match) in enumerate(zip(question_texts, signatures, matches)):
+        if match is None:
+            match = batch.match(sig, threshold)
+            if match is not None:
+                match = (question_texts[match[0]], match[1])
+        if match is not None:
+            logger.info(f"Dropping near-duplicate question for '{job_title}' ({match[1]:.0%} similar to {match[0]!r}): {text!r}")
+            continue
+        batch.add(position, sig)
+        kept.append(text)
+    return kept
+
+# Generates a batch of CS interview questions for a job title with one O*NET lookup
+# and one LLM call. Returns (saved questions, shortfall) where shortfall is how many
+# of the requested questions could not be parsed from the model's reply.
+def createCSQuestionBatch(job_title, count):
+    job_title = CSQuestion.normalize_job_title(job_title)  # Normalize input
+
+    try:
+        description, tasks = fetch_job_context(job_title)
+        question_texts = generate_question_texts(description, tasks, count)[:count]
+        questions = save_generated_questions(job_title, question_texts)
+
+        shortfall = count - len(questions)
+        if shortfall:
+            logger.warning(f"Generated {len(questions)} of {count} questions for '{job_title}' ({shortfall} short)")
+        return questions, shortfall
 
     except Exception as e:
         # Catch anything that goes wrong and log it
-        logger.error(f"Error creating CS question: {e}")
+        logger.error(f"Error creating CS questions: {e}")
         raise e
+
+# This function generates a single CS interview question based on a job title
+def createCSQuestion(job_title):
+    questions, _ = createCSQuestionBatch(job_title, 1)
+    return len(questions) == 1
+
+# Bump whenever buildFeedbackMessages changes so cached feedback from the old prompt is not reused
+FEEDBACK_PROMPT_VERSION = 1
+
+# Builds the chat messages used to ask for feedback on a candidate's answer
+def buildFeedbackMessages(question_text, response_text):
+    prompt = f"""
+    Imagine you're conducting a live mock interview. The candidate has just answered the following coding question. Please provide personalized, conversational feedback as if you're speaking directly to the candidate. Highlight what they did well, identify areas for improvement, and offer specific suggestions to help them progress.
+
+    Question: {question_text}
+
+    Candidate Response: {response_text}
+
+    Feedback:
+    """
+
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert technical interviewer. Engage with the candidate as if in a live mock interview, providing direct, friendly, and constructive feedback."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+# Asks the model for interview-style feedback on a candidate's answer
+def generateAnswerFeedback(question_text, response_text):
+    return get_llm_gateway().complete(
+        model=settings.OPENAI_FEEDBACK_MODEL,
+        messages=buildFeedbackMessages(question_text, response_text),
+        max_tokens=150,
+        temperature=0.7
+    )
+
+# Builds the chat messages asking for feedback on several answers at once, as JSON keyed by item number
+def buildBatchFeedbackMessages(items):
+    answers = "\n\n".join(
+        f"Item {number}\nQuestion: {question_text}\nCandidate Response: {response_text}"
+        for number, (question_text, response_text) in enumerate(items, 1)
+    )
+    prompt = f"""
+    Imagine you're conducting a live mock interview. The candidate has just answered the following {len(items)} coding questions. For each item, provide personalized, conversational feedback as if you're speaking directly to the candidate. Highlight what they did well, identify areas for improvement, and offer specific suggestions to help them progress.
+
+    {answers}
+
+    Respond with a JSON object of the form {{"feedback": [{{"item": 1, "feedback": "..."}}, ...]}} with one entry per item.
+    """
+
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert technical interviewer. Engage with the candidate as if in a live mock interview, providing direct, friendly, and constructive feedback."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+# Pulls per-item feedback out of the model's reply: a list with the feedback of each of the
+# `count` items, or None for items the reply left out or garbled
+def parse_feedback_batch(content, count):
+    feedback = [None] * count
+    try:
+        parsed = json.loads(content)
+    except ValueError:
+        return feedback
+    entries = parsed.get('feedback') if isinstance(parsed, dict) else parsed
+    if not isinstance(entries, list):
+        return feedback
+
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get('feedback'), str):
+            continue
+        try:
+            number = int(entry.get('item'))
+        except (TypeError, ValueError):
+            continue
+        text = entry['feedback'].strip()
+        if 1 <= number <= count and text and feedback[number - 1] is None:
+            feedback[number - 1] = text
+    return feedback
+
+# Asks the model for feedback on several (question text, response text) pairs in one completion.
+# Returns the feedback of each pair, None where the reply had nothing usable for it.
+def generateAnswerFeedbackBatch(items):
+    if not items:
+        return []
+    content = get_llm_gateway().complete(
+        model=settings.OPENAI_FEEDBACK_MODEL,
+        messages=buildBatchFeedbackMessages(items),
+        response_format={"type": "json_object"},
+        max_tokens=150 * len(items),
+        temperature=0.7
+    )
+    return parse_feedback_batch(content, len(items))
+
+# Returns cached feedback for an identical answer to the same question, or None
+def cachedAnswerFeedback(question_id, response_text):
+    return get_feedback_cache().get(question_id, response_text, settings.OPENAI_FEEDBACK_MODEL, FEEDBACK_PROMPT_VERSION)
+
+def storeAnswerFeedback(question_id, response_text, feedback):
+    get_feedback_cache().set(question_id, response_text, settings.OPENAI_FEEDBACK_MODEL, FEEDBACK_PROMPT_VERSION, feedback)
+
+# Returns feedback for an answer, only calling the LLM when no cached feedback can be reused
+def getAnswerFeedback(question, response_text):
+    feedback = cachedAnswerFeedback(question.id, response_text)
+    if feedback is None:
+        feedback = generateAnswerFeedback(question.question_text, response_text)
+        storeAnswerFeedback(question.id, response_text, feedback)
+    return feedback
+
+# Streams feedback on a candidate's answer, yielding text fragments as the model produces them
+def streamAnswerFeedback(question_text, response_text):
+    return get_llm_gateway().stream(
+        model=settings.OPENAI_FEEDBACK_MODEL,
+        messages=buildFeedbackMessages(question_text, response_text),
+        max_tokens=150,
+        temperature=0.7
+    )
+
+# Shared, bounded pool for the O*NET and OpenAI calls made on the StartInterview cold path
+_generation_executor = None
+_generation_executor_lock = threading.Lock()
+
+def _get_generation_executor():
+    global _generation_executor
+    if _generation_executor is None:
+        with _generation_executor_lock:
+            if _generation_executor is None:
+                _generation_executor = ThreadPoolExecutor(
+                    max_workers=settings.QUESTION_GENERATION_WORKERS,
+                    thread_name_prefix='question-generation'
+                )
+    return _generation_executor
+
+# Runs a function on a pool thread, making sure the thread never holds on to a stale DB connection
+def _run_in_worker(func, *args):
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+# Submits to the generation pool under the caller's context, so the request deadline applies to the call
+def _submit(func, *args):
+    return _get_generation_executor().submit(contextvars.copy_context().run, func, *args)
+
+# Saves questions from a generation call that finished after the request deadline,
+# so the work still grows the pool for the next interview
+def _save_late_questions(job_title, future):
+    if future.cancelled() or future.exception() is not None or not future.result():
+        return
+    _get_generation_executor().submit(_run_in_worker, _save_quietly, job_title, future.result())
+
+def _save_quietly(job_title, question_texts):
+    try:
+        save_generated_questions(job_title, question_texts)
+    except Exception as e:
+        logger.error(f"Error saving late CS questions for '{job_title}': {e}")
+
+# Generates `count` questions for a job title on the shared pool: the O*NET lookup runs off the
+# request thread, then one batched completion asks for every question. With QUESTION_GENERATION_FANOUT
+# above 1 the batch is split into that many parallel calls, each on a different slice of the job's
+# tasks, trading extra tokens for latency.
+# Stops waiting once `deadline` seconds have passed and returns whatever was ready
+# as (saved questions, shortfall); calls still running are saved when they finish.
+# Nothing is generated while O*NET or OpenAI is unavailable, so callers fall back to the existing pool.
+def generateCSQuestionsConcurrently(job_title, count, deadline):
+    job_title = CSQuestion.normalize_job_title(job_title)  # Normalize input
+    expires = time.monotonic() + deadline
+
+    if get_breaker('openai').retry_in():
+        logger.warning(f"Not generating questions for '{job_title}': OpenAI circuit breaker is open")
+        return [], count
+
+    try:
+        description, tasks = _submit(_run_in_worker, fetch_job_context, job_title).result(timeout=deadline)
+    except FutureTimeoutError:
+        logger.warning(f"O*NET lookup for '{job_title}' missed the {deadline}s deadline")
+        return [], count
+    except Exception as e:
+        logger.warning(f"O*NET lookup for '{job_title}' failed: {e}")
+        return [], count
+
+    fanout = max(1, min(count, settings.QUESTION_GENERATION_FANOUT))
+    chunk_sizes = [count // fanout + (1 if i < count % fanout else 0) for i in range(fanout)]
+    futures = [
+        _submit(generate_question_texts, description, tasks[i::fanout] or tasks, size)
+        for i, size in enumerate(chunk_sizes)
+    ]
+
+    done, pending = wait(futures, timeout=max(0, expires - time.monotonic()))
+
+    question_texts = []
+    seen = set()
+    for future in futures:
+        if future not in done:
+            continue
+        if future.exception() is not None:
+            logger.error(f"Error generating CS questions for '{job_title}': {future.exception()}")
+            continue
+        for text in future.result():
+            if text.lower() not in seen:
+                seen.add(text.lower())
+                question_texts.append(text)
+
+    for future in pending:
+        future.add_done_callback(partial(_save_late_questions, job_title))
+
+    questions = save_generated_questions(job_title, question_texts[:count]) if question_texts else []
+    shortfall = count - len(questions)
+    if shortfall:
+        logger.warning(f"Generated {len(questions)} of {count} questions for '{job_title}' within {deadline}s ({len(pending)} calls still running)")
+    return questions, shortfall
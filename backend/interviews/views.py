@@ -1,56 +1,210 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import PermissionDenied
 from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponseNotAllowed
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+import asyncio
+import base64
+import binascii
+import json
 import logging
-import random
-import openai
+import time
+from itertools import islice
 from django.conf import settings
-from .models import Interview, CSQuestion, InterviewAnswer, QuestionRating, InterviewFeedback
-from .serializers import InterviewSerializer, CSQuestionSerializer
+from .models import Interview, CSQuestion, InterviewAnswer, QuestionRating, InterviewFeedback, QuestionStats, UserProgress
+from .serializers import InterviewSerializer, InterviewSummarySerializer, CSQuestionSerializer, CSQuestionSearchSerializer
+from .search import search_questions
+from .export import DATASETS, FORMATS as EXPORT_FORMATS, CONTENT_TYPES as EXPORT_CONTENT_TYPES, export_columns, export_rows, parse_since, render_lines
+from .selection import load_pool, choose_questions
+from .progress import record_answers, record_completion, record_feedback, progress_summary
+from .throttling import LLMRateThrottle, retry_after, throttle_wait
+from .llm_gateway import LLMBusyError
 from django.core.paginator import Paginator
+from django.db import DatabaseError, transaction
+from django.db.models import Count, F, Prefetch, Q
+from django.utils.dateparse import parse_datetime
 from jobs.utils.OnetWebService import OnetWebService
-from .utils import createCSQuestion
+from careercracker.resilience import CircuitOpenError, DeadlineExceeded, get_breaker
+from .utils import generateCSQuestionsConcurrently, generateAnswerFeedback, generateAnswerFeedbackBatch, cachedAnswerFeedback, storeAnswerFeedback, streamAnswerFeedback
 import os
 
 # Set up logger for debugging and error logging
 logger = logging.getLogger(__name__)
 
-# Returns a paginated list of the user's previous interviews (both completed and in progress)
+# Loads the user's question ratings for a set of interviews, keyed by (interview_id, question_id)
+def ratings_for_interviews(user, interviews):
+    ratings = QuestionRating.objects.filter(user=user, interview__in=[interview.id for interview in interviews])
+    return {(rating.interview_id, rating.question_id): rating for rating in ratings}
+
+# Cursors are opaque to clients: base64 of the (start_time, id) of the last interview on the page
+def encode_history_cursor(interview):
+    raw = json.dumps([interview.start_time.isoformat(), interview.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_history_cursor(cursor):
+    try:
+        start_time, interview_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        parsed = parse_datetime(start_time)
+        if parsed is None:
+            raise ValueError(cursor)
+        return parsed, int(interview_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+# Parses ?fields=a,b,c against what the serializer can render; None means every field
+def selected_fields(request, serializer_class):
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = set(fields) - set(serializer_class.Meta.fields)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+# Adds only the joins/prefetches the selected fields of the full transcript need
+def transcript_queryset(interviews, fields=None):
+    wanted = set(fields or InterviewSerializer.Meta.fields)
+    if 'feedback' in wanted:
+        interviews = interviews.select_related('feedback')
+    if 'answers' in wanted:
+        interviews = interviews.prefetch_related(
+            Prefetch('answers', queryset=InterviewAnswer.objects.select_related('question'))
+        )
+    if 'questions' in wanted:
+        interviews = interviews.prefetch_related('questions')
+    return interviews
+
+# Serializes full transcripts, with all of the interviews' ratings fetched in one query
+def serialize_transcripts(request, interviews, fields=None):
+    context = {'request': request}
+    if fields is None or 'answers' in fields:
+        context['ratings'] = ratings_for_interviews(request.user, interviews)
+    return InterviewSerializer(interviews, many=True, context=context, fields=fields).data
+
+# Saves an answer and counts it towards the user's progress in one transaction
+def create_answer(interview, question, response_text, **fields):
+    with transaction.atomic():
+        answer = InterviewAnswer.objects.create(
+            interview=interview,
+            question=question,
+            user_response=response_text,
+            **fields
+        )
+        record_answers(interview.user_id, [question.category], answer.created_at)
+    return answer
+
+# Returns a paginated list of the user's previous interviews (both completed and in progress).
+# With ?page= it uses page numbers (and a COUNT) as before; with ?cursor= (empty for the first page)
+# it pages by (start_time, id) so deep pages cost the same as the first, and only counts on ?with_count=true.
+# ?view=summary returns lightweight rows without the transcript, and ?fields= picks the fields to render.
 class PastInterviewListView(APIView):
     permission_classes = [IsAuthenticated]  # User must be logged in
 
     def get(self, request):
+        summary = request.query_params.get('view') == 'summary'
         try:
-            # Get pagination parameters with defaults
+            fields = selected_fields(request, InterviewSummarySerializer if summary else InterviewSerializer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Get pagination parameters with defaults; pages hold at most 50 interviews
             page = int(request.query_params.get('page', 1))
-            limit = int(request.query_params.get('limit', 12))
+            limit = min(int(request.query_params.get('limit', 12)), 50)
+            if limit < 1:
+                raise ValueError(limit)
 
             # Get user's interviews that are either completed or still in progress
             interviews = Interview.objects.filter(
                 user=request.user,
                 status__in=["IN_PROGRESS", "COMPLETED"]
-            ).order_by('-start_time')  # Sort from most recent
+            ).order_by('-start_time', '-id')  # Sort from most recent
+
+            if summary:
+                interviews = interviews.annotate(
+                    answered_count=Count('answers'),
+                    feedback_rating=F('feedback__rating')
+                )
+            else:
+                # Load the nested answers, questions and feedback up front
+                interviews = transcript_queryset(interviews, fields)
+
+            if 'cursor' in request.query_params:
+                return self.cursor_page(request, interviews, request.query_params['cursor'], limit, summary, fields)
 
             # Paginate the interview list
             paginator = Paginator(interviews, limit)
             page_obj = paginator.get_page(page)
-
-            # Serialize interview data
-            serializer = InterviewSerializer(page_obj.object_list, many=True)
+            page_interviews = list(page_obj.object_list)
 
             return Response({
-                'results': serializer.data,
+                'results': self.serialize(request, page_interviews, summary, fields),
                 'count': paginator.count,
                 'page': page_obj.number,
                 'total_pages': paginator.num_pages
             })
 
+        except ValueError:
+            return Response({"error": "Invalid pagination parameters"}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Error in PastInterviewListView: {str(e)}", exc_info=True)
             return Response({"error": "Failed to fetch interviews"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # Keyset pagination: seek past the cursor instead of using OFFSET, fetching one extra row to detect a next page
+    def cursor_page(self, request, interviews, cursor, limit, summary, fields):
+        page_interviews = interviews
+        if cursor:
+            start_time, interview_id = decode_history_cursor(cursor)
+            page_interviews = interviews.filter(
+                Q(start_time__lt=start_time) | Q(start_time=start_time, id__lt=interview_id)
+            )
+
+        page_interviews = list(page_interviews[:limit + 1])
+        has_next = len(page_interviews) > limit
+        page_interviews = page_interviews[:limit]
+
+        data = {
+            'results': self.serialize(request, page_interviews, summary, fields),
+            'next': encode_history_cursor(page_interviews[-1]) if has_next else None,
+        }
+        if request.query_params.get('with_count', '').lower() in ('1', 'true', 'yes'):
+            data['count'] = interviews.order_by().values('id').count()
+        return Response(data)
+
+    def serialize(self, request, page_interviews, summary, fields):
+        if summary:
+            return InterviewSummarySerializer(page_interviews, many=True, fields=fields).data
+        return serialize_transcripts(request, page_interviews, fields)
+
+# Returns the full transcript (questions, answers with ratings, feedback) of one of the user's interviews
+class InterviewDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, interview_id):
+        try:
+            fields = selected_fields(request, InterviewSerializer)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            interviews = transcript_queryset(Interview.objects.filter(id=interview_id, user=request.user), fields)
+            interview = interviews.get()
+            return Response(serialize_transcripts(request, [interview], fields)[0])
+
+        except Interview.DoesNotExist:
+            return Response({"error": "Interview not found"}, status=404)
+        except Exception as e:
+            logger.error(f"Error fetching interview {interview_id}: {str(e)}", exc_info=True)
+            return Response({"error": "Failed to fetch interview"}, status=500)
+
 # Starts a new interview session for the user with a job title
 class StartInterview(APIView):
     permission_classes = [IsAuthenticated]
@@ -68,29 +222,55 @@ class StartInterview(APIView):
             if job_title is None:
                 return Response({"error": "Job title required for interview creation"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Try to get existing questions
-            questions = list(CSQuestion.objects.filter(job_title__iexact=job_title))
-
-            # If not enough, attempt to generate more
-            if len(questions) < 5:
-                for _ in range(5):
-                    if not createCSQuestion(job_title=job_title):
-                        return Response({"error": "Failed to create new questions"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                questions = list(CSQuestion.objects.filter(job_title__iexact=job_title))
-
-            if len(questions) < 5:
-                return Response({"error": "Not enough questions available"}, status=400)
-
-            # Randomly choose 5 questions
-            selected_questions = random.sample(questions, 5)
+            # Load the existing pool with its rating counts (index seek on the normalized job title)
+            pool = load_pool(job_title)
+
+            # If not enough, generate 5 more with concurrent LLM calls bounded by a deadline,
+            # unless the user (or everyone) is over the generation rate limit
+            wait = None
+            if len(pool) < 5:
+                wait = throttle_wait(request, 'question_generation')
+                if wait is None:
+                    created, shortfall = generateCSQuestionsConcurrently(
+                        job_title=job_title,
+                        count=5,
+                        deadline=settings.QUESTION_GENERATION_DEADLINE
+                    )
+                    pool.extend((question.id, 0, 0) for question in created)
+
+            # Serve whatever is available if generation ran out of time or was throttled
+            if not pool and wait is not None:
+                return Response({"error": "Too many interviews started, try again later"},
+                                status=status.HTTP_429_TOO_MANY_REQUESTS, headers={"Retry-After": retry_after(wait)})
+            if not pool:
+                unavailable = max(get_breaker('onet').retry_in(), get_breaker('openai').retry_in())
+                if unavailable:
+                    return Response({"error": "Question generation is temporarily unavailable, try again later"},
+                                    status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": retry_after(unavailable)})
+                return Response({"error": "Failed to create new questions"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            # Choose up to 5 questions, favouring well-rated ones
+            selected_ids = choose_questions(pool, 5)
+
+            # Create the interview and its question links in one transaction,
+            # fixing the order the questions will be asked in
+            with transaction.atomic():
+                interview = Interview.objects.create(
+                    user=request.user,
+                    job_title=job_title,
+                    status="IN_PROGRESS",
+                    question_order=selected_ids
+                )
+                Interview.questions.through.objects.bulk_create([
+                    Interview.questions.through(interview_id=interview.id, csquestion_id=question_id)
+                    for question_id in selected_ids
+                ])
 
-            # Create the interview instance
-            interview = Interview.objects.create(
-                user=request.user,
-                job_title=job_title,
-                status="IN_PROGRESS"
-            )
-            interview.questions.set(selected_questions)
+            # Served counts only steer selection, so a failed update must not fail the interview
+            try:
+                QuestionStats.record_served(selected_ids)
+            except DatabaseError as e:
+                logger.warning(f"Could not update served counts for interview {interview.id}: {e}")
 
             return Response({
                 "id": interview.id,
@@ -102,9 +282,15 @@ class StartInterview(APIView):
             logger.error(f"Error starting interview: {str(e)}")
             return Response({"error": "Failed to start interview"}, status=500)
 
-# Submits an answer for a specific interview and question, returns AI feedback
+# Submits an answer for a specific interview and question, returns AI feedback.
+# In async mode the answer is saved right away as PENDING and the view returns 202;
+# the feedbackworker command fills in the feedback, which the client fetches from answer_feedback.
+# Answers are queued the same way when OpenAI is unavailable or busy, or the request runs out of time.
+# Rate limited per user and globally (429 with Retry-After), one token per answer.
 class SubmitAnswer(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [LLMRateThrottle]
+    llm_throttle_scope = 'answer_feedback'
 
     def post(self, request, interview_id):
         try:
@@ -117,41 +303,35 @@ class SubmitAnswer(APIView):
 
             question = CSQuestion.objects.get(id=question_id)
 
-            # Use OpenAI to get feedback on the response
-            client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-
-            prompt = f"""
-            Imagine you're conducting a live mock interview. The candidate has just answered the following coding question. Please provide personalized, conversational feedback as if you're speaking directly to the candidate. Highlight what they did well, identify areas for improvement, and offer specific suggestions to help them progress.
+            # Identical answers to the same question reuse cached feedback in both modes
+            feedback = cachedAnswerFeedback(question.id, response_text)
 
-            Question: {question.question_text}
+            if feedback is None and not self.wants_async(request):
+                try:
+                    feedback = generateAnswerFeedback(question.question_text, response_text)
+                except (CircuitOpenError, DeadlineExceeded, LLMBusyError) as e:
+                    logger.warning(f"Queueing feedback on question {question.id} for the feedback worker: {e}")
+                else:
+                    storeAnswerFeedback(question.id, response_text, feedback)
 
-            Candidate Response: {response_text}
-
-            Feedback:
-            """
-
-            completion = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert technical interviewer. Engage with the candidate as if in a live mock interview, providing direct, friendly, and constructive feedback."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
+            if feedback is None:
+                # Save the answer now and let a feedback worker call the LLM
+                answer = create_answer(interview, question, response_text, feedback_status="PENDING")
+                interview.advance_past(question.id)
+                answered_count = InterviewAnswer.objects.filter(interview=interview).count()
 
-            feedback = completion.choices[0].message.content.strip()
+                return Response({
+                    "id": answer.id,
+                    "question_text": question.question_text,
+                    "user_response": response_text,
+                    "feedback_status": answer.feedback_status,
+                    "created_at": answer.created_at,
+                    "question_number": answered_count
+                }, status=status.HTTP_202_ACCEPTED)
 
             # Save the answer with feedback
-            answer = InterviewAnswer.objects.create(
-                interview=interview,
-                question=question,
-                user_response=response_text,
-                ai_feedback=feedback
-            )
+            answer = create_answer(interview, question, response_text, ai_feedback=feedback)
+            interview.advance_past(question.id)
 
             answered_count = InterviewAnswer.objects.filter(interview=interview).count()
 
@@ -170,21 +350,344 @@ class SubmitAnswer(APIView):
             logger.error(f"Error submitting answer: {str(e)}")
             return Response({"error": "Failed to process answer"}, status=500)
 
+    # Clients opt in with ?async=true (or "async": true in the body); FEEDBACK_ASYNC makes it the default
+    def wants_async(self, request):
+        value = request.query_params.get('async', request.data.get('async'))
+        if value is None:
+            return settings.FEEDBACK_ASYNC
+        return str(value).lower() in ('1', 'true', 'yes')
+
+# Submits several answers to an interview at once: {"answers": [{"questionId": ..., "text": ...}, ...]}.
+# Cached feedback is reused, the rest is evaluated in one batched LLM request, and every answer is
+# written with a single bulk insert. Each item gets its own entry in "results" (with "error" when it
+# could not be saved), so one bad item doesn't fail the batch. Async mode works as in SubmitAnswer.
+class BulkSubmitAnswers(SubmitAnswer):
+
+    # Each answer in the batch takes a token; malformed bodies take one and are rejected by post()
+    def llm_throttle_cost(self, request):
+        items = request.data.get('answers') if isinstance(request.data, dict) else None
+        return len(items) if isinstance(items, list) and items else 1
+
+    def post(self, request, interview_id):
+        items = request.data.get('answers') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Expected a non-empty 'answers' list"}, status=400)
+        if len(items) > settings.FEEDBACK_BULK_MAX_ANSWERS:
+            return Response({"error": f"At most {settings.FEEDBACK_BULK_MAX_ANSWERS} answers per request"}, status=400)
+
+        try:
+            interview = Interview.objects.get(id=interview_id, user=request.user)
+            results = [None] * len(items)
+            submitted = self.validate_items(items, results)
+            questions = CSQuestion.objects.in_bulk({question_id for _, question_id, _ in submitted})
+
+            pending = []  # (index, question, response text) of the answers still to save
+            for index, question_id, response_text in submitted:
+                if question_id in questions:
+                    pending.append((index, questions[question_id], response_text))
+                else:
+                    results[index] = {"index": index, "questionId": question_id, "error": "Question not found"}
+
+            feedback = {index: cachedAnswerFeedback(question.id, response_text) for index, question, response_text in pending}
+            uncached = [item for item in pending if feedback[item[0]] is None]
+            run_async = self.wants_async(request)
+            if uncached and not run_async:
+                self.evaluate(uncached, feedback, results)
+
+            to_save = [item for item in pending if results[item[0]] is None]
+            with transaction.atomic():
+                answers = InterviewAnswer.objects.bulk_create([
+                    InterviewAnswer(
+                        interview=interview,
+                        question=question,
+                        user_response=response_text,
+                        ai_feedback=feedback[index] or '',
+                        feedback_status="READY" if feedback[index] is not None else "PENDING"
+                    )
+                    for index, question, response_text in to_save
+                ])
+                if answers:
+                    record_answers(interview.user_id, [question.category for _, question, _ in to_save], answers[0].created_at)
+            interview.advance_past(*[question.id for _, question, _ in to_save])
+            answered_count = InterviewAnswer.objects.filter(interview=interview).count()
+
+            first_number = answered_count - len(answers) + 1
+            for position, ((index, question, response_text), answer) in enumerate(zip(to_save, answers)):
+                results[index] = {
+                    "index": index,
+                    "id": answer.id,
+                    "questionId": question.id,
+                    "question_text": question.question_text,
+                    "user_response": response_text,
+                    "ai_feedback": answer.ai_feedback,
+                    "feedback_status": answer.feedback_status,
+                    "created_at": answer.created_at,
+                    "question_number": first_number + position
+                }
+
+            any_pending = any(answer.feedback_status == "PENDING" for answer in answers)
+            return Response({
+                "results": results,
+                "saved": len(answers),
+                "failed": len(items) - len(answers),
+            }, status=status.HTTP_202_ACCEPTED if any_pending else status.HTTP_200_OK)
+
+        except Interview.DoesNotExist:
+            return Response({"error": "Interview not found"}, status=404)
+        except Exception as e:
+            logger.error(f"Error submitting answers: {str(e)}")
+            return Response({"error": "Failed to process answers"}, status=500)
+
+    # Returns (index, question id, response text) of the well-formed items, recording errors for the rest
+    def validate_items(self, items, results):
+        submitted = []
+        for index, item in enumerate(items):
+            question_id = item.get('questionId') if isinstance(item, dict) else None
+            response_text = item.get('text') if isinstance(item, dict) else None
+            if question_id in (None, '') or not isinstance(response_text, str) or not response_text.strip():
+                results[index] = {"index": index, "questionId": question_id, "error": "Missing question ID or response text"}
+                continue
+            # Integers, or strings holding one; int() would silently truncate floats and accept booleans
+            try:
+                if isinstance(question_id, bool) or not isinstance(question_id, (int, str)):
+                    raise TypeError
+                submitted.append((index, int(question_id), response_text))
+            except (TypeError, ValueError):
+                results[index] = {"index": index, "questionId": question_id, "error": "Invalid question ID: expected an integer"}
+        return submitted
+
+    # Fills in feedback for uncached answers with one batched completion; answers the reply has no
+    # feedback for (or all of them, if the call fails) are reported as errors and not saved.
+    # When OpenAI is unavailable or busy they are left without feedback, to be saved as PENDING.
+    def evaluate(self, uncached, feedback, results):
+        try:
+            generated = generateAnswerFeedbackBatch([(question.question_text, response_text) for _, question, response_text in uncached])
+        except (CircuitOpenError, DeadlineExceeded, LLMBusyError) as e:
+            logger.warning(f"Queueing {len(uncached)} answers for the feedback worker: {e}")
+            return
+        except Exception as e:
+            logger.error(f"Error generating batched answer feedback: {str(e)}")
+            generated = [None] * len(uncached)
+
+        for (index, question, response_text), text in zip(uncached, generated):
+            if text is None:
+                results[index] = {"index": index, "questionId": question.id, "error": "Failed to generate feedback"}
+                continue
+            feedback[index] = text
+            storeAnswerFeedback(question.id, response_text, text)
+
+# Returns the AI feedback for an answer submitted in async mode.
+# With ?wait=<seconds> the request is held (long-poll) until the feedback is ready or the wait runs out.
+# It is an async view so a waiting client costs an idle coroutine rather than a worker thread
+# when served over ASGI (see careercracker/asgi.py).
+async def answer_feedback(request, answer_id):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    user = await sync_to_async(authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+
+    try:
+        wait = min(float(request.GET.get('wait', 0)), settings.FEEDBACK_LONG_POLL_MAX)
+    except ValueError:
+        return JsonResponse({"error": "Invalid wait value"}, status=400)
+
+    try:
+        answers = InterviewAnswer.objects.filter(id=answer_id, interview__user=user)
+        fields = ('id', 'feedback_status', 'ai_feedback')
+        answer = await answers.values(*fields).aget()
+
+        # Only the cheap status/feedback columns are re-read while waiting
+        deadline = time.monotonic() + wait
+        while answer['feedback_status'] in ("PENDING", "PROCESSING") and time.monotonic() < deadline:
+            await asyncio.sleep(settings.FEEDBACK_LONG_POLL_INTERVAL)
+            answer = await answers.values(*fields).aget()
+
+        ready = answer['feedback_status'] not in ("PENDING", "PROCESSING")
+        return JsonResponse({
+            "id": answer['id'],
+            "feedback_status": answer['feedback_status'],
+            "ai_feedback": answer['ai_feedback'] if ready else None
+        }, status=200 if ready else 202)
+
+    except InterviewAnswer.DoesNotExist:
+        return JsonResponse({"error": "Answer not found"}, status=404)
+    except Exception as e:
+        logger.error(f"Error fetching answer feedback: {str(e)}")
+        return JsonResponse({"error": "Failed to fetch feedback"}, status=500)
+
+# Formats one Server-Sent Events message
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+# Resolves the user for the async views (DRF authentication does not run on plain async views).
+# These views are csrf_exempt for bearer tokens, so a session login only counts with a valid CSRF token,
+# exactly as DRF's SessionAuthentication requires; otherwise any site could post as a logged-in browser.
+def authenticate_stream_request(request):
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    if result is not None:
+        return result[0]
+    if not request.user.is_authenticated:
+        return None
+    try:
+        SessionAuthentication().enforce_csrf(request)
+    except PermissionDenied:
+        return None
+    return request.user
+
+# Streaming variant of SubmitAnswer: forwards the AI feedback token by token as Server-Sent Events
+# and saves the full feedback once the stream ends. Being an async view, it does not hold a sync
+# worker for the length of the generation when served over ASGI (see careercracker/asgi.py).
+async def stream_answer_feedback(request, interview_id):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    user = await sync_to_async(authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+
+    # Same limits as SubmitAnswer
+    request.user = user
+    wait = await sync_to_async(throttle_wait)(request, 'answer_feedback')
+    if wait is not None:
+        response = JsonResponse({"error": "Request was throttled."}, status=429)
+        response["Retry-After"] = retry_after(wait)
+        return response
+
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    question_id = body.get('questionId')
+    response_text = body.get('text')
+    if not question_id or not response_text:
+        return JsonResponse({"error": "Missing question ID or response text"}, status=400)
+
+    try:
+        interview = await Interview.objects.aget(id=interview_id, user=user)
+        question = await CSQuestion.objects.aget(id=question_id)
+    except Interview.DoesNotExist:
+        return JsonResponse({"error": "Interview not found"}, status=404)
+    except CSQuestion.DoesNotExist:
+        return JsonResponse({"error": "Question not found"}, status=404)
+
+    async def events():
+        parts = []
+        try:
+            feedback = await sync_to_async(cachedAnswerFeedback)(question.id, response_text)
+            if feedback is not None:
+                # Cache hit: send the whole feedback as a single token
+                yield sse_event("token", {"text": feedback})
+            else:
+                try:
+                    async for token in streamAnswerFeedback(question.question_text, response_text):
+                        parts.append(token)
+                        yield sse_event("token", {"text": token})
+                except (CircuitOpenError, LLMBusyError) as e:
+                    # Raised before anything was streamed; the feedback worker answers it later
+                    logger.warning(f"Queueing feedback on question {question.id} for the feedback worker: {e}")
+                else:
+                    feedback = "".join(parts).strip()
+                    await sync_to_async(storeAnswerFeedback)(question.id, response_text, feedback)
+
+            # Save the answer with the complete feedback, or as PENDING when it was queued
+            fields = {"ai_feedback": feedback} if feedback is not None else {"feedback_status": "PENDING"}
+            answer = await sync_to_async(create_answer)(interview, question, response_text, **fields)
+            await sync_to_async(interview.advance_past)(question.id)
+            answered_count = await InterviewAnswer.objects.filter(interview=interview).acount()
+
+            yield sse_event("done", {
+                "id": answer.id,
+                "question_text": question.question_text,
+                "user_response": response_text,
+                "ai_feedback": feedback,
+                "feedback_status": answer.feedback_status,
+                "created_at": answer.created_at,
+                "question_number": answered_count
+            })
+        except Exception as e:
+            logger.error(f"Error streaming answer feedback: {str(e)}")
+            yield sse_event("error", {"error": "Failed to process answer"})
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop proxies (nginx) from buffering the stream
+    return response
+
+# CSRF is checked in authenticate_stream_request for session logins only, since bearer tokens
+# are not sent by browsers on their own (Django 4.2's csrf_exempt decorator does not support async views)
+stream_answer_feedback.csrf_exempt = True
+
+# Admin-only streaming export of interviews, answers, ratings or feedback (see interviews/export.py)
+# as JSONL or CSV (?output=), optionally only rows since a time (?since=). Rows are pulled from a
+# server-side cursor a chunk at a time and handed to an async generator, because Django buffers
+# the whole of a synchronous iterator before streaming it over ASGI.
+async def export_interview_data(request, dataset):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    user = await sync_to_async(authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+    if not user.is_staff:
+        return JsonResponse({"error": "Only staff can export interview data"}, status=403)
+
+    if dataset not in DATASETS:
+        return JsonResponse({"error": f"Unknown dataset, expected one of {', '.join(sorted(DATASETS))}"}, status=404)
+    file_format = request.GET.get('output', 'jsonl')
+    if file_format not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"output must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+    try:
+        since = parse_since(request.GET['since']) if request.GET.get('since') else None
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    lines = render_lines(export_columns(dataset), export_rows(dataset, since), file_format)
+    next_chunk = sync_to_async(lambda: ''.join(islice(lines, 1000)))  # Same thread every call, so the cursor stays open
+
+    async def content():
+        try:
+            while True:
+                chunk = await next_chunk()
+                if not chunk:
+                    break
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; the truncated body is all the client can be told
+            logger.error(f"Error exporting {dataset}: {str(e)}", exc_info=True)
+
+    response = StreamingHttpResponse(content(), content_type=EXPORT_CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 # Marks the interview as completed and sets the end time
 class CompleteInterview(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, interview_id):
         try:
-            interview = Interview.objects.get(id=interview_id, user=request.user)
-            interview.status = "COMPLETED"
-            interview.end_time = timezone.now()
-            interview.save()
+            with transaction.atomic():
+                interview = Interview.objects.select_for_update().get(id=interview_id, user=request.user)
+                newly_completed = interview.status != "COMPLETED"
+                interview.status = "COMPLETED"
+                interview.end_time = timezone.now()
+                interview.save()
+                # Completing twice only moves the end time
+                if newly_completed:
+                    record_completion(request.user.id, interview.end_time)
             return Response({"status": "completed"})
         except Interview.DoesNotExist:
             return Response({"error": "Interview not found"}, status=404)
 
-# Returns the next unanswered question from an in-progress interview
+# Returns the next unanswered question from an in-progress interview.
+# The order is fixed when the interview starts, so this is a single primary-key lookup
+# and repeated calls return the same question until it is answered.
 class NextQuestionView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -193,16 +696,19 @@ class NextQuestionView(APIView):
             interview = Interview.objects.filter(
                 user=request.user,
                 status="IN_PROGRESS"
-            ).latest('start_time')
-
-            answered_questions = InterviewAnswer.objects.filter(
-                interview=interview
-            ).values_list('question_id', flat=True)
-
-            # Get a random unanswered question
-            next_question = interview.questions.exclude(
-                id__in=answered_questions
-            ).order_by('?').first()
+            ).only('id', 'question_order', 'question_cursor').latest('start_time')
+
+            if interview.question_order:
+                question_id = interview.next_question_id()
+                next_question = CSQuestion.objects.filter(id=question_id).first() if question_id else None
+            else:
+                # Interviews started before question_order existed
+                answered_questions = InterviewAnswer.objects.filter(
+                    interview=interview
+                ).values_list('question_id', flat=True)
+                next_question = interview.questions.exclude(
+                    id__in=answered_questions
+                ).order_by('id').first()
 
             if not next_question:
                 return Response({"message": "No more questions available"}, status=404)
@@ -218,6 +724,42 @@ class NextQuestionView(APIView):
             logger.error(f"Error fetching next question: {str(e)}")
             return Response({"error": "Failed to fetch next question"}, status=500)
 
+# Full-text search over the question bank: ?q= with optional ?category= and ?difficulty=,
+# best matches first, paged with ?page= and ?limit= (no total count, just has_next)
+class QuestionSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        category = request.query_params.get('category') or None
+        if not query:
+            return Response({"error": "Query parameter 'q' is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(query) > 200:
+            return Response({"error": "Query is too long"}, status=status.HTTP_400_BAD_REQUEST)
+        if category and category not in dict(CSQuestion.CATEGORY_CHOICES):
+            return Response({"error": f"Unknown category '{category}'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            difficulty = int(request.query_params['difficulty']) if request.query_params.get('difficulty') else None
+            page = int(request.query_params.get('page', 1))
+            limit = min(int(request.query_params.get('limit', 20)), 50)
+            if page < 1 or limit < 1:
+                raise ValueError(page, limit)
+        except ValueError:
+            return Response({"error": "Invalid search parameters"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # One extra row tells us whether there is a next page without counting every match
+            questions = search_questions(query, category, difficulty, limit=limit + 1, offset=(page - 1) * limit)
+            return Response({
+                'results': CSQuestionSearchSerializer(questions[:limit], many=True).data,
+                'page': page,
+                'has_next': len(questions) > limit
+            })
+        except Exception as e:
+            logger.error(f"Error searching questions: {str(e)}", exc_info=True)
+            return Response({"error": "Failed to search questions"}, status=500)
+
 # Lets the user rate a question as Like or Dislike
 class RateQuestion(APIView):
     permission_classes = [IsAuthenticated]
@@ -237,13 +779,20 @@ class RateQuestion(APIView):
             interview = Interview.objects.get(id=interview_id, user=request.user)
             question = CSQuestion.objects.get(id=question_id)
 
-            # Save or update the user's rating
-            rating_obj, created = QuestionRating.objects.update_or_create(
-                user=request.user,
-                question=question,
-                interview=interview,
-                defaults={'rating': rating}
-            )
+            # Save or update the user's rating, adjusting the question's counters by the change.
+            # The existing rating is locked so concurrent changes can't both apply the same delta.
+            with transaction.atomic():
+                rating_obj, created = QuestionRating.objects.select_for_update().get_or_create(
+                    user=request.user,
+                    question=question,
+                    interview=interview,
+                    defaults={'rating': rating}
+                )
+                previous = None if created else rating_obj.rating
+                if previous != rating:
+                    rating_obj.rating = rating
+                    rating_obj.save(update_fields=['rating'])
+                QuestionStats.record_rating(question.id, previous, rating)
 
             return Response({
                 "id": rating_obj.id,
@@ -271,18 +820,31 @@ class SubmitInterviewFeedback(APIView):
             if not content:
                 return Response({"error": "Feedback content is required"}, status=400)
 
+            try:
+                rating = int(rating or 0)
+            except (TypeError, ValueError):
+                return Response({"error": "Rating must be a number"}, status=400)
+
             interview = Interview.objects.get(id=interview_id, user=request.user)
 
             if interview.status != "COMPLETED":
                 return Response({"error": "Can only provide feedback for completed interviews"}, status=400)
 
-            feedback, created = InterviewFeedback.objects.update_or_create(
-                interview=interview,
-                defaults={
-                    'content': content,
-                    'rating': rating
-                }
-            )
+            # Save or update the feedback, moving the user's average self-rating by the change
+            with transaction.atomic():
+                feedback, created = InterviewFeedback.objects.select_for_update().get_or_create(
+                    interview=interview,
+                    defaults={
+                        'content': content,
+                        'rating': rating
+                    }
+                )
+                previous = None if created else feedback.rating
+                if not created:
+                    feedback.content = content
+                    feedback.rating = rating
+                    feedback.save(update_fields=['content', 'rating'])
+                record_feedback(request.user.id, previous, rating)
 
             return Response({
                 "id": feedback.id,
@@ -297,6 +859,18 @@ class SubmitInterviewFeedback(APIView):
             logger.error(f"Error submitting feedback: {str(e)}")
             return Response({"error": "Failed to submit feedback"}, status=500)
 
+# Returns the user's dashboard numbers from their precomputed progress row (one primary-key lookup)
+class UserStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            progress = UserProgress.objects.filter(user_id=request.user.id).first()
+            return Response(progress_summary(progress))
+        except Exception as e:
+            logger.error(f"Error fetching user stats: {str(e)}")
+            return Response({"error": "Failed to fetch stats"}, status=500)
+
 # Gets the current rating the user gave for a specific question in an interview
 class GetQuestionRating(APIView):
     permission_classes = [IsAuthenticated]
@@ -327,3 +901,14 @@ class GetQuestionRating(APIView):
         except Exception as e:
             logger.error(f"Error fetching question rating: {str(e)}")
             return Response({"error": "Failed to fetch rating"}, status=500)
+
+# Staff only: circuit breaker state (closed/open/half_open), transitions and rejected calls per upstream.
+# Breakers are kept per process, so this shows the worker that served the request.
+class UpstreamStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            "breakers": {name: get_breaker(name).stats() for name in ('onet', 'openai')},
+            "request_deadline": settings.REQUEST_DEADLINE,
+        })
@@ -0,0 +1,15 @@
+from careercracker.db_cache import CacheCommand
+from jobs.utils.onet_cache import get_default_cache
+
+class Command(CacheCommand):
+    help = 'Show statistics for the shared O*NET response cache, or purge/clear it'
+    entries = 'cached O*NET responses'
+
+    def get_cache(self):
+        return get_default_cache()
+
+    def describe(self, cache, stats):
+        return (
+            f"Entries: {stats['entries']} ({stats['negative_entries']} negative, {stats['expired_entries']} expired)\n"
+            f"Hits served across all workers: {stats['total_hits']}"
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OnetCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('path', models.CharField(max_length=255)),
+                ('payload', models.JSONField()),
+                ('is_negative', models.BooleanField(default=False)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('last_accessed', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -1,3 +1,15 @@
 from django.db import models
 
-# Create your models here.
+# Cached O*NET web service response, shared by every worker process through the database
+class OnetCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)  # sha256 of (version, path, query)
+    path = models.CharField(max_length=255)  # O*NET resource path, kept for debugging/admin
+    payload = models.JSONField()  # Decoded JSON body returned by O*NET
+    is_negative = models.BooleanField(default=False)  # True when the lookup found nothing (e.g. no occupation)
+    hits = models.PositiveIntegerField(default=0)  # Number of times this entry was served
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)  # Entry is ignored (and purged) after this
+    last_accessed = models.DateTimeField(db_index=True)  # Used for LRU eviction
+
+    def __str__(self):
+        return f"{self.path} ({'negative' if self.is_negative else 'positive'})"
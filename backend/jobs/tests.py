@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.db import DatabaseError
+from django.test import TestCase
+from django.utils import timezone
+from .models import OnetCacheEntry
+from .utils.OnetWebService import OnetWebService
+from .utils.onet_cache import OnetResponseCache
+from .utils.onet_transport import PooledTransport, TransportError
+
+# OnetWebService backed by the shared database cache, with the network replaced by a mock transport
+class OnetCacheTests(TestCase):
+    def setUp(self):
+        self.cache = OnetResponseCache(ttl=3600, negative_ttl=60, max_entries=100)
+        self.transport = mock.Mock()
+        self.service = OnetWebService('user', 'secret', cache=self.cache, transport=self.transport)
+
+    def reply(self, payload, status=200):
+        self.transport.get.return_value = (status, json.dumps(payload).encode())
+
+    def search(self, keyword):
+        return self.service.call('online/search', ('keyword', keyword), ('end', 1))
+
+    def test_miss_then_hit(self):
+        self.reply({"occupation": [{"code": "15-1252.00"}]})
+        self.assertEqual(self.search("developer"), {"occupation": [{"code": "15-1252.00"}]})
+        self.assertEqual(self.search("developer"), {"occupation": [{"code": "15-1252.00"}]})
+        self.search("nurse")  # Different query, different key
+
+        self.assertEqual(self.transport.get.call_count, 2)
+        url, headers = self.transport.get.call_args_list[0].args
+        self.assertEqual(url, 'https://services.onetcenter.org/ws/online/search?keyword=developer&end=1')
+        self.assertTrue(headers['Authorization'].startswith('Basic '))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores'], stats['entries']), (1, 2, 2, 2))
+        self.assertEqual(OnetCacheEntry.objects.get(path='online/search', hits=1).is_negative, False)
+
+    def test_entries_expire_after_their_ttl(self):
+        self.reply({"occupation": [{"code": "15-1252.00"}]})
+        self.search("developer")
+        self.reply({"keyword": "astronaut"})  # Nothing found: cached for the shorter negative TTL
+        self.search("astronaut")
+        self.assertTrue(OnetCacheEntry.objects.get(payload__keyword="astronaut").is_negative)
+
+        later = timezone.now() + timedelta(seconds=120)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.search("developer")
+            self.assertEqual(self.transport.get.call_count, 2)
+            self.search("astronaut")
+            self.assertEqual(self.transport.get.call_count, 3)
+            self.assertEqual(self.cache.stats()['expired_entries'], 0)  # Re-fetched and stored again
+        with mock.patch('django.utils.timezone.now', return_value=later + timedelta(seconds=3600)):
+            self.search("developer")
+            self.assertEqual(self.transport.get.call_count, 4)
+
+    def test_failed_calls_are_not_cached(self):
+        self.transport.get.side_effect = TransportError("timed out")
+        self.assertIn("failed with reason: timed out", self.search("developer")['error'])
+        self.transport.get.side_effect = None
+        self.reply({"message": "busy"}, status=503)
+        self.assertIn("failed with error code 503", self.search("developer")['error'])
+        self.transport.get.return_value = (200, b'<html>')
+        self.assertIn("invalid JSON", self.search("developer")['error'])
+        self.assertFalse(OnetCacheEntry.objects.exists())
+
+        # The next successful call is fetched and cached as usual
+        self.reply({"occupation": [{"code": "15-1252.00"}]})
+        self.assertEqual(self.search("developer")['occupation'][0]['code'], "15-1252.00")
+        self.search("developer")
+        self.assertEqual(self.transport.get.call_count, 4)
+
+    def test_database_errors_fall_back_to_the_network(self):
+        self.reply({"occupation": [{"code": "15-1252.00"}]})
+        with mock.patch.object(OnetCacheEntry.objects, 'filter', side_effect=DatabaseError("no such table")), \
+                self.assertLogs('jobs.utils.onet_cache', 'WARNING'):
+            self.assertEqual(self.search("developer")['occupation'][0]['code'], "15-1252.00")
+        self.assertEqual(self.cache.stats()['errors'], 1)
+
+# Local HTTP/1.1 server for transport tests; each request pops the next (status, headers, delay) from `replies`
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_GET(self):
+        self.server.requests.append((self.client_address, self.path))
+        status, headers, delay = self.server.replies.pop(0) if self.server.replies else (200, {}, 0)
+        time.sleep(delay)
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # The client hung up on a deliberately slow reply
+
+class PooledTransportTests(TestCase):
+    def setUp(self):
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)
+        self.server.requests, self.server.replies = [], []
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/ws/online/search'
+
+    def test_reuses_the_connection(self):
+        transport = PooledTransport()
+        for keyword in ('nurse', 'pilot', 'chef'):
+            status, body = transport.get(f'{self.url}?keyword={keyword}', {'Accept': 'application/json'})
+            self.assertEqual((status, json.loads(body)['path']), (200, f'/ws/online/search?keyword={keyword}'))
+        self.assertEqual(len({client for client, _ in self.server.requests}), 1)
+        self.assertEqual(transport.stats()['calls'], 3)
+
+        # Another thread gets its own connection
+        thread = threading.Thread(target=transport.get, args=(self.url, {}))
+        thread.start()
+        thread.join()
+        self.assertEqual(len({client for client, _ in self.server.requests}), 2)
+
+    def test_retries_with_backoff(self):
+        self.server.replies = [(503, {}, 0), (429, {'Retry-After': '0'}, 0)]
+        transport = PooledTransport(max_retries=3, backoff_factor=0.01)
+        with mock.patch.object(transport, '_backoff', wraps=transport._backoff) as backoff, \
+                self.assertLogs('jobs.utils.onet_transport', 'WARNING') as logs:
+            self.assertEqual(transport.get(self.url, {})[0], 200)
+        self.assertIn('returned 503, retrying', logs.output[0])
+        self.assertEqual(backoff.call_args_list, [mock.call(1, None), mock.call(2, '0')])
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(transport.stats()['retries'], 2)
+
+        # Out of retries the last response is returned and counted as a failure
+        self.server.replies = [(500, {}, 0)] * 2
+        transport = PooledTransport(max_retries=1, backoff_factor=0.01)
+        with self.assertLogs('jobs.utils.onet_transport', 'WARNING'):
+            self.assertEqual(transport.get(self.url, {})[0], 500)
+        self.assertEqual(transport.stats()['failures'], 1)
+        # Backoff grows exponentially up to max_backoff
+        self.assertTrue(all(transport._backoff(attempt) <= 0.01 * 2 ** (attempt - 1) for attempt in range(1, 5)))
+        self.assertLessEqual(PooledTransport(backoff_factor=1, max_backoff=2)._backoff(10), 2)
+
+    def test_invalid_retry_after_falls_back_to_backoff(self):
+        self.server.replies = [(503, {'Retry-After': '-1'}, 0), (429, {'Retry-After': 'nan'}, 0), (503, {'Retry-After': 'inf'}, 0)]
+        transport = PooledTransport(max_retries=3, backoff_factor=0.01)
+        with self.assertLogs('jobs.utils.onet_transport', 'WARNING'):
+            self.assertEqual(transport.get(self.url, {})[0], 200)
+        for value in ('-1', 'nan', 'inf', 'Wed, 21 Oct 2026 07:28:00 GMT'):
+            self.assertLessEqual(transport._backoff(1, value), 0.01)
+        self.assertEqual(PooledTransport(max_backoff=8)._backoff(1, '30'), 8)
+        self.assertEqual(transport._backoff(1, '0'), 0)
+
+    def test_read_timeout_is_retried_then_raised(self):
+        self.server.replies = [(200, {}, 0.3), (200, {}, 0.3)]
+        transport = PooledTransport(read_timeout=0.1, max_retries=1, backoff_factor=0.01)
+        started = time.monotonic()
+        with self.assertRaisesRegex(TransportError, 'timed out'), self.assertLogs('jobs.utils.onet_transport', 'WARNING'):
+            transport.get(self.url, {})
+        self.assertLess(time.monotonic() - started, 0.3)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(transport.stats()['failures'], 1)
+
+        # The timed-out connection was dropped; the next call gets a fresh one
+        self.server.replies = []
+        self.assertEqual(transport.get(self.url, {})[0], 200)
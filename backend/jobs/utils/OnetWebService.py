@@ -1,40 +1,48 @@
-import urllib.request, urllib.parse, urllib.error
-import urllib.request, urllib.error, urllib.parse
+import urllib.parse
 import base64
 import json
+from .onet_transport import PooledTransport, TransportError
 
 class OnetWebService:
     
-    def __init__(self, username, password):
+    def __init__(self, username, password, cache=None, transport=None, base_url='https://services.onetcenter.org'):
         self._headers = {
             'User-Agent': 'python-OnetWebService/1.00 (bot)',
             'Authorization': 'Basic ' + base64.standard_b64encode((username + ':' + password).encode()).decode(),
             'Accept': 'application/json' }
+        self._cache = cache
+        self._transport = transport if transport is not None else PooledTransport()
+        self._base_url = base_url.rstrip('/')
         self.set_version()
     
     def set_version(self, version = None):
+        self._version = version
         if version is None:
-            self._url_root = 'https://services.onetcenter.org/ws/'
+            self._url_root = self._base_url + '/ws/'
         else:
-            self._url_root = 'https://services.onetcenter.org/v' + version + '/ws/'
+            self._url_root = self._base_url + '/v' + version + '/ws/'
     
     def call(self, path, *query):
+        if self._cache is not None:
+            cached = self._cache.get(self._version, path, query)
+            if cached is not None:
+                return cached
+        result = self._fetch(path, *query)
+        if self._cache is not None:
+            self._cache.set(self._version, path, query, result)
+        return result
+
+    def _fetch(self, path, *query):
         url = self._url_root + path
         if len(query) > 0:
             url += '?' + urllib.parse.urlencode(query, True)
-        req = urllib.request.Request(url, None, self._headers)
-        handle = None
         try:
-            handle = urllib.request.urlopen(req)
-        except urllib.error.HTTPError as e:
-            if e.code == 422:
-                return json.load(e)
-            else:
-                return { 'error': 'Call to ' + url + ' failed with error code ' + str(e.code) }
-        except urllib.error.URLError as e:
-            return { 'error': 'Call to ' + url + ' failed with reason: ' + str(e.reason) }
-        code = handle.getcode()
+            code, body = self._transport.get(url, self._headers)
+        except TransportError as e:
+            return { 'error': 'Call to ' + url + ' failed with reason: ' + str(e) }
         if (code != 200) and (code != 422):
-            return { 'error': 'Call to ' + url + ' failed with error code ' + str(code),
-                     'urllib2_info': handle }
-        return json.load(handle)
+            return { 'error': 'Call to ' + url + ' failed with error code ' + str(code) }
+        try:
+            return json.loads(body)
+        except ValueError:
+            return { 'error': 'Call to ' + url + ' returned invalid JSON' }
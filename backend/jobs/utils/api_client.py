@@ -1,8 +1,40 @@
 # for interfacing with O*NET API
 
 from . import OnetWebService
+from . import onet_cache
+from . import onet_transport
+from careercracker.resilience import get_breaker
+from django.conf import settings
 # import requests
 import os, sys
+import threading
+
+_onet_service = None
+_onet_service_lock = threading.Lock()
+
+# returns the process-wide O*NET client built from the environment credentials.
+# It is shared by every request so its auth headers and keep-alive connections are reused,
+# and it is backed by the shared response cache unless that is disabled in settings
+def get_onet_service():
+    global _onet_service
+    if _onet_service is None:
+        with _onet_service_lock:
+            if _onet_service is None:
+                transport = onet_transport.PooledTransport(
+                    connect_timeout=settings.ONET_CONNECT_TIMEOUT,
+                    read_timeout=settings.ONET_READ_TIMEOUT,
+                    max_retries=settings.ONET_MAX_RETRIES,
+                    backoff_factor=settings.ONET_BACKOFF_FACTOR,
+                    breaker=get_breaker('onet'),
+                )
+                cache = onet_cache.get_default_cache() if settings.ONET_CACHE_ENABLED else None
+                _onet_service = OnetWebService.OnetWebService(
+                    os.environ.get("ONET_USERNAME"),
+                    os.environ.get("ONET_PASSWORD"),
+                    cache=cache,
+                    transport=transport,
+                )
+    return _onet_service
 
 def get_user_input(prompt):
     result = ''
@@ -10,9 +42,13 @@ def get_user_input(prompt):
         result = input(prompt + ': ').strip()
     return result
 
+# raised for a failed O*NET call (network error, error status, request deadline or open circuit breaker)
+class OnetError(Exception):
+    pass
+
 def check_for_error(service_result):
     if 'error' in service_result:
-        sys.exit(service_result['error'])
+        raise OnetError(service_result['error'])
 
 # return an SOC code from the name of an occupation
 # returns SOC of top result from whatever input is given
@@ -22,6 +58,7 @@ def get_soc_code(occupation, onet_ws):
     kwresults = onet_ws.call('online/search', 
                             ('keyword', occupation), 
                             ('end', 1))
+    check_for_error(kwresults)
 
     if (not 'occupation' in kwresults) or (0 == len(kwresults['occupation'])):
         print("No relevant occupations were found.")
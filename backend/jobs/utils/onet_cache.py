@@ -0,0 +1,115 @@
+# Database-backed cache for O*NET web service responses.
+# Occupation data only changes a few times a year, so responses are kept for a long
+# time and shared by every worker process through the OnetCacheEntry table.
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+
+from careercracker.db_cache import DatabaseCache
+from jobs.models import OnetCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+class OnetResponseCache(DatabaseCache):
+    model = OnetCacheEntry
+    last_used_field = 'last_accessed'
+    label = 'O*NET cache'
+    counter_names = ('hits', 'negative_hits', 'misses', 'stores', 'evictions', 'errors')
+
+    def __init__(self, ttl, negative_ttl, max_entries, evict_every=100):
+        super().__init__(max_entries, evict_every)
+        self.ttl = ttl  # Seconds a normal response stays valid
+        self.negative_ttl = negative_ttl  # Seconds a "nothing found" response stays valid
+
+    # Builds a stable key from the API version, resource path and query parameters
+    @staticmethod
+    def make_key(version, path, query):
+        raw = json.dumps([version or '', path, [list(pair) for pair in query]], default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    # A search that returns no occupation is cached as a negative result
+    @staticmethod
+    def is_negative(path, payload):
+        return path.endswith('search') and not payload.get('occupation')
+
+    def expired(self):
+        return Q(expires_at__lte=timezone.now())
+
+    # Returns the cached payload, or None on a miss
+    def get(self, version, path, query):
+        key = self.make_key(version, path, query)
+        try:
+            entry = OnetCacheEntry.objects.filter(key=key, expires_at__gt=timezone.now()).values('id', 'payload', 'is_negative').first()
+            if entry is None:
+                self._count('misses')
+                return None
+            self.touch(entry['id'])
+        except DatabaseError as e:
+            # The cache must never break an O*NET call; fall back to the network
+            logger.warning(f"O*NET cache read failed for {path}: {e}")
+            self._count('errors')
+            return None
+
+        self._count('negative_hits' if entry['is_negative'] else 'hits')
+        return entry['payload']
+
+    # Stores a successful response; error responses are never cached
+    def set(self, version, path, query, payload):
+        if not isinstance(payload, dict) or 'error' in payload:
+            return
+
+        negative = self.is_negative(path, payload)
+        now = timezone.now()
+        ttl = self.negative_ttl if negative else self.ttl
+        try:
+            OnetCacheEntry.objects.update_or_create(
+                key=self.make_key(version, path, query),
+                defaults={
+                    'path': path[:255],
+                    'payload': payload,
+                    'is_negative': negative,
+                    'expires_at': now + timedelta(seconds=ttl),
+                    'last_accessed': now,
+                }
+            )
+        except DatabaseError as e:
+            logger.warning(f"O*NET cache write failed for {path}: {e}")
+            self._count('errors')
+            return
+
+        self.stored()
+
+    def stats(self):
+        counters = super().stats()
+        lookups = counters['hits'] + counters['negative_hits'] + counters['misses']
+        counters['hit_ratio'] = (counters['hits'] + counters['negative_hits']) / lookups if lookups else 0.0
+        counters['negative_entries'] = OnetCacheEntry.objects.filter(is_negative=True).count()
+        counters['expired_entries'] = OnetCacheEntry.objects.filter(self.expired()).count()
+        return counters
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+# Returns the process-wide cache configured from settings
+def get_default_cache():
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = OnetResponseCache(
+                    ttl=settings.ONET_CACHE_TTL,
+                    negative_ttl=settings.ONET_CACHE_NEGATIVE_TTL,
+                    max_entries=settings.ONET_CACHE_MAX_ENTRIES,
+                )
+    return _default_cache
@@ -0,0 +1,180 @@
+# HTTP transport for the O*NET web service.
+# Keeps one keep-alive connection per host for each worker thread, applies connect/read
+# timeouts so a stalled socket can never hang a request, retries 429/5xx responses and
+# network errors with exponential backoff, and records per-call latency.
+# Timeouts and retries are cut short by the request deadline, and an optional circuit
+# breaker fails calls at once while O*NET keeps failing.
+
+import http.client
+import logging
+import math
+import random
+import threading
+import time
+import urllib.parse
+
+from careercracker.resilience import CircuitOpenError, DeadlineExceeded, remaining_timeout, time_remaining
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TransportError(Exception):
+    pass
+
+
+class PooledTransport:
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, max_retries=3, backoff_factor=0.5, max_backoff=8, breaker=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.breaker = breaker
+        self._local = threading.local()  # http.client connections are not thread-safe
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'retries': 0, 'failures': 0, 'reconnects': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+    # Performs a GET and returns (status, body bytes); raises TransportError once retries are exhausted,
+    # the request deadline has passed or the circuit breaker is open
+    def get(self, url, headers):
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path + ('?' + parts.query if parts.query else '')
+        if self.breaker is not None:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError as e:
+                raise TransportError(str(e))
+        started = time.monotonic()
+        attempt = 0
+
+        try:
+            while True:
+                try:
+                    timeouts = remaining_timeout(self.connect_timeout), remaining_timeout(self.read_timeout)
+                except DeadlineExceeded as e:
+                    self._failed()
+                    raise TransportError(str(e))
+
+                retry_after = None
+                error = None
+                try:
+                    status, body, retry_after = self._request(parts, target, headers, *timeouts)
+                except (OSError, http.client.HTTPException) as e:
+                    error = e
+                else:
+                    if status not in RETRY_STATUSES:
+                        if self.breaker is not None:
+                            self.breaker.record_success()
+                        return status, body
+
+                # Give up when out of retries, or when the backoff alone would outlast the deadline
+                delay = self._backoff(attempt + 1, retry_after)
+                remaining = time_remaining()
+                if attempt >= self.max_retries or (remaining is not None and delay >= remaining):
+                    self._failed()
+                    if error is not None:
+                        raise TransportError(str(error) or error.__class__.__name__)
+                    return status, body
+                if error is not None:
+                    logger.warning(f"O*NET request to {parts.path} failed ({error!r}), retrying")
+                else:
+                    logger.warning(f"O*NET request to {parts.path} returned {status}, retrying")
+
+                attempt += 1
+                self._count('retries')
+                time.sleep(delay)
+        finally:
+            self._record_latency(parts.path, (time.monotonic() - started) * 1000, attempt)
+
+    def _request(self, parts, target, headers, connect_timeout, read_timeout):
+        conn, reused = self._connection(parts, connect_timeout, read_timeout)
+        try:
+            response, body = self._send(conn, target, headers)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # The server closed an idle keep-alive connection; reconnect once without counting a retry
+            self._discard(parts)
+            if not reused:
+                raise
+            self._count('reconnects')
+            conn, _ = self._connection(parts, connect_timeout, read_timeout)
+            try:
+                response, body = self._send(conn, target, headers)
+            except Exception:
+                self._discard(parts)
+                raise
+        except Exception:
+            self._discard(parts)
+            raise
+
+        if response.will_close:
+            self._discard(parts)
+        return response.status, body, response.getheader('Retry-After')
+
+    @staticmethod
+    def _send(conn, target, headers):
+        conn.request('GET', target, headers=headers)
+        response = conn.getresponse()
+        return response, response.read()
+
+    # Returns (connection, reused) for this thread, opening one with the connect timeout if needed
+    def _connection(self, parts, connect_timeout, read_timeout):
+        pool = getattr(self._local, 'connections', None)
+        if pool is None:
+            pool = self._local.connections = {}
+
+        key = (parts.scheme, parts.hostname, parts.port)
+        conn = pool.get(key)
+        if conn is not None and conn.sock is not None:
+            conn.sock.settimeout(read_timeout)
+            return conn, True
+
+        cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        conn = cls(parts.hostname, parts.port, timeout=connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(read_timeout)
+        pool[key] = conn
+        return conn, False
+
+    def _discard(self, parts):
+        pool = getattr(self._local, 'connections', {})
+        conn = pool.pop((parts.scheme, parts.hostname, parts.port), None)
+        if conn is not None:
+            conn.close()
+
+    # Exponential backoff with full jitter, honouring a numeric Retry-After header (clamped to
+    # [0, max_backoff]; negative or non-finite values are ignored, since time.sleep rejects them)
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = None
+            if delay is not None and math.isfinite(delay) and delay >= 0:
+                return min(delay, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1))))
+
+    def _record_latency(self, path, elapsed_ms, retries):
+        logger.debug(f"O*NET GET {path} took {elapsed_ms:.0f}ms ({retries} retries)")
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['total_ms'] += elapsed_ms
+            self._stats['max_ms'] = max(self._stats['max_ms'], elapsed_ms)
+
+    def _failed(self):
+        self._count('failures')
+        if self.breaker is not None:
+            self.breaker.record_failure()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    # Call counts and latency for this process
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_ms'] = stats['total_ms'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
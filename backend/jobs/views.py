@@ -4,9 +4,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from .utils import api_client
-from .utils.OnetWebService import OnetWebService
 from rest_framework.permissions import IsAuthenticated
-import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 # API view to retrieve job information using O*NET Web Services
 class get_info_view(APIView):
@@ -18,12 +19,17 @@ class get_info_view(APIView):
         if not job_title:
             return Response({'error': 'Job title is required.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # O*NET instance
-        onet_ws = OnetWebService(os.environ.get("ONET_USERNAME"), os.environ.get("ONET_PASSWORD"))
+        # O*NET instance (responses are served from the shared cache after warm-up)
+        onet_ws = api_client.get_onet_service()
 
         # Fetch job description and tasks using the API client
-        description = api_client.get_job_info(api_client.get_soc_code(job_title, onet_ws), onet_ws)
-        tasks = api_client.get_tasks(api_client.get_soc_code(job_title, onet_ws), onet_ws)
+        try:
+            soc_code = api_client.get_soc_code(job_title, onet_ws)
+            description = api_client.get_job_info(soc_code, onet_ws)
+            tasks = api_client.get_tasks(soc_code, onet_ws)
+        except api_client.OnetError as e:
+            logger.warning(f"O*NET lookup for '{job_title}' failed: {e}")
+            return Response({'error': 'Career information is temporarily unavailable.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
         data = {
             'description': description,